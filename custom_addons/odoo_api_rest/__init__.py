@@ -2,4 +2,5 @@
 # Inicialización del módulo odoo_api_rest
 # Este módulo proporciona endpoints REST para la comunicación con aplicaciones externas
 
-from . import controllers
\ No newline at end of file
+from . import controllers
+from . import models
@@ -1,6 +1,6 @@
 {
     'name': 'Odoo API REST',
-    'version': '1.0',
+    'version': '1.1',
     'summary': 'API REST para Odoo',
     'description': """
         Módulo que proporciona una API REST para Odoo.
@@ -1,5 +1,56 @@
-from odoo import models, fields, api
+from odoo import models, api
+from odoo.api import call_kw
+from odoo.service.model import check_method_name
 
-# Este archivo puede contener extensiones de modelos existentes o nuevos modelos
-# Por ahora, no necesitamos crear modelos adicionales, ya que estamos utilizando
-# los modelos estándar de Odoo (product.template, res.partner, sale.order)
+# Operaciones como máximo por llamada a `api_execute_batch`
+MAX_BATCH_CALLS = 50
+
+
+class Base(models.AbstractModel):
+    """
+    Métodos disponibles en todos los modelos para que el middleware resuelva
+    cada página de un listado con una sola llamada RPC
+    """
+    _inherit = 'base'
+
+    @api.model
+    def api_search_read_page(self, domain=None, fields=None, offset=0, limit=None, order=None, count=True):
+        """
+        `search_read` y `search_count` del mismo dominio en una sola llamada.
+
+        Si la página no llega al límite el total se deduce de ella, sin
+        volver a contar (igual que `web_search_read`).
+
+        Returns:
+            {'records': [...], 'length': total o None si `count` es False}
+        """
+        domain = domain or []
+        records = self.search_read(domain, fields or [], offset=offset, limit=limit, order=order)
+        length = None
+        if count:
+            if limit is None or (len(records) < limit and (records or not offset)):
+                length = offset + len(records)
+            else:
+                length = self.search_count(domain)
+        return {'records': records, 'length': length}
+
+    @api.model
+    def api_execute_batch(self, calls):
+        """
+        Varias operaciones `[modelo, método, args, kwargs]` en una sola
+        petición, con los mismos permisos que `execute_kw` del usuario.
+
+        Returns:
+            Resultado de cada operación, en el mismo orden
+        """
+        if len(calls) > MAX_BATCH_CALLS:
+            raise ValueError(f"Como mucho {MAX_BATCH_CALLS} operaciones por lote")
+        results = []
+        for call in calls:
+            model, method = call[0], call[1]
+            args = call[2] if len(call) > 2 else []
+            kwargs = call[3] if len(call) > 3 else {}
+            # Los métodos privados no se pueden llamar por RPC
+            check_method_name(method)
+            results.append(call_kw(self.env[model], method, args, kwargs))
+        return results
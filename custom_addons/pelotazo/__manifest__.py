@@ -1,6 +1,6 @@
 {
     'name': 'El Pelotazo',
-    'version': '16.0.1.0.0',
+    'version': '16.0.1.1.0',
     'summary': 'Módulo personalizado para El Pelotazo',
     'description': """
         Módulo personalizado para la tienda de electrodomésticos El Pelotazo.
@@ -20,6 +20,7 @@
     ],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron.xml',
         'views/product_views.xml',
         'views/res_partner_views.xml',
         'views/website_templates.xml',
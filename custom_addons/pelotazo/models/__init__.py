@@ -1 +1,2 @@
-from . import product
\ No newline at end of file
+from . import product
+from . import change_journal
\ No newline at end of file
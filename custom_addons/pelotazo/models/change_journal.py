@@ -0,0 +1,232 @@
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+# Días que se conservan las entradas del diario (parámetro del sistema)
+RETENTION_PARAM = 'pelotazo.change_journal_days'
+DEFAULT_RETENTION_DAYS = 7
+
+# Última posición (`txid:secuencia`) eliminada por la limpieza; un lector que
+# se haya quedado por detrás debe hacer una sincronización completa
+PRUNED_POSITION_PARAM = 'pelotazo.change_journal_pruned_position'
+
+MAX_FETCH_LIMIT = 5000
+
+# Campos de los usuarios que afectan a la autenticación en el middleware
+USER_AUTH_FIELDS = {'active', 'login', 'password', 'groups_id'}
+
+
+class ChangeJournal(models.Model):
+    """
+    Diario de cambios de solo inserción para la sincronización con el middleware.
+
+    Cada alta, modificación o baja de los modelos sincronizados añade una fila
+    en la misma transacción que el cambio, con el id de esa transacción
+    (`txid`, columna creada en `init`). Los lectores avanzan por el par
+    (`txid`, id): una transacción solo se entrega cuando ya no puede
+    confirmarse ninguna otra anterior, así que ninguna fila se salta.
+    """
+    _name = 'pelotazo.change.journal'
+    _description = 'Diario de cambios para sincronización'
+    _order = 'id'
+    _log_access = False
+
+    model = fields.Char(string='Modelo', required=True, index=True)
+    res_id = fields.Integer(string='ID del registro', required=True)
+    operation = fields.Selection([
+        ('create', 'Alta'),
+        ('write', 'Modificación'),
+        ('unlink', 'Baja'),
+    ], string='Operación', required=True)
+    changed_fields = fields.Char(string='Campos modificados')
+    changed_at = fields.Datetime(string='Fecha', required=True, index=True)
+
+    def init(self):
+        # `txid_current()` es bigint y el ORM no tiene campos bigint: la
+        # columna solo se usa desde SQL. Las filas anteriores quedan con 0
+        self.env.cr.execute(
+            "ALTER TABLE pelotazo_change_journal ADD COLUMN IF NOT EXISTS txid bigint NOT NULL DEFAULT 0"
+        )
+        self.env.cr.execute(
+            "CREATE INDEX IF NOT EXISTS pelotazo_change_journal_txid_id_idx "
+            "ON pelotazo_change_journal (txid, id)"
+        )
+
+    @api.model
+    def _record(self, model, ids, operation, changed_fields=None):
+        """
+        Añade una entrada por registro con una única sentencia SQL, sin pasar
+        por el ORM, para no encarecer las escrituras masivas
+        """
+        ids = [i for i in ids if i]
+        if not ids:
+            return
+        self.env.cr.execute(
+            """
+            INSERT INTO pelotazo_change_journal (model, res_id, operation, changed_fields, changed_at, txid)
+            SELECT %s, unnest(%s::int[]), %s, %s, now() at time zone 'UTC', txid_current()
+            """,
+            (model, ids, operation, ','.join(sorted(changed_fields)) if changed_fields else None),
+        )
+
+    @api.model
+    def fetch_changes(self, since_seq=0, limit=1000, since_txid=0):
+        """
+        Devuelve las entradas del diario posteriores a la posición
+        (`since_txid`, `since_seq`), en orden de transacción y secuencia.
+
+        Solo se devuelven las filas de transacciones anteriores al `xmin` de
+        la instantánea actual: todas ellas han terminado, y cualquier
+        transacción que se confirme después tendrá un `txid` mayor, así que
+        quedará por delante del punto de control. Una transacción larga
+        retiene las posteriores hasta que termina, pero nunca se pierde, y
+        las descartadas no dejan huecos que esperar.
+
+        :param since_seq: Secuencia de la última entrada aplicada por el lector
+        :param limit: Número máximo de entradas
+        :param since_txid: Transacción de la última entrada aplicada
+        :return: Diccionario con `changes`, `last_seq` y `last_txid` (nuevo punto
+                 de control), `has_more` y `reset` (True si el lector se ha
+                 quedado por detrás de la limpieza y debe hacer una
+                 sincronización completa)
+        """
+        self.check_access_rights('read')
+        since_seq = int(since_seq or 0)
+        since_txid = int(since_txid or 0)
+        limit = max(1, min(int(limit or 1000), MAX_FETCH_LIMIT))
+
+        pruned = self.env['ir.config_parameter'].sudo().get_param(PRUNED_POSITION_PARAM, '0:0')
+        pruned_txid, pruned_seq = (int(v) for v in pruned.split(':'))
+        if (since_txid, since_seq) < (pruned_txid, pruned_seq):
+            return {
+                'changes': [], 'last_seq': pruned_seq, 'last_txid': pruned_txid,
+                'has_more': True, 'reset': True,
+            }
+
+        self.env.cr.execute(
+            """
+            SELECT id, txid, model, res_id, operation, changed_fields, changed_at
+            FROM pelotazo_change_journal
+            WHERE (txid, id) > (%s, %s)
+              AND txid < txid_snapshot_xmin(txid_current_snapshot())
+            ORDER BY txid, id
+            LIMIT %s
+            """,
+            (since_txid, since_seq, limit + 1),
+        )
+        rows = self.env.cr.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        changes = []
+        last_seq, last_txid = since_seq, since_txid
+        for seq, txid, model, res_id, operation, changed_fields, changed_at in rows:
+            changes.append({
+                'seq': seq,
+                'model': model,
+                'res_id': res_id,
+                'operation': operation,
+                'fields': changed_fields.split(',') if changed_fields else [],
+                'changed_at': fields.Datetime.to_string(changed_at),
+            })
+            last_seq, last_txid = seq, txid
+
+        return {
+            'changes': changes, 'last_seq': last_seq, 'last_txid': last_txid,
+            'has_more': has_more, 'reset': False,
+        }
+
+    @api.model
+    def _cron_prune(self):
+        """Elimina las entradas más antiguas que el periodo de retención"""
+        params = self.env['ir.config_parameter'].sudo()
+        days = int(params.get_param(RETENTION_PARAM, DEFAULT_RETENTION_DAYS))
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute(
+            "DELETE FROM pelotazo_change_journal WHERE changed_at < %s RETURNING txid, id",
+            (cutoff,),
+        )
+        deleted = self.env.cr.fetchall()
+        if deleted:
+            pruned_txid, pruned_seq = (int(v) for v in params.get_param(PRUNED_POSITION_PARAM, '0:0').split(':'))
+            pruned_txid, pruned_seq = max(max(deleted), (pruned_txid, pruned_seq))
+            params.set_param(PRUNED_POSITION_PARAM, f'{pruned_txid}:{pruned_seq}')
+        return len(deleted)
+
+
+class ChangeJournalMixin(models.AbstractModel):
+    """Registra en el diario las altas, modificaciones y bajas del modelo"""
+    _name = 'pelotazo.change.journal.mixin'
+    _description = 'Registro de cambios en el diario'
+
+    def _journal(self, operation, changed_fields=None):
+        if self.env.context.get('pelotazo_skip_journal') or not self:
+            return
+        self.env['pelotazo.change.journal']._record(self._name, self.ids, operation, changed_fields)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._journal('create')
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self._journal('write', vals.keys())
+        return result
+
+    def unlink(self):
+        # Se anota antes de borrar, cuando aún se conocen los registros
+        self._journal('unlink')
+        return super().unlink()
+
+
+class ProductTemplateJournal(models.Model):
+    _name = 'product.template'
+    _inherit = ['product.template', 'pelotazo.change.journal.mixin']
+
+
+class ProductProductJournal(models.Model):
+    _name = 'product.product'
+    _inherit = ['product.product', 'pelotazo.change.journal.mixin']
+
+
+class ProductCategoryJournal(models.Model):
+    _name = 'product.category'
+    _inherit = ['product.category', 'pelotazo.change.journal.mixin']
+
+
+class SupplierInfoJournal(models.Model):
+    _name = 'product.supplierinfo'
+    _inherit = ['product.supplierinfo', 'pelotazo.change.journal.mixin']
+
+
+class PartnerJournal(models.Model):
+    _name = 'res.partner'
+    _inherit = ['res.partner', 'pelotazo.change.journal.mixin']
+
+
+class StockQuantJournal(models.Model):
+    _name = 'stock.quant'
+    _inherit = ['stock.quant', 'pelotazo.change.journal.mixin']
+
+    def _journal(self, operation, changed_fields=None):
+        # Los quants no se sincronizan por sí mismos: lo que cambia para el
+        # middleware es el stock de sus productos
+        if self.env.context.get('pelotazo_skip_journal') or not self:
+            return
+        self.env['pelotazo.change.journal']._record(
+            'product.product', self.product_id.ids, 'write', ['qty_available']
+        )
+
+
+class UsersJournal(models.Model):
+    _name = 'res.users'
+    _inherit = ['res.users', 'pelotazo.change.journal.mixin']
+
+    def _journal(self, operation, changed_fields=None):
+        # El middleware guarda en caché los usuarios validados: solo le
+        # interesan las bajas y los cambios que afectan al acceso
+        if operation == 'write' and not USER_AUTH_FIELDS.intersection(changed_fields or ()):
+            return
+        super()._journal(operation, changed_fields)
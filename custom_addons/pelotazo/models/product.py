@@ -17,6 +17,7 @@ class ProductTemplate(models.Model):
     x_fecha_fin_oferta = fields.Date(string='Fin de oferta')
     x_codigo_proveedor = fields.Char(string='Código del proveedor')
     x_stock_disponible = fields.Float(string='Stock disponible', compute='_compute_stock_disponible')
+    x_tiene_imagen = fields.Boolean(string='Tiene imagen', compute='_compute_tiene_imagen', store=True)
     
     # Campos calculados
     @api.depends('list_price', 'x_dto')
@@ -35,6 +36,11 @@ class ProductTemplate(models.Model):
             else:
                 product.x_beneficio_unitario = 0.0
     
+    @api.depends('image_1920')
+    def _compute_tiene_imagen(self):
+        for product in self:
+            product.x_tiene_imagen = bool(product.image_1920)
+    
     def _compute_beneficio(self):
         for product in self:
             if product.standard_price and product.standard_price > 0:
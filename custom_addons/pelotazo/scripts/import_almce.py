@@ -3,6 +3,7 @@
 
 import csv
 import os
+import sys
 import xmlrpc.client
 import re
 from decimal import Decimal
@@ -16,11 +17,31 @@ PASSWORD = 'admin'
 # Directorio con archivos CSV
 CSV_DIR = '/home/espasiko/odoo/pelotanew-link/csv'
 
+# Huellas de los ficheros y productos ya importados
+STATE_FILE = os.path.join(CSV_DIR, '.import_almce_fingerprints.json')
+
+# Reutilizar el pool de conexiones keep-alive del middleware si está disponible
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'fastapi_middleware'))
+try:
+    from app.core.xmlrpc_pool import server_proxy
+except ImportError:
+    server_proxy = None
+
+# Huellas de contenido del middleware para omitir ficheros y filas sin cambios
+try:
+    from app.core.fingerprint import FingerprintStore, fingerprint, fingerprint_file
+except ImportError:
+    FingerprintStore = None
+
 def connect_to_odoo():
     """Establece conexión con el servidor Odoo"""
-    common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(URL))
+    if server_proxy:
+        common = server_proxy(URL, 'common')
+        models = server_proxy(URL, 'object')
+    else:
+        common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(URL))
+        models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(URL))
     uid = common.authenticate(DB, USERNAME, PASSWORD, {})
-    models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(URL))
     return uid, models
 
 def clean_number(value):
@@ -98,12 +119,23 @@ def import_almce_products():
     # Crear o recuperar proveedor ALMCE
     provider_id = create_or_get_provider(uid, models, 'ALMCE')
     
-    # Contador de productos procesados
+    # Contadores de productos procesados y sin cambios
     processed_count = 0
+    unchanged_count = 0
+    
+    # Un fichero que no ha cambiado no se vuelve a leer, y dentro de un fichero
+    # modificado solo se envían a Odoo las filas que han cambiado
+    store = FingerprintStore(STATE_FILE) if FingerprintStore else None
     
     # Procesar cada archivo CSV
     for filename in os.listdir(CSV_DIR):
         if filename.startswith('PVP ALMCE') and filename.endswith('.csv'):
+            csv_path = os.path.join(CSV_DIR, filename)
+            file_digest = fingerprint_file(csv_path) if store else None
+            if store and store.unchanged(f'file:{filename}', file_digest):
+                print(f"\nArchivo sin cambios, omitido: {filename}")
+                continue
+            
             # Extraer nombre de categoría del nombre del archivo
             category_name = filename.split('-')[-1].strip().split('.')[0]
             
@@ -114,7 +146,6 @@ def import_almce_products():
             print(f"Categoría: {category_name} (ID: {category_id})")
             
             # Leer archivo CSV
-            csv_path = os.path.join(CSV_DIR, filename)
             try:
                 with open(csv_path, 'r', encoding='utf-8') as f:
                     # Leer todas las líneas
@@ -175,10 +206,7 @@ def import_almce_products():
                             except ValueError:
                                 stock = 0
                         
-                        # Buscar producto por código
                         product_code = row['CÓDIGO'].strip()
-                        product_id = models.execute_kw(DB, uid, PASSWORD, 'product.template', 'search', 
-                                                    [[('default_code', '=', product_code)]])
                         
                         # Datos del producto
                         product_data = {
@@ -196,6 +224,19 @@ def import_almce_products():
                             'x_vendidas': unidades,
                         }
                         
+                        # Omitir la fila si es idéntica a la última importada
+                        row_key = f'product:{product_code}'
+                        row_digest = None
+                        if store:
+                            row_digest = fingerprint({**product_data, 'provider_id': provider_id, 'stock': stock})
+                            if store.unchanged(row_key, row_digest):
+                                unchanged_count += 1
+                                continue
+                        
+                        # Buscar producto por código
+                        product_id = models.execute_kw(DB, uid, PASSWORD, 'product.template', 'search', 
+                                                    [[('default_code', '=', product_code)]])
+                        
                         # Crear o actualizar producto
                         if not product_id:
                             product_id = models.execute_kw(DB, uid, PASSWORD, 'product.template', 'create', [product_data])
@@ -248,11 +289,18 @@ def import_almce_products():
                                         }])
                         
                         processed_count += 1
+                        if store:
+                            store.update(row_key, row_digest)
                 
+                if store:
+                    store.update(f'file:{filename}', file_digest)
             except Exception as e:
                 print(f"Error procesando {filename}: {str(e)}")
+            finally:
+                if store:
+                    store.save()
     
-    print(f"\nImportación completada. {processed_count} productos procesados.")
+    print(f"\nImportación completada. {processed_count} productos procesados, {unchanged_count} sin cambios.")
 
 if __name__ == "__main__":
     import_almce_products()
\ No newline at end of file
@@ -4,8 +4,14 @@ Paquete principal de la aplicación FastAPI para El Pelotazo.
 Este paquete contiene los módulos y componentes principales de la aplicación.
 """
 
-# Importar servicios
-from .services.sync_service import SyncService
-
-# Hacer los servicios disponibles a nivel de paquete
+# Hacer los servicios disponibles a nivel de paquete. La importación es
+# diferida para que módulos sin dependencias (como `app.core.xmlrpc_pool`)
+# puedan usarse desde scripts sin cargar Prisma.
 __all__ = ['SyncService']
+
+
+def __getattr__(name):
+    if name == 'SyncService':
+        from .services.sync_service import SyncService
+        return SyncService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -11,6 +11,19 @@ class Settings(BaseSettings):
     # Configuración general
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "El Pelotazo API"
+    API_VERSION: str = os.getenv("API_VERSION", "1.0.0")
+    
+    # Configuración del servidor
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    
+    # Configuración de logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json (una línea JSON por evento) o text
+    LOG_REQUEST_SAMPLE_RATE: float = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "1"))  # peticiones correctas registradas
+    LOG_SLOW_REQUEST_MS: float = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))  # se registran siempre
     
     # Configuración de seguridad
     SECRET_KEY: str = os.getenv("SECRET_KEY", "pelotazo_secret_key_change_in_production")
@@ -20,11 +33,69 @@ class Settings(BaseSettings):
     # Configuración de CORS
     CORS_ORIGINS: List[str] = ["*"]  # Permitir cualquier origen durante el desarrollo
     
+    @property
+    def BACKEND_CORS_ORIGINS(self) -> List[str]:
+        """Orígenes permitidos además de los locales (`BACKEND_CORS_ORIGINS`, separados por comas)"""
+        return [origin.strip() for origin in os.getenv("BACKEND_CORS_ORIGINS", "").split(",") if origin.strip()]
+    
     # Configuración de Odoo
     ODOO_URL: str = os.getenv("ODOO_URL", "http://localhost:8069")
     ODOO_DB: str = os.getenv("ODOO_DB", "odoo_pelotazo")
     ODOO_USERNAME: str = os.getenv("ODOO_USERNAME", "admin")
     ODOO_PASSWORD: str = os.getenv("ODOO_PASSWORD", "admin")
+    ODOO_TIMEOUT: float = float(os.getenv("ODOO_TIMEOUT", "30"))  # segundos
+    ODOO_MAX_CONNECTIONS: int = int(os.getenv("ODOO_MAX_CONNECTIONS", "50"))
+    ODOO_POOL_SIZE: int = int(os.getenv("ODOO_POOL_SIZE", "10"))  # Conexiones XML-RPC keep-alive
+    
+    # Configuración de cachés
+    CATEGORY_CACHE_TTL: float = float(os.getenv("CATEGORY_CACHE_TTL", "60"))  # segundos entre comprobaciones
+    AUTH_USER_CACHE_TTL: float = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))  # antigüedad máxima de un usuario validado
+    AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+    
+    # Configuración de la sincronización con Odoo
+    SYNC_PREFETCH_PAGES: int = int(os.getenv("SYNC_PREFETCH_PAGES", "2"))  # lotes leídos por delante
+    SYNC_MAP_CONCURRENCY: int = int(os.getenv("SYNC_MAP_CONCURRENCY", "1"))
+    SYNC_WRITE_CONCURRENCY: int = int(os.getenv("SYNC_WRITE_CONCURRENCY", "2"))
+    
+    SYNC_JOB_HEARTBEAT_SECONDS: float = float(os.getenv("SYNC_JOB_HEARTBEAT_SECONDS", "10"))
+    SYNC_JOB_STALE_SECONDS: float = float(os.getenv("SYNC_JOB_STALE_SECONDS", "60"))  # sin latido: se reanuda
+    SYNC_EVENTS_POLL_SECONDS: float = float(os.getenv("SYNC_EVENTS_POLL_SECONDS", "1"))  # trabajos de otros workers
+    SYNC_EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("SYNC_EVENTS_KEEPALIVE_SECONDS", "15"))
+    SYNC_CHANGE_FEED_ENABLED: bool = os.getenv("SYNC_CHANGE_FEED_ENABLED", "true").lower() == "true"
+    SYNC_CHANGE_FEED_POLL_SECONDS: float = float(os.getenv("SYNC_CHANGE_FEED_POLL_SECONDS", "2"))  # diario de cambios de Odoo
+    SYNC_CHANGE_FEED_BATCH: int = int(os.getenv("SYNC_CHANGE_FEED_BATCH", "500"))
+    SYNC_CHANGE_FEED_LEADER_RETRY_SECONDS: float = float(os.getenv("SYNC_CHANGE_FEED_LEADER_RETRY_SECONDS", "30"))  # otro worker es el lector
+    
+    # Catálogo local de productos (modelo de lectura de GET /products)
+    CATALOG_READ_MODEL_ENABLED: bool = os.getenv("CATALOG_READ_MODEL_ENABLED", "true").lower() == "true"
+    CATALOG_MAX_STALENESS_SECONDS: float = float(os.getenv("CATALOG_MAX_STALENESS_SECONDS", "300"))  # si no, se lee de Odoo
+    CATALOG_FRESHNESS_CHECK_SECONDS: float = float(os.getenv("CATALOG_FRESHNESS_CHECK_SECONDS", "5"))
+    SEARCH_INDEX_REFRESH_SECONDS: float = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "5"))  # índice de búsqueda en memoria
+    SEARCH_MAX_RESULTS: int = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+    SUGGEST_REBUILD_SECONDS: float = float(os.getenv("SUGGEST_REBUILD_SECONDS", "300"))  # autocompletado: como mucho
+    FACET_REBUILD_SECONDS: float = float(os.getenv("FACET_REBUILD_SECONDS", "60"))  # recoge los cambios de stock
+    LOOKUP_REBUILD_SECONDS: float = float(os.getenv("LOOKUP_REBUILD_SECONDS", "60"))  # códigos de variantes y proveedores
+    ETAG_VERSION_CHECK_SECONDS: float = float(os.getenv("ETAG_VERSION_CHECK_SECONDS", "1"))  # versiones para los ETag
+    
+    # Paginación de los listados
+    LIST_TOTAL_CACHE_TTL: float = float(os.getenv("LIST_TOTAL_CACHE_TTL", "30"))  # totales por consulta
+    LIST_TOTAL_CACHE_SIZE: int = int(os.getenv("LIST_TOTAL_CACHE_SIZE", "1024"))
+    
+    # Caché de resultados de las lecturas (listados y fichas)
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "30"))  # vigente
+    RESPONSE_CACHE_STALE_SECONDS: float = float(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "300"))  # se sirve mientras se recalcula
+    RESPONSE_CACHE_STALE_IF_ERROR_SECONDS: float = float(os.getenv("RESPONSE_CACHE_STALE_IF_ERROR_SECONDS", "86400"))  # si Odoo no responde
+    RESPONSE_CACHE_SHARED: bool = os.getenv("RESPONSE_CACHE_SHARED", "false").lower() == "true"  # compartida entre workers (PostgreSQL)
+    
+    # Configuración de imágenes de producto
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))  # hilos para redimensionar
+    
+    # Huellas de los ficheros ya importados (para saltarse los que no cambian)
+    IMPORT_STATE_DIR: str = os.getenv("IMPORT_STATE_DIR", "cache/imports")
     
     # Configuración de la base de datos
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
@@ -42,9 +113,17 @@ class Settings(BaseSettings):
             username=values.get("POSTGRES_USER"),
             password=values.get("POSTGRES_PASSWORD"),
             host=values.get("POSTGRES_SERVER"),
-            path=f"/{values.get('POSTGRES_DB') or ''}",
+            path=values.get("POSTGRES_DB") or "",
         )
     
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "5"))  # conexiones psycopg2
+    DATABASE_POOL_TIMEOUT: float = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))  # espera por una conexión libre
+    
+    @property
+    def DATABASE_URL(self) -> str:
+        """DSN de PostgreSQL: el mismo `DATABASE_URL` que usa Prisma o el construido"""
+        return os.getenv("DATABASE_URL") or str(self.DATABASE_URI)
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,100 @@
+"""
+Acceso directo a PostgreSQL con psycopg2 para operaciones masivas.
+
+Prisma sigue siendo el cliente habitual de la base de datos local; este módulo
+se usa donde hacen falta operaciones por lotes que Prisma no ofrece, como
+`COPY` o `INSERT ... ON CONFLICT`. Las funciones son bloqueantes: desde código
+asíncrono deben llamarse con `asyncio.to_thread`.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import psycopg2
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedConnectionPool(ThreadedConnectionPool):
+    """
+    Pool de tamaño fijo en el que pedir una conexión espera a que quede una
+    libre (hasta `timeout` segundos) en lugar de fallar con `PoolError` en
+    cuanto se agotan. Las conexiones se abren todas al crearlo y se mantienen.
+    """
+
+    def __init__(self, size: int, timeout: float, *args, **kwargs):
+        super().__init__(size, size, *args, **kwargs)
+        self.timeout = timeout
+        self._available = threading.BoundedSemaphore(size)
+
+    def getconn(self, key=None):
+        if not self._available.acquire(timeout=self.timeout):
+            raise PoolError(f"Ninguna conexión libre en el pool tras {self.timeout} s")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._available.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._available.release()
+
+
+_pool: Optional[BoundedConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BoundedConnectionPool:
+    """Devuelve el pool de conexiones compartido, creándolo si no existe"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BoundedConnectionPool(
+                settings.DATABASE_POOL_SIZE, settings.DATABASE_POOL_TIMEOUT, dsn=settings.DATABASE_URL
+            )
+            logger.info(f"Pool de PostgreSQL creado (tamaño: {settings.DATABASE_POOL_SIZE})")
+        return _pool
+
+
+@contextmanager
+def connection() -> Iterator["psycopg2.extensions.connection"]:
+    """
+    Obtiene una conexión del pool dentro de una transacción.
+
+    Hace commit al salir sin errores y rollback si se produce una excepción.
+    Si la conexión se ha roto, se cierra en lugar de devolverla al pool y se
+    propaga el error original.
+    """
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        broken = conn.closed != 0
+        if not broken:
+            try:
+                conn.rollback()
+            except psycopg2.Error as e:
+                logger.warning(f"No se pudo deshacer la transacción; se descarta la conexión: {str(e)}")
+                broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
+
+
+def close_pool() -> None:
+    """Cierra todas las conexiones del pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
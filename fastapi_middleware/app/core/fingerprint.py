@@ -0,0 +1,121 @@
+"""
+Huellas de contenido para detectar registros sin cambios.
+
+Una huella es un hash estable del contenido de un registro ya mapeado: no
+depende del orden de las claves ni de la representación de los números, y
+excluye los campos volátiles (fechas de modificación...). Si la huella de un
+registro coincide con la guardada, no hace falta volver a escribirlo.
+
+Solo usa la biblioteca estándar, para que también puedan usarla los scripts
+de importación que se ejecutan fuera del middleware.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+# Tamaño del resumen en bytes (32 caracteres hexadecimales)
+DIGEST_SIZE = 16
+
+# Decimales con los que se comparan los números, para que 1 y 1.0, o
+# 0.1 + 0.2 y 0.3, den la misma huella
+FLOAT_PRECISION = 6
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        number = round(float(value), FLOAT_PRECISION)
+        return int(number) if number.is_integer() else number
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    return str(value)
+
+
+def fingerprint(values: Mapping[str, Any], exclude: Iterable[str] = ()) -> str:
+    """
+    Huella del contenido de un registro.
+
+    Args:
+        values: Campos del registro
+        exclude: Campos que no forman parte del contenido (volátiles)
+
+    Returns:
+        Resumen hexadecimal estable
+    """
+    excluded = set(exclude)
+    content = {k: _normalize(v) for k, v in values.items() if k not in excluded}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def fingerprint_file(path: str, chunk_size: int = 1 << 16) -> str:
+    """Huella del contenido binario de un fichero"""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FingerprintStore:
+    """
+    Huellas ya aplicadas, persistidas en un fichero JSON.
+
+    La usan los importadores para saltarse los ficheros y filas que no han
+    cambiado desde la última importación. Las huellas solo deben registrarse
+    después de aplicar el cambio, y el fichero se reescribe de forma atómica.
+
+    Args:
+        path: Fichero JSON donde se guardan las huellas
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Dict[str, str] = {}
+        self._dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self._data = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    def unchanged(self, key: str, digest: str) -> bool:
+        """True si `key` ya se aplicó con esta misma huella"""
+        return self._data.get(key) == digest
+
+    def update(self, key: str, digest: str) -> None:
+        if self._data.get(key) != digest:
+            self._data[key] = digest
+            self._dirty = True
+
+    def discard(self, key: str) -> None:
+        if self._data.pop(key, None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        """Escribir las huellas si han cambiado (fichero temporal + rename)"""
+        if not self._dirty:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.fingerprints-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -3,34 +3,91 @@ Configuración de logging para la aplicación FastAPI.
 
 Este módulo configura el sistema de logging con formato consistente,
 niveles de log apropiados y manejadores para diferentes entornos.
+
+Los registros no se escriben desde el event loop: el logger raíz solo tiene
+un `QueueHandler` que encola cada registro, y un `QueueListener` en su propio
+hilo los formatea y los escribe en consola y en el fichero rotativo. Con
+`LOG_FORMAT=json` cada registro es una línea JSON con los campos pasados en
+`extra` (método, ruta, estado, duración...).
 """
+import atexit
+import copy
 import logging
+import queue
 import sys
-import os
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
+
+import orjson
 
 from app.core.config import settings
 
+# Atributos propios de `LogRecord`; el resto son campos pasados en `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'taskName'}
+
+# Hilo que escribe los registros encolados
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Un objeto JSON por línea, con los campos de `extra` al mismo nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return orjson.dumps(data, default=str).decode()
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Encola el registro sin formatearlo: solo resuelve el mensaje y la traza
+    (que no se pueden pasar a otro hilo) y conserva los campos de `extra`
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
 
 def setup_logging():
     """
     Configura el sistema de logging para la aplicación.
     
     Configura:
-    - Formato de logs consistente
+    - Formato de logs consistente (JSON por línea o texto, según `LOG_FORMAT`)
     - Nivel de log según configuración
     - Salida a consola
     - Rotación de archivos de log en producción
+    - Escritura en un hilo aparte (`QueueHandler` + `QueueListener`)
     """
+    global _listener
+    
     # Crear directorio de logs si no existe
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
     
     # Configurar el formato del log
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    formatter = logging.Formatter(log_format)
+    if settings.LOG_FORMAT.lower() == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     
     # Configurar el nivel de log
     log_level = getattr(logging, settings.LOG_LEVEL.upper())
@@ -39,14 +96,16 @@ def setup_logging():
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
-    # Limpiar manejadores existentes
+    # Limpiar manejadores existentes (y el hilo de una configuración anterior)
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
     
     # Configurar manejador de consola
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # En producción, agregar manejador de archivo con rotación
     if not settings.DEBUG:
@@ -58,7 +117,14 @@ def setup_logging():
             encoding="utf-8"
         )
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # El event loop solo encola; la escritura se hace en el hilo del listener
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root_logger.addHandler(_QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
     
     # Configurar nivel de log para bibliotecas específicas
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
@@ -74,13 +140,21 @@ def setup_logging():
     logger.debug("Modo DEBUG activado" if settings.DEBUG else "Modo PRODUCCIÓN")
 
 
+def stop_logging():
+    """Escribir los registros pendientes y detener el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
     Obtiene un logger con el nombre especificado.
     
     Args:
         name: Nombre del logger. Si es None, devuelve el logger raíz.
-        
+    
     Returns:
         logging.Logger: Instancia del logger configurado.
     """
@@ -9,76 +9,90 @@ Incluye:
 import time
 import json
 import logging
-from typing import Callable, Awaitable
+import random
+import uuid
+from typing import Callable, Awaitable, Optional
 from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
-    Middleware para el logging de peticiones y respuestas HTTP.
+    Middleware ASGI para el logging de peticiones y respuestas HTTP.
+    
+    Registra una línea por petición (estructurada: método, ruta, estado,
+    duración, bytes, cliente...) cuando termina la respuesta, y añade las
+    cabeceras `X-Request-ID` y `X-Process-Time-MS`. Al ser ASGI puro no
+    envuelve la respuesta, así que las respuestas en streaming (SSE) pasan sin
+    acumularse.
     
-    Registra información detallada de cada petición entrante y su respuesta,
-    incluyendo tiempo de procesamiento, códigos de estado, etc.
+    Las peticiones correctas y rápidas se registran con probabilidad
+    `sample_rate`; los errores (estado >= 400 o excepción) y las que superan
+    `slow_ms` se registran siempre.
     """
     
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
-        # Obtener información de la petición
-        request_id = request.headers.get('x-request-id', '')
-        client_host = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get('user-agent', '')
+    def __init__(self, app: ASGIApp, sample_rate: Optional[float] = None, slow_ms: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.LOG_REQUEST_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_ms = settings.LOG_SLOW_REQUEST_MS if slow_ms is None else slow_ms
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Registrar inicio de la petición
-        logger.info(
-            f"Inicio de petición: {request.method} {request.url.path} - "
-            f"ID: {request_id} - Cliente: {client_host} - User-Agent: {user_agent}"
-        )
+        start_time = time.perf_counter()
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id") or uuid.uuid4().hex
+        # Disponible en los manejadores como `request.state.request_id`
+        scope.setdefault("state", {})["request_id"] = request_id
+        status_code = 500
+        response_bytes = 0
         
-        # Medir tiempo de procesamiento
-        start_time = time.time()
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Agregar encabezados de tiempo de respuesta (hasta las cabeceras)
+                process_time = round((time.perf_counter() - start_time) * 1000, 2)
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Process-Time-MS"] = str(process_time)
+                response_headers["X-Request-ID"] = request_id
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
         
+        error = None
         try:
-            # Procesar la petición
-            response = await call_next(request)
-            
-            # Calcular tiempo de procesamiento
-            process_time = (time.time() - start_time) * 1000
-            process_time = round(process_time, 2)
-            
-            # Registrar respuesta exitosa
-            logger.info(
-                f"Respuesta: {request.method} {request.url.path} - "
-                f"Status: {response.status_code} - "
-                f"Tiempo: {process_time}ms - "
-                f"ID: {request_id}"
-            )
-            
-            # Agregar encabezados de tiempo de respuesta
-            response.headers["X-Process-Time-MS"] = str(process_time)
-            response.headers["X-Request-ID"] = request_id
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            # Calcular tiempo hasta el error
-            process_time = (time.time() - start_time) * 1000
-            process_time = round(process_time, 2)
-            
-            # Registrar error
-            logger.error(
-                f"Error en petición: {request.method} {request.url.path} - "
-                f"Error: {str(e)} - "
-                f"Tiempo: {process_time}ms - "
-                f"ID: {request_id}",
-                exc_info=True
-            )
-            
-            # Re-lanzar la excepción para que sea manejada por los manejadores de excepciones de FastAPI
+            error = e
             raise
+        finally:
+            process_time = round((time.perf_counter() - start_time) * 1000, 2)
+            if error is not None or status_code >= 400 or process_time >= self.slow_ms or random.random() < self.sample_rate:
+                client = scope.get("client")
+                fields = {
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": process_time,
+                    "bytes": response_bytes,
+                    "client": client[0] if client else None,
+                    "user_agent": headers.get("user-agent"),
+                }
+                if error is not None:
+                    fields["error"] = f"{type(error).__name__}: {error}"
+                level = logging.ERROR if error is not None or status_code >= 500 else (
+                    logging.WARNING if status_code >= 400 else logging.INFO
+                )
+                logger.log(level, f"{scope['method']} {scope['path']} {status_code} {process_time}ms", extra=fields)
 
 
 class ErrorHandlerMiddleware(BaseHTTPMiddleware):
@@ -0,0 +1,305 @@
+"""
+Cliente asíncrono para comunicarse con Odoo a través de JSON-RPC.
+
+Expone la misma interfaz que `OdooClient` (`execute_kw`, `search_read`, `read`,
+`create`, `write`, `unlink`) pero sin bloquear el event loop de uvicorn: las
+llamadas viajan sobre un `httpx.AsyncClient` compartido con un pool de
+conexiones keep-alive, de modo que un mismo worker puede tener decenas de
+llamadas a Odoo en curso a la vez.
+"""
+import asyncio
+import itertools
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Métodos del módulo `odoo_api_rest` que agrupan varias operaciones en una llamada
+PAGE_METHOD = 'api_search_read_page'
+BATCH_METHOD = 'api_execute_batch'
+BATCH_MODEL = 'res.users'
+
+
+def missing_method(error: Exception, method: str) -> bool:
+    """Si Odoo ha rechazado la llamada porque el método no existe (módulo sin instalar)"""
+    text = str(error)
+    return method in text and 'does not exist' in text
+
+
+class OdooRPCError(Exception):
+    """Error devuelto por Odoo en una respuesta JSON-RPC."""
+
+    def __init__(self, message: str, data: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.data = data or {}
+
+
+class AsyncOdooClient:
+    """Cliente asíncrono para Odoo (JSON-RPC) con reintentos y pool de conexiones"""
+
+    def __init__(self):
+        self.url = settings.ODOO_URL
+        self.db = settings.ODOO_DB
+        self.username = settings.ODOO_USERNAME
+        self.password = settings.ODOO_PASSWORD
+        self.uid = None
+        self.max_retries = 3
+        self.retry_delay = 1  # segundos
+        self._client: Optional[httpx.AsyncClient] = None
+        self._auth_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        # Si Odoo tiene instalados los métodos de `odoo_api_rest` (None: sin comprobar)
+        self._api_methods: Optional[bool] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente HTTP compartido (se crea en el primer uso)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.url,
+                timeout=httpx.Timeout(settings.ODOO_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.ODOO_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.ODOO_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Cerrar el pool de conexiones HTTP"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _call(self, service: str, method: str, *args) -> Any:
+        """Realizar una llamada JSON-RPC a un servicio de Odoo"""
+        payload = {
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {'service': service, 'method': method, 'args': list(args)},
+            'id': next(self._ids),
+        }
+        response = await self.client.post('/jsonrpc', json=payload)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('error'):
+            error = data['error']
+            error_data = error.get('data') or {}
+            raise OdooRPCError(error_data.get('message') or error.get('message', 'Error de Odoo'), error_data)
+        return data.get('result')
+
+    async def authenticate(self, username=None, password=None) -> Optional[int]:
+        """Autenticar con Odoo y obtener el UID con reintentos"""
+        service_login = username is None and password is None
+        username = username or self.username
+        password = password or self.password
+
+        for attempt in range(self.max_retries):
+            try:
+                uid = await self._call('common', 'authenticate', self.db, username, password, {})
+                if uid:
+                    # Solo las credenciales del servicio fijan el UID usado en execute_kw
+                    if service_login:
+                        self.uid = uid
+                    logger.info(f"Autenticación exitosa con Odoo como {username} (uid: {uid})")
+                    return uid
+                logger.warning(f"Autenticación fallida con Odoo como {username} (intento {attempt+1}/{self.max_retries})")
+                return None
+            except Exception as e:
+                logger.error(f"Error al autenticar con Odoo (intento {attempt+1}/{self.max_retries}): {str(e)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay)
+
+        logger.error(f"No se pudo autenticar con Odoo después de {self.max_retries} intentos")
+        return None
+
+    async def _ensure_uid(self) -> int:
+        """Autenticar una sola vez aunque haya varias peticiones concurrentes"""
+        if not self.uid:
+            async with self._auth_lock:
+                if not self.uid:
+                    await self.authenticate()
+        if not self.uid:
+            raise Exception("No se pudo autenticar con Odoo")
+        return self.uid
+
+    async def execute_kw(self, model, method, args, kw=None):
+        """Ejecutar un método en un modelo de Odoo con reintentos"""
+        kw = kw or {}
+        for attempt in range(self.max_retries):
+            uid = await self._ensure_uid()
+            try:
+                return await self._call(
+                    'object', 'execute_kw', self.db, uid, self.password, model, method, args, kw
+                )
+            except OdooRPCError as e:
+                # Los errores de negocio de Odoo no se reintentan, salvo sesión caducada
+                if 'AccessDenied' in e.data.get('name', '') and attempt < self.max_retries - 1:
+                    logger.warning("Credenciales rechazadas por Odoo, reautenticando...")
+                    self.uid = None
+                    continue
+                logger.error(f"Error al ejecutar método {method} en {model}: {str(e)}")
+                raise
+            except httpx.HTTPError as e:
+                logger.error(f"Error al ejecutar método {method} en {model} (intento {attempt+1}/{self.max_retries}): {str(e)}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    raise
+
+    async def search_count(self, model, domain=None) -> int:
+        """Contar registros de un modelo de Odoo"""
+        return await self.execute_kw(model, 'search_count', [domain or []])
+
+    async def search_read(self, model, domain=None, fields=None, limit=None, offset=None, order=None):
+        """Buscar y leer registros de un modelo de Odoo con mejor manejo de errores"""
+        domain = domain or []
+        fields = fields or []
+        kw = {'fields': fields}
+        if limit:
+            kw['limit'] = limit
+        if offset:
+            kw['offset'] = offset
+        if order:
+            kw['order'] = order
+
+        try:
+            result = await self.execute_kw(model, 'search_read', [domain], kw)
+            logger.debug(f"Recuperados {len(result) if result else 0} registros del modelo {model}")
+            return result
+        except Exception as e:
+            logger.error(f"Error al buscar y leer registros en {model}: {str(e)}")
+            # Devolver una lista vacía en lugar de propagar el error
+            return []
+
+    async def search_read_page(
+        self, model, domain=None, fields=None, limit=None, offset=None, order=None, count=True
+    ) -> Dict[str, Any]:
+        """
+        Una página de registros y el total del dominio en una sola llamada
+        (`api_search_read_page`). Si Odoo no tiene el método, se hacen
+        `search_count` y `search_read` en paralelo.
+
+        A diferencia de `search_read`, los errores se propagan.
+
+        Returns:
+            {'records': [...], 'length': total o None si `count` es False}
+        """
+        domain = domain or []
+        kw = {'fields': fields or [], 'count': count}
+        if limit:
+            kw['limit'] = limit
+        if offset:
+            kw['offset'] = offset
+        if order:
+            kw['order'] = order
+
+        if self._api_methods is not False:
+            try:
+                result = await self.execute_kw(model, PAGE_METHOD, [domain], kw)
+                self._api_methods = True
+                return result
+            except OdooRPCError as e:
+                if not missing_method(e, PAGE_METHOD):
+                    raise
+                logger.warning("Odoo no tiene el módulo odoo_api_rest actualizado; se usarán llamadas separadas")
+                self._api_methods = False
+
+        kw.pop('count')
+        search = self.execute_kw(model, 'search_read', [domain], kw)
+        if not count:
+            return {'records': await search, 'length': None}
+        length, records = await asyncio.gather(self.search_count(model, domain), search)
+        return {'records': records, 'length': length}
+
+    async def execute_batch(self, calls: List[Tuple[str, str, list, Optional[dict]]]) -> List[Any]:
+        """
+        Varias operaciones `(modelo, método, args, kwargs)` en una sola petición
+        HTTP (`api_execute_batch`). Si Odoo no tiene el método, se envían en
+        paralelo por separado.
+
+        Returns:
+            Resultado de cada operación, en el mismo orden
+        """
+        calls = [(model, method, list(args), kw or {}) for model, method, args, kw in calls]
+        if self._api_methods is not False:
+            try:
+                results = await self.execute_kw(BATCH_MODEL, BATCH_METHOD, [[list(c) for c in calls]])
+                self._api_methods = True
+                return results
+            except OdooRPCError as e:
+                if not missing_method(e, BATCH_METHOD):
+                    raise
+                logger.warning("Odoo no tiene el módulo odoo_api_rest actualizado; se usarán llamadas separadas")
+                self._api_methods = False
+        return list(await asyncio.gather(*(self.execute_kw(*call) for call in calls)))
+
+    async def iter_batches(
+        self, model, domain=None, fields=None, batch_size=500, start_after=0
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Recorrer un modelo por lotes con paginación keyset (`id > último id`),
+        igual que `OdooBaseService.iter_batches`. A diferencia de `search_read`,
+        los errores se propagan para no dar por terminado un recorrido incompleto.
+        """
+        last_id = start_after
+        kw = {'fields': fields or [], 'limit': batch_size, 'order': 'id asc'}
+        while True:
+            batch = await self.execute_kw(
+                model, 'search_read', [list(domain or []) + [('id', '>', last_id)]], kw
+            )
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]['id']
+            if len(batch) < batch_size:
+                return
+
+    async def read(self, model, ids, fields=None):
+        """Leer registros de un modelo de Odoo por IDs con mejor manejo de errores"""
+        fields = fields or []
+        try:
+            result = await self.execute_kw(model, 'read', [ids, fields])
+            logger.debug(f"Leídos {len(result) if result else 0} registros del modelo {model}")
+            return result
+        except Exception as e:
+            logger.error(f"Error al leer registros en {model} con IDs {ids}: {str(e)}")
+            # Devolver una lista vacía en lugar de propagar el error
+            return []
+
+    async def create(self, model, values):
+        """Crear un registro en un modelo de Odoo"""
+        try:
+            result = await self.execute_kw(model, 'create', [values])
+            logger.info(f"Registro creado en {model} con ID: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"Error al crear registro en {model}: {str(e)}")
+            raise
+
+    async def write(self, model, ids, values):
+        """Actualizar registros en un modelo de Odoo"""
+        try:
+            result = await self.execute_kw(model, 'write', [ids, values])
+            logger.info(f"Registros actualizados en {model} con IDs: {ids}")
+            return result
+        except Exception as e:
+            logger.error(f"Error al actualizar registros en {model} con IDs {ids}: {str(e)}")
+            raise
+
+    async def unlink(self, model, ids):
+        """Eliminar registros de un modelo de Odoo"""
+        try:
+            result = await self.execute_kw(model, 'unlink', [ids])
+            logger.info(f"Registros eliminados en {model} con IDs: {ids}")
+            return result
+        except Exception as e:
+            logger.error(f"Error al eliminar registros en {model} con IDs {ids}: {str(e)}")
+            raise
+
+# Instancia global del cliente asíncrono de Odoo
+async_odoo_client = AsyncOdooClient()
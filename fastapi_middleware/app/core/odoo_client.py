@@ -1,5 +1,5 @@
-import xmlrpc.client
 from app.core.config import settings
+from app.core.xmlrpc_pool import server_proxy
 import logging
 import time
 from typing import Optional, Dict, Any, List
@@ -22,8 +22,9 @@ class OdooClient:
     def _init_connections(self):
         """Inicializar conexiones a Odoo"""
         try:
-            self.common = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/common')
-            self.models = xmlrpc.client.ServerProxy(f'{self.url}/xmlrpc/2/object')
+            # Los proxies comparten el pool de conexiones keep-alive del servidor
+            self.common = server_proxy(self.url, 'common', settings.ODOO_POOL_SIZE)
+            self.models = server_proxy(self.url, 'object', settings.ODOO_POOL_SIZE)
             logger.info(f"Conexión establecida con Odoo en {self.url}")
         except Exception as e:
             logger.error(f"Error al inicializar conexiones con Odoo: {str(e)}")
@@ -46,7 +47,6 @@ class OdooClient:
                 logger.error(f"Error al autenticar con Odoo (intento {attempt+1}/{self.max_retries}): {str(e)}")
                 if attempt < self.max_retries - 1:
                     time.sleep(self.retry_delay)
-                    self._init_connections()  # Reiniciar conexiones
         
         logger.error(f"No se pudo autenticar con Odoo después de {self.max_retries} intentos")
         return None
@@ -70,8 +70,7 @@ class OdooClient:
                 logger.error(f"Error al ejecutar método {method} en {model} (intento {attempt+1}/{self.max_retries}): {str(e)}")
                 if attempt < self.max_retries - 1:
                     time.sleep(self.retry_delay)
-                    # Reintentar autenticación si es necesario
-                    self._init_connections()
+                    # El pool descarta las conexiones rotas; basta con reautenticar
                     self.authenticate()
                 else:
                     raise
@@ -0,0 +1,214 @@
+"""
+Paginación por cursor para los listados.
+
+El cursor es un token opaco (JSON en base64 URL) con los valores del orden y
+el `id` de la última fila devuelta; la página siguiente se pide con un filtro
+"después de estos valores" (keyset) en lugar de un `offset`, así que las
+páginas profundas cuestan lo mismo que la primera. Si algún valor no sirve
+para comparar (vacío en Odoo, relaciones...) el cursor guarda el `offset`.
+
+El token incluye la huella de la consulta (filtros y orden): un cursor usado
+con otros filtros se rechaza en lugar de devolver una página incoherente.
+
+Los totales son opcionales y se cachean por consulta normalizada durante
+`LIST_TOTAL_CACHE_TTL`, de modo que recorrer un listado no repite el
+`search_count` en cada página; cuando hacen falta, se piden a Odoo en la
+misma llamada que la página.
+"""
+import base64
+import hashlib
+import json
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.odoo_async_client import async_odoo_client
+
+# Totales por huella de los filtros
+total_cache = TTLCache(maxsize=settings.LIST_TOTAL_CACHE_SIZE, ttl=settings.LIST_TOTAL_CACHE_TTL)
+
+
+class InvalidCursor(Exception):
+    """El cursor está mal formado o pertenece a otra consulta"""
+
+
+class Page(NamedTuple):
+    """Posición de la página pedida"""
+    offset: int
+    after: Optional[List[Any]] = None  # valores del orden de la última fila vista
+
+
+def order_terms(order: str) -> List[Tuple[str, bool]]:
+    """
+    Términos (campo, descendente) de un orden al estilo de Odoo, con `id` como
+    desempate para que el orden sea total
+    """
+    terms = []
+    for term in order.split(','):
+        parts = term.split()
+        if parts:
+            terms.append((parts[0], len(parts) > 1 and parts[1].lower() == 'desc'))
+    if 'id' not in (field for field, _ in terms):
+        terms.append(('id', False))
+    return terms
+
+
+def order_string(terms: List[Tuple[str, bool]]) -> str:
+    return ', '.join(f"{field} {'desc' if descending else 'asc'}" for field, descending in terms)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in sorted(value.items()) if v is not None}
+    return value
+
+
+def query_key(*parts: Any) -> str:
+    """Huella de una consulta normalizada (sin mayúsculas ni espacios sobrantes)"""
+    encoded = json.dumps(_normalize(list(parts)), sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+def _comparable(value: Any) -> bool:
+    return value is not None and not isinstance(value, (bool, list, tuple, dict))
+
+
+def encode_cursor(key: str, offset: int, values: Optional[List[Any]] = None) -> str:
+    data: Dict[str, Any] = {'q': key, 'o': offset}
+    if values is not None and all(_comparable(v) for v in values):
+        data['k'] = [float(v) if isinstance(v, Decimal) else v for v in values]
+    raw = json.dumps(data, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], key: str, offset: int = 0) -> Page:
+    """
+    Posición de la página pedida; sin cursor, la del `offset` clásico.
+
+    Raises:
+        InvalidCursor: si el cursor no es válido para esta consulta
+    """
+    if not cursor:
+        return Page(offset=offset)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+        page = Page(offset=int(data['o']), after=data.get('k'))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Cursor no válido: {str(e)}")
+    if data.get('q') != key:
+        raise InvalidCursor("El cursor pertenece a otra consulta (filtros u orden distintos)")
+    return page
+
+
+def next_cursor(
+    key: str,
+    page: Page,
+    returned: int,
+    limit: int,
+    last_values: Optional[List[Any]],
+) -> Optional[str]:
+    """Cursor de la página siguiente, o None si esta era la última"""
+    if returned < limit:
+        return None
+    return encode_cursor(key, page.offset + returned, last_values)
+
+
+def keyset_domain(terms: List[Tuple[str, bool]], values: List[Any]) -> List[Any]:
+    """
+    Dominio de Odoo para las filas posteriores a `values` en el orden `terms`:
+    `(a > va) OR (a = va AND b > vb) OR ...`, en notación prefija
+    """
+    branches = []
+    for i, (field, descending) in enumerate(terms):
+        branch = [(f, '=', v) for (f, _), v in zip(terms[:i], values[:i])]
+        branch.append((field, '<' if descending else '>', values[i]))
+        branches.append(['&'] * (len(branch) - 1) + branch)
+    domain: List[Any] = ['|'] * (len(branches) - 1)
+    for branch in branches:
+        domain.extend(branch)
+    return domain
+
+
+def keyset_sql(terms: List[Tuple[str, bool]], values: List[Any]) -> Tuple[str, List[Any]]:
+    """
+    Condición SQL equivalente a `keyset_domain` sobre columnas ya validadas
+
+    Returns:
+        Tupla (condición, parámetros)
+    """
+    branches = []
+    params: List[Any] = []
+    for i, (column, descending) in enumerate(terms):
+        parts = [f'{c} = %s' for c, _ in terms[:i]]
+        parts.append(f"{column} {'<' if descending else '>'} %s")
+        params += values[:i + 1]
+        branches.append(f"({' AND '.join(parts)})")
+    return f"({' OR '.join(branches)})", params
+
+
+async def read_odoo_page(
+    model: str,
+    domain: List[Any],
+    fields: List[str],
+    limit: int,
+    page: Page,
+    terms: List[Tuple[str, bool]],
+    total_key: Optional[str] = None,
+) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """
+    Una página de un listado de Odoo en una sola llamada RPC.
+
+    Con cursor se filtra por `keyset_domain` en lugar de usar `offset`. Si se
+    pasa `total_key` y el total no está en caché, se obtiene en la misma
+    llamada: con `api_search_read_page`, o con un lote `search_read` +
+    `search_count` cuando el dominio de la página no es el del total.
+
+    Returns:
+        Tupla (total o None, registros de la página)
+    """
+    page_domain, offset = domain, page.offset
+    if page.after is not None:
+        page_domain, offset = list(domain) + keyset_domain(terms, page.after), 0
+    order = order_string(terms)
+
+    total = total_cache.get(total_key) if total_key else None
+    if total_key is None or total is not None:
+        result = await async_odoo_client.search_read_page(
+            model, page_domain, fields, limit=limit, offset=offset, order=order, count=False
+        )
+        return total, result['records']
+
+    if page_domain is domain:
+        result = await async_odoo_client.search_read_page(
+            model, domain, fields, limit=limit, offset=offset, order=order
+        )
+        records, total = result['records'], result['length']
+    else:
+        records, total = await async_odoo_client.execute_batch([
+            (model, 'search_read', [page_domain], {'fields': fields, 'limit': limit, 'order': order}),
+            (model, 'search_count', [domain], None),
+        ])
+    total_cache.set(total_key, total)
+    return total, records
+
+
+def page_info(
+    total: Optional[int],
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+) -> Dict[str, Any]:
+    """Campos de paginación comunes a todas las respuestas de listado"""
+    return {
+        'total': total,
+        'page': (offset // limit) + 1 if limit > 0 else 1,
+        'page_size': limit,
+        'pages': ((total + limit - 1) // limit if limit > 0 else 1) if total is not None else None,
+        'next_cursor': cursor,
+    }
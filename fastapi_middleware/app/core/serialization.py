@@ -0,0 +1,130 @@
+"""
+Serialización rápida de las respuestas de lectura.
+
+Los listados de productos se construían como diccionario por fila, se
+validaban con `Product(**producto)` (convirtiendo una docena de `Decimal`) y
+FastAPI volvía a validarlos y serializarlos con `response_model`. Aquí:
+
+- `compile_mapper` genera, a partir del modelo pydantic y de una expresión
+  por campo, una función que pasa una fila de Odoo o del catálogo local
+  directamente a la forma de salida, con los mismos valores que produciría
+  pydantic en JSON (`Decimal` como texto, `False` de Odoo como `null`).
+- `JSONBytesResponse` serializa con orjson sin volver a validar.
+
+Las rutas conservan su `response_model` para el esquema OpenAPI; al devolver
+la respuesta ya serializada, FastAPI no la valida de nuevo.
+"""
+import typing
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+
+def _text(value: Any) -> Optional[str]:
+    """Campos de texto: Odoo devuelve `False` cuando están vacíos"""
+    return None if value is False else value
+
+
+def _integer(value: Any) -> Optional[int]:
+    """Enteros y many2one ya resueltos a su id (`False` si están vacíos)"""
+    return None if value is False else value
+
+
+def _decimal(value: Any) -> Optional[str]:
+    """Importes como texto, igual que serializa pydantic un `Decimal`"""
+    if value is None or value is False:
+        return None
+    if isinstance(value, Decimal):
+        return str(value)
+    return str(Decimal(str(value)))
+
+
+# Conversión de salida según el tipo declarado en el modelo
+_CONVERTERS = {str: '_text', int: '_integer', Decimal: '_decimal', bool: 'bool'}
+
+
+def _converter(annotation: Any) -> Optional[str]:
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        annotation = args[0]
+    return _CONVERTERS.get(annotation)
+
+
+def compile_mapper(
+    model: Type[BaseModel],
+    sources: Dict[str, str],
+    namespace: Optional[Dict[str, Any]] = None,
+    name: str = 'map_row',
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Compilar una función fila → diccionario con los campos de `model`, en su
+    orden y con su conversión de tipo.
+
+    Args:
+        model: Modelo pydantic de la salida (define campos, orden y tipos)
+        sources: Expresión Python de cada campo sobre la fila `r`; los campos
+            que no aparecen toman su valor por defecto del modelo
+        namespace: Funciones y constantes que usan las expresiones
+        name: Nombre de la función generada (aparece en las trazas)
+
+    Raises:
+        ValueError: si un campo obligatorio no tiene expresión
+    """
+    unknown = set(sources) - set(model.model_fields)
+    if unknown:
+        raise ValueError(f"Campos desconocidos en {model.__name__}: {', '.join(sorted(unknown))}")
+
+    items = []
+    for field_name, field in model.model_fields.items():
+        expr = sources.get(field_name)
+        if expr is None:
+            if field.default is PydanticUndefined:
+                raise ValueError(f"Falta la expresión del campo obligatorio {model.__name__}.{field_name}")
+            expr = repr(field.default)
+        converter = _converter(field.annotation)
+        items.append(f"        {field_name!r}: {converter}({expr})," if converter else f"        {field_name!r}: {expr},")
+
+    source = f"def {name}(r):\n    return {{\n" + '\n'.join(items) + "\n    }\n"
+    scope: Dict[str, Any] = {'_text': _text, '_integer': _integer, '_decimal': _decimal, **(namespace or {})}
+    exec(compile(source, f"<{model.__name__}:{name}>", 'exec'), scope)
+    return scope[name]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json')
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON en bytes (orjson); `Decimal` como texto, igual que pydantic"""
+    return orjson.dumps(content, default=_default)
+
+
+class JSONBytesResponse(Response):
+    """Respuesta JSON serializada con orjson, sin validar contra `response_model`"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def json_response(
+    content: Any,
+    response: Optional[Response] = None,
+    status_code: int = 200,
+) -> JSONBytesResponse:
+    """
+    Respuesta ya serializada de una ruta, con las cabeceras que se hayan puesto
+    en el `Response` inyectado (ETag, Cache-Control...)
+    """
+    headers = dict(response.headers) if response is not None else None
+    return JSONBytesResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,260 @@
+"""
+Pool de conexiones keep-alive para los clientes XML-RPC de Odoo.
+
+`xmlrpc.client.ServerProxy` con el transporte por defecto abre una conexión TCP
+por llamada y no se puede compartir entre hilos. Este módulo ofrece un
+transporte seguro para hilos que reutiliza conexiones HTTP/1.1 persistentes de
+un pool de tamaño configurable, comprueba su estado antes de reutilizarlas y
+lleva estadísticas de reutilización.
+
+Solo depende de la biblioteca estándar para que también lo puedan usar los
+scripts de importación que se ejecutan fuera de la aplicación FastAPI.
+"""
+import http.client
+import logging
+import os
+import select
+import threading
+import time
+import xmlrpc.client
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.getenv("ODOO_POOL_SIZE", "10"))
+DEFAULT_TIMEOUT = float(os.getenv("ODOO_TIMEOUT", "30"))
+# Tiempo máximo que una conexión puede estar ociosa antes de descartarla
+DEFAULT_MAX_IDLE = float(os.getenv("ODOO_POOL_MAX_IDLE", "60"))
+
+
+class _PooledConnection:
+    """Conexión HTTP del pool con sus metadatos de uso."""
+
+    __slots__ = ("conn", "created_at", "last_used", "uses")
+
+    def __init__(self, conn: http.client.HTTPConnection):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class XMLRPCConnectionPool:
+    """
+    Pool de conexiones HTTP persistentes hacia un servidor Odoo.
+
+    Args:
+        url: URL base del servidor (esquema, host y puerto)
+        size: Número máximo de conexiones abiertas a la vez
+        timeout: Timeout de socket en segundos
+        max_idle: Segundos de inactividad tras los que se descarta una conexión
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_idle: float = DEFAULT_MAX_IDLE,
+    ):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.netloc
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "requests": 0,
+        }
+
+    def _new_connection(self) -> _PooledConnection:
+        if self.scheme == "https":
+            conn = http.client.HTTPSConnection(self.host, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, timeout=self.timeout)
+        self._stats["created"] += 1
+        return _PooledConnection(conn)
+
+    def _is_healthy(self, pconn: _PooledConnection) -> bool:
+        """Comprueba que una conexión ociosa sigue siendo reutilizable."""
+        if time.monotonic() - pconn.last_used > self.max_idle:
+            return False
+        sock = pconn.conn.sock
+        if sock is None:
+            return False
+        try:
+            # Un socket ocioso legible significa que el servidor lo ha cerrado
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def acquire(self) -> _PooledConnection:
+        """Obtiene una conexión del pool, esperando si está completo."""
+        with self._cond:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                while self._idle:
+                    pconn = self._idle.pop()
+                    if self._is_healthy(pconn):
+                        self._in_use += 1
+                        self._stats["reused"] += 1
+                        return pconn
+                    self._stats["health_check_failures"] += 1
+                    self._stats["discarded"] += 1
+                    pconn.conn.close()
+                if self._in_use < self.size:
+                    self._in_use += 1
+                    return self._new_connection()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No hay conexiones libres en el pool XML-RPC de {self.host}"
+                    )
+                self._cond.wait(remaining)
+
+    def release(self, pconn: _PooledConnection, reusable: bool = True) -> None:
+        """Devuelve una conexión al pool o la cierra si no es reutilizable."""
+        with self._cond:
+            self._in_use -= 1
+            self._stats["requests"] += 1
+            if reusable:
+                pconn.uses += 1
+                pconn.last_used = time.monotonic()
+                self._idle.append(pconn)
+            else:
+                self._stats["discarded"] += 1
+                pconn.conn.close()
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Cierra todas las conexiones ociosas."""
+        with self._cond:
+            for pconn in self._idle:
+                pconn.conn.close()
+            self._idle.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso y reutilización de conexiones."""
+        with self._cond:
+            return {
+                **self._stats,
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            }
+
+
+class PooledTransport(xmlrpc.client.Transport):
+    """Transporte XML-RPC seguro para hilos que usa un `XMLRPCConnectionPool`."""
+
+    def __init__(self, pool: XMLRPCConnectionPool, use_datetime=False, use_builtin_types=False):
+        super().__init__(use_datetime=use_datetime, use_builtin_types=use_builtin_types)
+        self.pool = pool
+        self.verbose = False
+
+    def request(self, host, handler, request_body, verbose=False):
+        # Un reintento si el servidor cerró una conexión reutilizada
+        for attempt in (0, 1):
+            pconn = self.pool.acquire()
+            reused = pconn.uses > 0
+            try:
+                pconn.conn.request(
+                    "POST",
+                    handler,
+                    body=request_body,
+                    headers={
+                        "Content-Type": "text/xml",
+                        "User-Agent": self.user_agent,
+                        "Accept-Encoding": "identity",
+                    },
+                )
+                response = pconn.conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError, BrokenPipeError):
+                self.pool.release(pconn, reusable=False)
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                self.pool.release(pconn, reusable=False)
+                raise
+
+            try:
+                if response.status != 200:
+                    response.read()
+                    raise xmlrpc.client.ProtocolError(
+                        host + handler, response.status, response.reason,
+                        dict(response.getheaders())
+                    )
+                # parse_response consume la respuesta completa, por lo que la
+                # conexión queda lista para la siguiente petición
+                result = self.parse_response(response)
+            except xmlrpc.client.Fault:
+                self.pool.release(pconn, reusable=not response.will_close)
+                raise
+            except Exception:
+                self.pool.release(pconn, reusable=False)
+                raise
+            self.pool.release(pconn, reusable=not response.will_close)
+            return result
+
+    def close(self):
+        # Las conexiones pertenecen al pool, no al transporte
+        pass
+
+
+_pools: Dict[str, XMLRPCConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(url: str, size: Optional[int] = None) -> XMLRPCConnectionPool:
+    """
+    Devuelve el pool compartido para la URL indicada, creándolo si no existe.
+
+    Args:
+        url: URL base del servidor Odoo
+        size: Tamaño del pool (solo se aplica al crearlo)
+    """
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = XMLRPCConnectionPool(key, size=size or DEFAULT_POOL_SIZE)
+            _pools[key] = pool
+            logger.info(f"Pool XML-RPC creado para {key} (tamaño: {pool.size})")
+        return pool
+
+
+def server_proxy(url: str, service: str, pool_size: Optional[int] = None) -> xmlrpc.client.ServerProxy:
+    """
+    Crea un `ServerProxy` para un servicio XML-RPC de Odoo (`common` u `object`)
+    que comparte el pool de conexiones de su servidor.
+
+    Args:
+        url: URL base del servidor Odoo
+        service: Nombre del servicio XML-RPC
+        pool_size: Tamaño del pool si todavía no existe
+    """
+    pool = get_pool(url, pool_size)
+    return xmlrpc.client.ServerProxy(
+        f"{url.rstrip('/')}/xmlrpc/2/{service}",
+        transport=PooledTransport(pool),
+        allow_none=True,
+    )
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de todos los pools, indexadas por servidor."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key: pool.stats() for key, pool in pools.items()}
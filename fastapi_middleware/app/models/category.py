@@ -27,7 +27,8 @@ class Category(CategoryBase):
 class CategoryList(BaseModel):
     """Modelo para listar categorías con paginación"""
     data: List[Category]
-    total: int
+    total: Optional[int] = Field(None, description="Total de resultados (si se pide con with_total)")
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente; vacío en la última")
@@ -70,10 +70,50 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+class FacetValue(BaseModel):
+    """Recuento de productos de un valor de faceta"""
+    value: str = Field(..., description="Valor que se envía como filtro")
+    label: str = Field(..., description="Texto a mostrar")
+    count: int
+
 class ProductList(BaseModel):
     """Modelo para listar productos con paginación"""
     data: List[Product]
-    total: int
+    total: Optional[int] = Field(None, description="Total de resultados (si se pide con with_total)")
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente; vacío en la última")
+    facets: Optional[Dict[str, List[FacetValue]]] = Field(
+        None, description="Recuentos por marca, proveedor, categoría, stock y precio (si se piden)"
+    )
+
+class ProductSuggestion(BaseModel):
+    """Sugerencia de autocompletado"""
+    type: str = Field(..., description="product, brand o category")
+    id: Optional[int] = Field(None, description="ID del producto o de la categoría")
+    text: str = Field(..., description="Texto a mostrar")
+    sku: Optional[str] = Field(None, description="Referencia interna del producto")
+    image_url: Optional[str] = None
+
+class ProductSuggestionList(BaseModel):
+    """Sugerencias de autocompletado para una consulta"""
+    query: str
+    data: List[ProductSuggestion]
+
+class ProductLookup(BaseModel):
+    """Productos que coinciden con un código escaneado o tecleado"""
+    code: str
+    matched_by: Optional[str] = Field(
+        None, description="barcode, sku o supplier_code; vacío si no hay coincidencias"
+    )
+    data: List[Product]
+
+class ProductLookupRequest(BaseModel):
+    """Códigos a buscar de una vez (p. ej. un albarán escaneado)"""
+    codes: List[str] = Field(..., min_length=1, max_length=500)
+    consistency: str = Field("eventual", pattern="^(eventual|strong)$")
+
+class ProductLookupBatch(BaseModel):
+    """Resultado de cada código, en el orden de la petición"""
+    results: List[ProductLookup]
@@ -44,7 +44,8 @@ class Supplier(SupplierBase):
 class SupplierList(BaseModel):
     """Modelo para listar proveedores con paginación"""
     data: List[Supplier]
-    total: int
+    total: Optional[int] = Field(None, description="Total de resultados (si se pide con with_total)")
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente; vacío en la última")
@@ -16,7 +16,7 @@ async def login_for_access_token(form_data: UserLogin):
     """
     Autenticar usuario y obtener token de acceso
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,7 +44,7 @@ async def login_for_access_token_oauth(form_data: OAuth2PasswordRequestForm = De
     """
     Autenticar usuario y obtener token de acceso (OAuth2)
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,33 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
 from typing import Optional, List
+from app.core.pagination import InvalidCursor
 from app.models.auth import User
 from app.models.category import Category, CategoryCreate, CategoryUpdate, CategoryList
 from app.services.auth import get_current_user
+from app.services.catalog_version import CATEGORY_TABLES, conditional_get
 from app.services.category import get_categories, get_category, create_category, update_category, delete_category
+from app.core.odoo_async_client import async_odoo_client
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/categories", tags=["Categorías"])
 
+# Cambian poco: el navegador las reutiliza unos segundos y después revalida con el ETag
+CACHE_CONTROL = "private, max-age=30"
+
 @router.get("", response_model=CategoryList)
 async def read_categories(
+    request: Request,
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     search: Optional[str] = None,
     parent_id: Optional[int] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (sustituye a offset)"),
+    with_total: Optional[bool] = Query(None, description="Calcular el total (por defecto, solo sin cursor)"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtener lista de categorías con paginación y filtros
     """
+    not_modified = await conditional_get(request, response, CATEGORY_TABLES, CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     try:
-        return get_categories(
+        return await get_categories(
             limit=limit,
             offset=offset,
             search=search,
-            parent_id=parent_id
+            parent_id=parent_id,
+            cursor=cursor,
+            with_total=with_total
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error al obtener categorías: {str(e)}")
         raise HTTPException(
@@ -37,14 +54,19 @@ async def read_categories(
 
 @router.get("/{category_id}", response_model=Category)
 async def read_category(
+    request: Request,
+    response: Response,
     category_id: int = Path(..., ge=1),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtener una categoría por su ID
     """
+    not_modified = await conditional_get(request, response, CATEGORY_TABLES, CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     try:
-        category = get_category(category_id)
+        category = await get_category(category_id)
         if not category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -69,8 +91,8 @@ async def create_category_endpoint(
     Crear una nueva categoría
     """
     try:
-        category_id = create_category(category)
-        return get_category(category_id)
+        category_id = await create_category(category)
+        return await get_category(category_id)
     except Exception as e:
         logger.error(f"Error al crear categoría: {str(e)}")
         raise HTTPException(
@@ -89,7 +111,7 @@ async def update_category_endpoint(
     """
     try:
         # Verificar que la categoría existe
-        existing_category = get_category(category_id)
+        existing_category = await get_category(category_id)
         if not existing_category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -97,10 +119,10 @@ async def update_category_endpoint(
             )
         
         # Actualizar categoría
-        update_category(category_id, category)
+        await update_category(category_id, category)
         
         # Devolver categoría actualizada
-        return get_category(category_id)
+        return await get_category(category_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -120,7 +142,7 @@ async def delete_category_endpoint(
     """
     try:
         # Verificar que la categoría existe
-        existing_category = get_category(category_id)
+        existing_category = await get_category(category_id)
         if not existing_category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -128,8 +150,8 @@ async def delete_category_endpoint(
             )
         
         # Verificar que no tenga productos asociados
-        products_count = odoo_client.execute_kw(
-            'product.template', 'search_count', [[('categ_id', '=', category_id)]]
+        products_count = await async_odoo_client.search_count(
+            'product.template', [('categ_id', '=', category_id)]
         )
         if products_count > 0:
             raise HTTPException(
@@ -138,7 +160,7 @@ async def delete_category_endpoint(
             )
         
         # Eliminar categoría
-        delete_category(category_id)
+        await delete_category(category_id)
         
         return None
     except HTTPException:
@@ -1,37 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
+from fastapi.responses import RedirectResponse
 from typing import Optional, List
+from app.core.pagination import InvalidCursor
+from app.core.serialization import json_response
 from app.models.auth import User
-from app.models.product import Product, ProductCreate, ProductUpdate, ProductList
+from app.models.product import (
+    Product, ProductCreate, ProductUpdate, ProductList, ProductSuggestionList,
+    ProductLookup, ProductLookupRequest, ProductLookupBatch
+)
 from app.services.auth import get_current_user
-from app.services.product import get_products, get_product, create_product, update_product, delete_product
+from app.services.catalog_version import PRODUCT_TABLES, conditional_get
+from app.services.product import (
+    get_products, get_product, lookup_products, create_product, update_product, delete_product
+)
+from app.services.product_image import IMAGE_FORMATS, product_image_cache, snap_size
+from app.services.suggest_index import suggest_index
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/products", tags=["Productos"])
 
+CONSISTENCY_DESCRIPTION = "eventual: catálogo local si está al día; strong: siempre desde Odoo"
+
+# Listados y fichas se revalidan siempre con el ETag (un 304 no consulta a
+# Odoo); el autocompletado repite las mismas consultas y puede reutilizarse
+LIST_CACHE_CONTROL = "private, no-cache"
+SUGGEST_CACHE_CONTROL = "private, max-age=60"
+
+# Los productos se devuelven ya serializados (`json_response`): el
+# `response_model` de cada ruta documenta el esquema, pero no se revalida
+
 @router.get("", response_model=ProductList)
 async def read_products(
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     search: Optional[str] = None,
     order: Optional[str] = None,
     supplier: Optional[str] = None,
     category_id: Optional[int] = None,
+    consistency: str = Query("eventual", pattern="^(eventual|strong)$", description=CONSISTENCY_DESCRIPTION),
+    brand: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    min_price: Optional[float] = Query(None, ge=0, description="Precio mínimo (incluido)"),
+    max_price: Optional[float] = Query(None, ge=0, description="Precio máximo (excluido)"),
+    facets: bool = Query(False, description="Incluir recuentos por marca, proveedor, categoría, stock y precio"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (sustituye a offset)"),
+    with_total: Optional[bool] = Query(None, description="Calcular el total (por defecto, solo sin cursor)"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Obtener lista de productos con paginación y filtros
+    Obtener lista de productos con paginación y filtros.
+
+    Se responde desde el catálogo local sincronizado con Odoo; con
+    `consistency=strong` se consulta directamente a Odoo. Los recuentos por
+    faceta de cada filtro se calculan sin aplicar ese mismo filtro.
+
+    Para recorrer listados largos, pasar el `next_cursor` de cada respuesta
+    como `cursor`; `limit`/`offset` siguen funcionando como antes.
     """
+    not_modified = await conditional_get(request, response, PRODUCT_TABLES, LIST_CACHE_CONTROL, enabled=consistency == "eventual")
+    if not_modified:
+        return not_modified
     try:
-        return get_products(
+        products = await get_products(
             limit=limit,
             offset=offset,
             search=search,
             order=order,
             supplier=supplier,
-            category_id=category_id
+            category_id=category_id,
+            consistency=consistency,
+            brand=brand,
+            in_stock=in_stock,
+            min_price=min_price,
+            max_price=max_price,
+            facets=facets,
+            cursor=cursor,
+            with_total=with_total
         )
+        return json_response(products, response)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error al obtener productos: {str(e)}")
         raise HTTPException(
@@ -39,22 +91,97 @@ async def read_products(
             detail=f"Error al obtener productos: {str(e)}"
         )
 
+@router.get("/suggest", response_model=ProductSuggestionList)
+async def suggest_products(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100, description="Texto escrito hasta ahora"),
+    limit: int = Query(10, ge=1, le=20),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Autocompletado para los buscadores: productos, marcas y categorías cuyo
+    nombre (o referencia) empieza por lo escrito, los más vendidos primero.
+
+    Se responde desde un índice en memoria, sin consultar a Odoo.
+    """
+    not_modified = await conditional_get(request, response, PRODUCT_TABLES, SUGGEST_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    try:
+        return ProductSuggestionList(query=q, data=await suggest_index.suggest(q, limit))
+    except Exception as e:
+        logger.error(f"Error al obtener sugerencias para '{q}': {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener sugerencias: {str(e)}"
+        )
+
+@router.get("/lookup", response_model=ProductLookup)
+async def lookup_product(
+    request: Request,
+    response: Response,
+    code: str = Query(..., min_length=1, max_length=64, description="Código de barras, referencia o código de proveedor"),
+    consistency: str = Query("eventual", pattern="^(eventual|strong)$", description=CONSISTENCY_DESCRIPTION),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Buscar productos por código exacto para el mostrador (lector de códigos
+    de barras). Sin distinguir mayúsculas, espacios ni guiones.
+    """
+    not_modified = await conditional_get(request, response, PRODUCT_TABLES, LIST_CACHE_CONTROL, enabled=consistency == "eventual")
+    if not_modified:
+        return not_modified
+    try:
+        results = await lookup_products([code], consistency=consistency)
+        return json_response(results[0] if results else {'code': code, 'matched_by': None, 'data': []}, response)
+    except Exception as e:
+        logger.error(f"Error al buscar el código '{code}': {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar el código: {str(e)}"
+        )
+
+@router.post("/lookup", response_model=ProductLookupBatch)
+async def lookup_products_batch(
+    request: ProductLookupRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Buscar varios códigos de una vez (hasta 500), con una sola lectura del
+    catálogo para todos ellos
+    """
+    try:
+        return json_response({'results': await lookup_products(request.codes, consistency=request.consistency)})
+    except Exception as e:
+        logger.error(f"Error al buscar {len(request.codes)} códigos: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar los códigos: {str(e)}"
+        )
+
 @router.get("/{product_id}", response_model=Product)
 async def read_product(
+    request: Request,
+    response: Response,
     product_id: int = Path(..., ge=1),
+    consistency: str = Query("eventual", pattern="^(eventual|strong)$", description=CONSISTENCY_DESCRIPTION),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtener un producto por su ID
     """
+    not_modified = await conditional_get(request, response, PRODUCT_TABLES, LIST_CACHE_CONTROL, enabled=consistency == "eventual")
+    if not_modified:
+        return not_modified
     try:
-        product = get_product(product_id)
+        product = await get_product(product_id, consistency=consistency)
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Producto con ID {product_id} no encontrado"
             )
-        return product
+        return json_response(product, response)
     except HTTPException:
         raise
     except Exception as e:
@@ -64,6 +191,80 @@ async def read_product(
             detail=f"Error al obtener producto: {str(e)}"
         )
 
+@router.get(
+    "/{product_id}/image",
+    response_class=Response,
+    responses={200: {"content": {"image/webp": {}, "image/jpeg": {}}}},
+)
+async def read_product_image(
+    request: Request,
+    product_id: int = Path(..., ge=1),
+    size: int = Query(512, ge=16, le=1920, description="Lado máximo en píxeles"),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$", description="Formato de salida"),
+    v: Optional[str] = Query(None, pattern="^[0-9]+$", description="Versión de la imagen"),
+):
+    """
+    Obtener la imagen de un producto redimensionada y cacheada.
+
+    Es pública para poder usarse directamente en etiquetas <img>. Las URLs
+    versionadas (`?v=`) que devuelve el listado de productos se cachean como
+    inmutables; sin versión se revalidan con el ETag. El tamaño se ajusta a
+    uno de los anchos servidos y una versión que no es la actual redirige a
+    la URL vigente, de modo que solo se generan variantes de la imagen actual.
+    """
+    size = snap_size(size)
+    headers = {}
+    fmt = format
+    if fmt is None:
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        headers["Vary"] = "Accept"
+    headers["Cache-Control"] = (
+        "public, max-age=31536000, immutable" if v else "public, max-age=86400"
+    )
+
+    # Responder 304 sin llamar a Odoo si ya conocemos la variante
+    etag = product_image_cache.known_etag(product_id, v, size, fmt)
+    if etag and request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, "ETag": etag})
+
+    try:
+        if etag is None:
+            current = await product_image_cache.current_version(product_id)
+            if current is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Producto con ID {product_id} no encontrado"
+                )
+            if v is not None and v != current:
+                return RedirectResponse(
+                    str(request.url.include_query_params(v=current)),
+                    status_code=status.HTTP_302_FOUND,
+                    headers={"Cache-Control": "public, max-age=60"},
+                )
+            v = current
+        variant = await product_image_cache.get(product_id, size, fmt, version=v)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error al obtener imagen del producto {product_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener imagen del producto: {str(e)}"
+        )
+    if not variant:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"El producto con ID {product_id} no tiene imagen"
+        )
+
+    digest, path = variant
+    headers["ETag"] = f'"{digest}"'
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    content = await product_image_cache.read_bytes(path)
+    return Response(content=content, media_type=IMAGE_FORMATS[fmt][1], headers=headers)
+
 @router.post("", response_model=Product, status_code=status.HTTP_201_CREATED)
 async def create_product_endpoint(
     product: ProductCreate,
@@ -73,8 +274,8 @@ async def create_product_endpoint(
     Crear un nuevo producto
     """
     try:
-        product_id = create_product(product)
-        return get_product(product_id)
+        product_id = await create_product(product)
+        return json_response(await get_product(product_id), status_code=status.HTTP_201_CREATED)
     except Exception as e:
         logger.error(f"Error al crear producto: {str(e)}")
         raise HTTPException(
@@ -93,7 +294,7 @@ async def update_product_endpoint(
     """
     try:
         # Verificar que el producto existe
-        existing_product = get_product(product_id)
+        existing_product = await get_product(product_id)
         if not existing_product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -101,10 +302,10 @@ async def update_product_endpoint(
             )
         
         # Actualizar producto
-        update_product(product_id, product)
+        await update_product(product_id, product)
         
         # Devolver producto actualizado
-        return get_product(product_id)
+        return json_response(await get_product(product_id))
     except HTTPException:
         raise
     except Exception as e:
@@ -124,7 +325,7 @@ async def delete_product_endpoint(
     """
     try:
         # Verificar que el producto existe
-        existing_product = get_product(product_id)
+        existing_product = await get_product(product_id)
         if not existing_product:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -132,7 +333,7 @@ async def delete_product_endpoint(
             )
         
         # Eliminar producto
-        delete_product(product_id)
+        await delete_product(product_id)
         
         return None
     except HTTPException:
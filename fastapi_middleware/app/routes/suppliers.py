@@ -1,35 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Request, Response
 from typing import Optional, List
+from app.core.pagination import InvalidCursor
 from app.models.auth import User
 from app.models.supplier import Supplier, SupplierCreate, SupplierUpdate, SupplierList
 from app.services.auth import get_current_user
+from app.services.catalog_version import SUPPLIER_TABLES, conditional_get
 from app.services.supplier import (
     get_suppliers, get_supplier, create_supplier, update_supplier, delete_supplier,
     ensure_required_suppliers_exist, REQUIRED_SUPPLIERS
 )
-from app.core.odoo_client import odoo_client
+from app.core.odoo_async_client import async_odoo_client
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/suppliers", tags=["Proveedores"])
 
+# Cambian poco: el navegador las reutiliza unos segundos y después revalida con el ETag
+CACHE_CONTROL = "private, max-age=30"
+
 @router.get("", response_model=SupplierList)
 async def read_suppliers(
+    request: Request,
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior (sustituye a offset)"),
+    with_total: Optional[bool] = Query(None, description="Calcular el total (por defecto, solo sin cursor)"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtener lista de proveedores con paginación y filtros
     """
+    not_modified = await conditional_get(request, response, SUPPLIER_TABLES, CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     try:
-        return get_suppliers(
+        return await get_suppliers(
             limit=limit,
             offset=offset,
-            search=search
+            search=search,
+            cursor=cursor,
+            with_total=with_total
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"Error al obtener proveedores: {str(e)}")
         raise HTTPException(
@@ -54,7 +70,7 @@ async def ensure_required_suppliers(
     Asegurar que los proveedores requeridos existan en el sistema
     """
     try:
-        ensure_required_suppliers_exist()
+        await ensure_required_suppliers_exist()
         return {"message": "Proveedores requeridos creados correctamente"}
     except Exception as e:
         logger.error(f"Error al asegurar proveedores requeridos: {str(e)}")
@@ -65,14 +81,19 @@ async def ensure_required_suppliers(
 
 @router.get("/{supplier_id}", response_model=Supplier)
 async def read_supplier(
+    request: Request,
+    response: Response,
     supplier_id: int = Path(..., ge=1),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtener un proveedor por su ID
     """
+    not_modified = await conditional_get(request, response, SUPPLIER_TABLES, CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     try:
-        supplier = get_supplier(supplier_id)
+        supplier = await get_supplier(supplier_id)
         if not supplier:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -97,8 +118,8 @@ async def create_supplier_endpoint(
     Crear un nuevo proveedor
     """
     try:
-        supplier_id = create_supplier(supplier)
-        return get_supplier(supplier_id)
+        supplier_id = await create_supplier(supplier)
+        return await get_supplier(supplier_id)
     except Exception as e:
         logger.error(f"Error al crear proveedor: {str(e)}")
         raise HTTPException(
@@ -117,7 +138,7 @@ async def update_supplier_endpoint(
     """
     try:
         # Verificar que el proveedor existe
-        existing_supplier = get_supplier(supplier_id)
+        existing_supplier = await get_supplier(supplier_id)
         if not existing_supplier:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -125,10 +146,10 @@ async def update_supplier_endpoint(
             )
         
         # Actualizar proveedor
-        update_supplier(supplier_id, supplier)
+        await update_supplier(supplier_id, supplier)
         
         # Devolver proveedor actualizado
-        return get_supplier(supplier_id)
+        return await get_supplier(supplier_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -148,7 +169,7 @@ async def delete_supplier_endpoint(
     """
     try:
         # Verificar que el proveedor existe
-        existing_supplier = get_supplier(supplier_id)
+        existing_supplier = await get_supplier(supplier_id)
         if not existing_supplier:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -156,8 +177,8 @@ async def delete_supplier_endpoint(
             )
         
         # Verificar que no tenga productos asociados
-        products_count = odoo_client.execute_kw(
-            'product.template', 'search_count', [[('x_nombre_proveedor', '=', existing_supplier.name)]]
+        products_count = await async_odoo_client.search_count(
+            'product.template', [('x_nombre_proveedor', '=', existing_supplier.name)]
         )
         if products_count > 0:
             raise HTTPException(
@@ -173,7 +194,7 @@ async def delete_supplier_endpoint(
             )
         
         # Eliminar proveedor
-        delete_supplier(supplier_id)
+        await delete_supplier(supplier_id)
         
         return None
     except HTTPException:
@@ -1,10 +1,14 @@
 import logging
-from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks
+import time
+from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 
-from app.services.sync_service import SyncService
+from app.services import sync_jobs
+from app.services.sync_events import stream_job_events
+from app.services.odoo.sync_specs import SYNC_SPECS
 from app.core.security import get_current_user
 from app.schemas.user import UserInDB
 from app.core.config import settings
@@ -18,79 +22,86 @@ class SyncResponse(BaseModel):
     details: Optional[Dict[str, Any]] = None
     sync_id: Optional[str] = None
 
-router = APIRouter(prefix="/api/v1/sync", tags=["Sincronización"])
+router = APIRouter(prefix="/sync", tags=["Sincronización"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Almacenar el estado de las sincronizaciones en memoria
-# En producción, considera usar Redis o una base de datos para esto
-sync_status = {}
-
-async def run_sync(sync_id: str, user_id: int):
-    """
-    Ejecuta la sincronización en segundo plano
-    """
-    try:
-        sync_service = SyncService()
-        result = await sync_service.sync_products()
-        sync_status[sync_id] = {
-            "status": result["status"],
-            "message": result["message"],
-            "details": result.get("details", {}),
-            "completed": True,
-            "error": None
-        }
-        logger.info(f"Sincronización {sync_id} completada: {result['message']}")
-    except Exception as e:
-        error_msg = f"Error en sincronización {sync_id}: {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        sync_status[sync_id] = {
-            "status": "error",
-            "message": "Error durante la sincronización",
-            "details": {"error": str(e)},
-            "completed": True,
-            "error": str(e)
-        }
+def require_superuser(current_user: UserInDB) -> None:
+    """
+    Verificar si el usuario es administrador
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para realizar esta acción"
+        )
+
+def job_details(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Detalles públicos de un trabajo de sincronización
+    """
+    details = {
+        "processed": job["processed"],
+        "created": job["created"],
+        "updated": job["updated"],
+        "unchanged": job["unchanged"],
+        "deleted": job["deleted"],
+        "errors": job["errors"],
+        "checkpoint_id": job["checkpoint_id"],
+        "full_sync": job["full_sync"],
+        "attempts": job["attempts"],
+        "worker": job["worker"],
+        "heartbeat_at": job["heartbeat_at"],
+        "cancel_requested": job["cancel_requested"],
+    }
+    if job.get("details"):
+        details["stats"] = job["details"]
+
+    # Calcular la duración (hasta ahora si sigue en curso)
+    if job.get("started_at"):
+        end = job.get("finished_at") or time.time()
+        details["duration_seconds"] = round(end - job["started_at"], 2)
+    return details
+
+async def get_job_or_404(sync_id: str) -> Dict[str, Any]:
+    """
+    Obtener un trabajo de sincronización o responder 404
+    """
+    job = await sync_jobs.get_job(sync_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No se encontró ninguna sincronización con ID {sync_id}"
+        )
+    return job
 
 @router.post("/products", response_model=SyncResponse, status_code=status.HTTP_202_ACCEPTED)
 async def sync_products(
     background_tasks: BackgroundTasks,
+    full_sync: bool = False,
     current_user: UserInDB = Depends(get_current_user)
 ):
     """
     Inicia la sincronización de productos desde Odoo a la base de datos local.
-    
+
     Esta operación se ejecuta en segundo plano y devuelve inmediatamente
     un ID de sincronización para hacer seguimiento del estado.
-    
+
+    Por defecto solo se sincronizan los productos modificados desde la última
+    ejecución; con `full_sync=true` se realiza una reconciliación completa.
+
     Requiere autenticación de administrador.
     """
-    # Verificar si el usuario es administrador
-    if not current_user.is_superuser:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para realizar esta acción"
-        )
-    
-    # Generar un ID único para esta sincronización
-    import uuid
-    import time
-    sync_id = f"sync_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-    
-    # Inicializar el estado de la sincronización
-    sync_status[sync_id] = {
-        "status": "pending",
-        "message": "Sincronización en progreso",
-        "details": {},
-        "started_at": time.time(),
-        "completed": False,
-        "error": None
-    }
-    
+    require_superuser(current_user)
+
+    # Registrar el trabajo en el almacén compartido por todos los workers
+    job = await sync_jobs.create_job("products", full_sync=full_sync, requested_by=current_user.id)
+    sync_id = job["id"]
+
     # Iniciar la sincronización en segundo plano
-    background_tasks.add_task(run_sync, sync_id, current_user.id)
-    
+    background_tasks.add_task(sync_jobs.run_sync_job, sync_id)
+
     logger.info(f"Iniciando sincronización {sync_id} solicitada por el usuario {current_user.id}")
-    
+
     return SyncResponse(
         status="accepted",
         message="Sincronización iniciada correctamente",
@@ -104,31 +115,106 @@ async def get_sync_status(
 ):
     """
     Obtiene el estado de una sincronización por su ID.
-    
-    Útil para hacer seguimiento de sincronizaciones en segundo plano.
+
+    El estado se guarda en la base de datos y se actualiza tras cada lote, así
+    que cualquier worker puede responder.
     """
-    # Verificar si el usuario es administrador
-    if not current_user.is_superuser:
+    require_superuser(current_user)
+
+    job = await get_job_or_404(sync_id)
+    return SyncResponse(
+        status=job["status"],
+        message=job["message"] or "",
+        details=job_details(job),
+        sync_id=sync_id
+    )
+
+@router.get("/products/{sync_id}/events")
+async def sync_events(
+    sync_id: str,
+    request: Request,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Flujo Server-Sent Events con el progreso de una sincronización.
+
+    Envía el estado actual, un evento `progress` por lote (procesados, creados,
+    actualizados, sin cambios, errores, velocidad y tiempo estimado restante) y un evento
+    `status` final, tras el cual se cierra el flujo.
+    """
+    require_superuser(current_user)
+
+    job = await get_job_or_404(sync_id)
+    return StreamingResponse(
+        stream_job_events(sync_id, job, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            # Con Content-Encoding definido GZipMiddleware no toca la respuesta,
+            # que de otro modo retendría los eventos en su búfer de compresión
+            "Content-Encoding": "identity",
+        },
+    )
+
+@router.post("/products/{sync_id}/cancel", response_model=SyncResponse)
+async def cancel_sync(
+    sync_id: str,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Cancela una sincronización. Si está en curso, se detiene al terminar el
+    lote actual y conserva lo ya sincronizado.
+    """
+    require_superuser(current_user)
+
+    job = await get_job_or_404(sync_id)
+    if job["status"] in sync_jobs.FINAL_STATUSES:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para realizar esta acción"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"La sincronización {sync_id} ya ha terminado"
         )
-    
-    # Obtener el estado de la sincronización
-    status_info = sync_status.get(sync_id)
-    if not status_info:
+
+    job = await sync_jobs.request_cancel(sync_id)
+    return SyncResponse(
+        status=job["status"],
+        message="Cancelación solicitada",
+        details=job_details(job),
+        sync_id=sync_id
+    )
+
+@router.post("/{kind}", response_model=SyncResponse, status_code=status.HTTP_202_ACCEPTED)
+async def sync_model(
+    kind: str,
+    background_tasks: BackgroundTasks,
+    full_sync: bool = False,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Inicia la sincronización de otro modelo de Odoo con la base de datos local:
+    `categories`, `suppliers`, `supplier_info` o `stock`.
+
+    Funciona igual que la sincronización de productos; el estado, el flujo de
+    eventos y la cancelación se consultan en las mismas rutas por `sync_id`.
+
+    Requiere autenticación de administrador.
+    """
+    require_superuser(current_user)
+
+    if kind not in SYNC_SPECS:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"No se encontró ninguna sincronización con ID {sync_id}"
+            detail=f"Tipo de sincronización desconocido: {kind}. Disponibles: {', '.join(SYNC_SPECS)}"
         )
-    
-    # Calcular la duración si está completada
-    if status_info.get("completed"):
-        duration = status_info.get("completed_at", time.time()) - status_info["started_at"]
-        status_info["details"]["duration_seconds"] = round(duration, 2)
-    
+
+    job = await sync_jobs.create_job(kind, full_sync=full_sync, requested_by=current_user.id)
+    sync_id = job["id"]
+    background_tasks.add_task(sync_jobs.run_sync_job, sync_id)
+
+    logger.info(f"Iniciando sincronización {sync_id} ({kind}) solicitada por el usuario {current_user.id}")
+
     return SyncResponse(
-        status=status_info["status"],
-        message=status_info["message"],
-        details=status_info.get("details", {})
+        status="accepted",
+        message="Sincronización iniciada correctamente",
+        sync_id=sync_id
     )
@@ -1,17 +1,101 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.odoo_client import odoo_client
+from app.core.odoo_async_client import async_odoo_client
 from app.models.auth import TokenData, User
+from app.services.catalog_version import catalog_versions
+from app.services.change_feed import USERS_MODEL
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+# Usuarios ya validados contra Odoo, por user_id. El TTL es la antigüedad máxima
+# con la que se puede servir un usuario sin volver a comprobar que sigue activo.
+_user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+# Versión de `res.users` con la que se llenó la caché de usuarios; el diario
+# de cambios la incrementa al desactivar un usuario o cambiar su acceso
+_users_version: Dict[str, Optional[int]] = {'value': None}
+
+# Tokens ya verificados, por hash del token. Cada entrada caduca como muy tarde
+# cuando caduca el propio token.
+_token_cache = TTLCache(
+    maxsize=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+def _decode_token(token: str) -> Optional[TokenData]:
+    """
+    Verificar y decodificar un token JWT, reutilizando el resultado de tokens
+    ya verificados para no repetir la comprobación de la firma
+    """
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    token_data = _token_cache.get(token_hash)
+    if token_data is not None:
+        return token_data
+
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except JWTError:
+        return None
+
+    username: str = payload.get("sub")
+    user_id: int = payload.get("user_id")
+    if username is None or user_id is None:
+        return None
+
+    token_data = TokenData(username=username, user_id=user_id)
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    _token_cache.set(token_hash, token_data, ttl)
+    return token_data
+
+def cache_user(user: User) -> None:
+    """Guardar un usuario validado en la caché"""
+    if user.active:
+        _user_cache.set(user.id, user)
+    else:
+        _user_cache.pop(user.id)
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Eliminar un usuario de la caché (por ejemplo, al desactivarlo) para que la
+    siguiente petición vuelva a validarlo contra Odoo
+    """
+    _user_cache.pop(user_id)
+
+async def _check_users_version() -> None:
+    """
+    Vaciar la caché de usuarios si el diario de cambios ha anotado cambios en
+    `res.users` desde que se llenó (la caché es de cada worker)
+    """
+    try:
+        version = (await catalog_versions()).get(USERS_MODEL, 0)
+    except Exception as e:
+        logger.warning(f"No se pudo comprobar la versión de los usuarios: {str(e)}")
+        return
+    if version != _users_version['value']:
+        if _users_version['value'] is not None:
+            _user_cache.clear()
+        _users_version['value'] = version
+
+def auth_cache_stats() -> Dict[str, Any]:
+    """Contadores de las cachés de autenticación"""
+    return {
+        "users": _user_cache.stats(),
+        "tokens": _token_cache.stats(),
+    }
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """
     Obtener el usuario actual a partir del token JWT
     """
@@ -20,52 +104,58 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        name: str = payload.get("name")
-        
-        if username is None or user_id is None:
-            raise credentials_exception
-            
-        token_data = TokenData(username=username, user_id=user_id)
-    except JWTError:
+    token_data = _decode_token(token)
+    if token_data is None:
         raise credentials_exception
-        
+
+    await _check_users_version()
+    user = _user_cache.get(token_data.user_id)
+    if user is not None:
+        return user
+
     # Verificar que el usuario existe en Odoo
     try:
-        user_data = odoo_client.read('res.users', [token_data.user_id], ['name', 'login', 'email', 'active'])
-        if not user_data or not user_data[0]['active']:
-            raise credentials_exception
-            
-        user = User(
-            id=user_data[0]['id'],
-            username=user_data[0]['login'],
-            name=user_data[0]['name'],
-            email=user_data[0].get('email'),
-            active=user_data[0]['active']
-        )
-        return user
+        user_data = await async_odoo_client.read('res.users', [token_data.user_id], ['name', 'login', 'email', 'active'])
     except Exception as e:
         logger.error(f"Error al obtener usuario de Odoo: {str(e)}")
         raise credentials_exception
 
-def authenticate_user(username: str, password: str) -> Optional[dict]:
+    if not user_data or not user_data[0]['active']:
+        invalidate_user(token_data.user_id)
+        raise credentials_exception
+
+    user = User(
+        id=user_data[0]['id'],
+        username=user_data[0]['login'],
+        name=user_data[0]['name'],
+        email=user_data[0].get('email') or None,
+        active=user_data[0]['active']
+    )
+    cache_user(user)
+    return user
+
+async def authenticate_user(username: str, password: str) -> Optional[dict]:
     """
     Autenticar un usuario con Odoo
     """
     try:
-        uid = odoo_client.authenticate(username, password)
+        uid = await async_odoo_client.authenticate(username, password)
         if not uid:
             return None
             
         # Obtener información del usuario
-        user_data = odoo_client.read('res.users', [uid], ['name', 'login', 'email'])
+        user_data = await async_odoo_client.read('res.users', [uid], ['name', 'login', 'email', 'active'])
         if not user_data:
             return None
+
+        # Un inicio de sesión correcto refresca la entrada de la caché
+        cache_user(User(
+            id=uid,
+            username=user_data[0]['login'],
+            name=user_data[0]['name'],
+            email=user_data[0].get('email') or None,
+            active=user_data[0].get('active', True)
+        ))
             
         return {
             'id': uid,
@@ -0,0 +1,305 @@
+"""
+Catálogo local de productos (modelo de lectura).
+
+GET /products se responde desde la tabla `CatalogProduct`, que mantienen la
+sincronización (`SyncSpec` `catalog`) y el diario de cambios de Odoo, con
+índices por referencia, código de barras, categoría, marca, proveedor, precio
+y fecha de modificación. Así el catálogo se puede consultar aunque Odoo esté
+ocupado (o caído) y sin dos llamadas XML-RPC por página.
+
+El catálogo se considera al día si la última sincronización completada del
+catálogo, o el último latido del lector del diario de cambios, es más reciente
+que `CATALOG_MAX_STALENESS_SECONDS`. Si no lo está, o si la petición pide
+`consistency=strong`, se consulta directamente a Odoo.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from app.core.config import settings
+from app.core.database import connection
+from app.core.pagination import keyset_sql
+from app.services.change_feed import JOURNAL_MODEL
+from app.services.odoo.sync_engine import SyncEngine
+from app.services.odoo.sync_specs import CATALOG_SPEC
+from app.services.search_index import fold
+
+logger = logging.getLogger(__name__)
+
+# Campos por los que se puede ordenar (nombre de Odoo o columna local → columna)
+ORDER_COLUMNS = {
+    'id': 'odoo_id',
+    'name': 'name',
+    'list_price': 'price',
+    'price': 'price',
+    'standard_price': 'standard_price',
+    'default_code': 'sku',
+    'sku': 'sku',
+    'barcode': 'barcode',
+    'categ_id': 'category_odoo_id',
+    'x_marca': 'brand',
+    'brand': 'brand',
+    'x_nombre_proveedor': 'supplier',
+    'supplier': 'supplier',
+    'x_pvp_web': 'sale_price',
+    'x_dto': 'discount',
+    'x_vendidas': 'units_sold',
+    'write_date': 'updated_at',
+}
+
+_SELECT_SQL = (
+    'SELECT p.*, c.name AS category_name FROM "CatalogProduct" p '
+    'LEFT JOIN "Category" c ON c.odoo_id = p.category_odoo_id'
+)
+
+# Plantillas con alguna variante con stock. El stock de una variante es la
+# suma de sus quants en ubicaciones internas (como `qty_available` en Odoo)
+_IN_STOCK_SQL = (
+    'SELECT 1 FROM "Product" v JOIN "StockQuant" q ON q.product_odoo_id = v.odoo_id '
+    'WHERE v.template_odoo_id = p.odoo_id GROUP BY v.odoo_id HAVING sum(q.quantity) > 0'
+)
+
+# Antigüedad del catálogo según la última comprobación en `sync_state`
+_freshness: Dict[str, Any] = {'age': None, 'checked_at': None}
+
+
+def _order_terms(order: Optional[str]) -> List[Tuple[str, bool]]:
+    """
+    Traduce un orden al estilo de Odoo (`list_price desc, name`) a columnas
+    del catálogo, como pares (columna SQL, descendente).
+
+    Raises:
+        ValueError: si algún campo no está en el catálogo local
+    """
+    terms = []
+    columns = set()
+    for term in (order or 'name').split(','):
+        parts = term.split()
+        if not parts:
+            continue
+        column = ORDER_COLUMNS.get(parts[0])
+        direction = parts[1].upper() if len(parts) > 1 else 'ASC'
+        if column is None or direction not in ('ASC', 'DESC') or len(parts) > 2:
+            raise ValueError(f"Orden no disponible en el catálogo local: {term.strip()}")
+        terms.append((f'p."{column}"', direction == 'DESC'))
+        columns.add(column)
+    # Desempate estable para que la paginación no repita ni salte filas
+    if 'odoo_id' not in columns:
+        terms.append(('p."odoo_id"', False))
+    return terms
+
+
+def _order_sql(order: Optional[str]) -> str:
+    return ', '.join(
+        f"{column} {'DESC' if descending else 'ASC'}" for column, descending in _order_terms(order)
+    )
+
+
+# Equivalente en SQL de `fold` (sin acentos y en minúsculas) para que los
+# filtros de texto coincidan con las facetas, sin depender de `unaccent`;
+# se quitan los acentos antes de `lower`, que con la intercalación C solo
+# convierte ASCII
+_ACCENTED = 'áàâäãåéèêëíìîïóòôöõúùûüñçýÁÀÂÄÃÅÉÈÊËÍÌÎÏÓÒÔÖÕÚÙÛÜÑÇÝ'
+_PLAIN = 'aaaaaaeeeeiiiiooooouuuuncyAAAAAAEEEEIIIIOOOOOUUUUNCY'
+
+
+def _folded(column: str) -> str:
+    return f"lower(translate({column}, '{_ACCENTED}', '{_PLAIN}'))"
+
+
+def _like(term: str) -> str:
+    """Patrón ILIKE que busca `term` literalmente"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _query_products(
+    limit: int,
+    offset: int,
+    search: Optional[str],
+    order: Optional[str],
+    supplier: Optional[str],
+    category_id: Optional[int],
+    ids: Optional[List[int]],
+    brand: Optional[str],
+    in_stock: Optional[bool],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    after: Optional[List[Any]],
+    with_total: bool,
+) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    conditions = []
+    params: List[Any] = []
+    if ids is not None:
+        conditions.append('p.odoo_id = ANY(%s)')
+        params.append(ids)
+    if search:
+        conditions.append(f"({_folded('p.name')} LIKE %s OR p.sku ILIKE %s)")
+        params += [_like(fold(search)), _like(search)]
+    if supplier:
+        conditions.append(f"{_folded('p.supplier')} LIKE %s")
+        params.append(_like(fold(supplier)))
+    if category_id:
+        conditions.append('p.category_odoo_id = %s')
+        params.append(category_id)
+    if brand:
+        conditions.append(f"{_folded('btrim(p.brand)')} = %s")
+        params.append(fold(brand.strip()))
+    if in_stock is not None:
+        conditions.append(f"{'' if in_stock else 'NOT '}EXISTS ({_IN_STOCK_SQL})")
+    if min_price is not None:
+        conditions.append('p.price >= %s')
+        params.append(min_price)
+    if max_price is not None:
+        conditions.append('p.price < %s')
+        params.append(max_price)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    page_where, page_params = where, list(params)
+    order_params: List[Any] = []
+    if ids is not None and not order:
+        # Sin orden explícito se respeta el de `ids` (relevancia)
+        order_sql = 'array_position(%s::int[], p.odoo_id)'
+        order_params.append(ids)
+    else:
+        terms = _order_terms(order)
+        order_sql = _order_sql(order)
+        if after is not None:
+            # Página siguiente a la última fila vista (cursor), sin OFFSET
+            condition, keyset_params = keyset_sql(terms, after)
+            page_where = f"{where} AND {condition}" if where else f" WHERE {condition}"
+            page_params += keyset_params
+            offset = 0
+
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        total = None
+        if with_total:
+            cur.execute(f'SELECT count(*) AS total FROM "CatalogProduct" p{where}', params)
+            total = cur.fetchone()['total']
+        cur.execute(
+            f'{_SELECT_SQL}{page_where} ORDER BY {order_sql} LIMIT %s OFFSET %s',
+            page_params + order_params + [limit, offset],
+        )
+        return total, cur.fetchall()
+
+
+def _read_product(product_id: int) -> Optional[Dict[str, Any]]:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f'{_SELECT_SQL} WHERE p.odoo_id = %s', (product_id,))
+        return cur.fetchone()
+
+
+def _read_products(product_ids: List[int]) -> List[Dict[str, Any]]:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(f'{_SELECT_SQL} WHERE p.odoo_id = ANY(%s)', (product_ids,))
+        return cur.fetchall()
+
+
+def _load_age() -> Optional[float]:
+    """
+    Segundos desde la última vez que se comprobó que el catálogo estaba al día,
+    o None si nunca se ha completado una sincronización del catálogo
+    """
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                (SELECT EXTRACT(EPOCH FROM now() - updated_at) FROM sync_state
+                 WHERE model = %s AND last_write_date IS NOT NULL),
+                (SELECT EXTRACT(EPOCH FROM now() - updated_at) FROM sync_state
+                 WHERE model = %s)
+            """,
+            (CATALOG_SPEC.model, JOURNAL_MODEL),
+        )
+        synced_age, journal_age = cur.fetchone()
+    if synced_age is None:
+        return None
+    ages = [float(a) for a in (synced_age, journal_age) if a is not None]
+    return min(ages)
+
+
+async def catalog_age() -> Optional[float]:
+    """
+    Antigüedad del catálogo local en segundos (None si aún no se ha sincronizado).
+
+    `sync_state` se consulta como mucho cada `CATALOG_FRESHNESS_CHECK_SECONDS`;
+    entre consultas la antigüedad se extrapola.
+    """
+    now = time.monotonic()
+    checked_at = _freshness['checked_at']
+    if checked_at is None or now - checked_at >= settings.CATALOG_FRESHNESS_CHECK_SECONDS:
+        _freshness['age'] = await asyncio.to_thread(_load_age)
+        _freshness['checked_at'] = checked_at = now
+    if _freshness['age'] is None:
+        return None
+    return _freshness['age'] + (now - checked_at)
+
+
+async def catalog_is_fresh() -> bool:
+    """True si el catálogo local puede responder sin consultar a Odoo"""
+    age = await catalog_age()
+    return age is not None and age <= settings.CATALOG_MAX_STALENESS_SECONDS
+
+
+async def search_catalog(
+    limit: int = 10,
+    offset: int = 0,
+    search: Optional[str] = None,
+    order: Optional[str] = None,
+    supplier: Optional[str] = None,
+    category_id: Optional[int] = None,
+    ids: Optional[List[int]] = None,
+    brand: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    after: Optional[List[Any]] = None,
+    with_total: bool = True,
+) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """
+    Busca en el catálogo local con los mismos filtros que GET /products.
+
+    Args:
+        ids: Restringir a estas plantillas; sin `order`, en el mismo orden
+             (el resultado ya ordenado del índice de búsqueda)
+        in_stock: Con (o sin) stock en alguna variante
+        min_price, max_price: `min_price <= precio < max_price`
+        after: Valores del orden (y `odoo_id`) de la última fila de la página
+               anterior; se ignora `offset` (paginación por cursor)
+        with_total: Contar también el total de coincidencias
+
+    Returns:
+        Tupla (total de coincidencias o None, filas de la página)
+
+    Raises:
+        ValueError: si el orden pedido no está disponible localmente
+    """
+    return await asyncio.to_thread(
+        _query_products, limit, offset, search, order, supplier, category_id, ids,
+        brand, in_stock, min_price, max_price, after, with_total
+    )
+
+
+async def read_catalog_product(product_id: int) -> Optional[Dict[str, Any]]:
+    """Fila del catálogo local de una plantilla de producto"""
+    return await asyncio.to_thread(_read_product, product_id)
+
+
+async def read_catalog_products(product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Filas del catálogo local de varias plantillas en una sola consulta, por ID"""
+    if not product_ids:
+        return {}
+    rows = await asyncio.to_thread(_read_products, product_ids)
+    return {row['odoo_id']: row for row in rows}
+
+
+async def refresh_catalog(product_ids: List[int]) -> Dict[str, int]:
+    """
+    Vuelve a leer de Odoo unas plantillas y actualiza el catálogo local.
+
+    Se llama después de crear, modificar o eliminar productos desde la API,
+    para que la respuesta siguiente ya los refleje sin esperar al diario.
+    """
+    return await SyncEngine().apply_changes(CATALOG_SPEC, 'id', product_ids)
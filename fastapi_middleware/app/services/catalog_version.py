@@ -0,0 +1,167 @@
+"""
+ETag débiles y peticiones condicionales (`If-None-Match`) para el catálogo.
+
+Cada tabla local tiene un contador en `catalog_version` que incrementa en la
+misma transacción cualquier escritura de la sincronización, del diario de
+cambios o de la propia API (`bulk_writer.bump_version`). El ETag de una
+respuesta es una huella de la ruta, los parámetros de la consulta y las
+versiones de las tablas de las que depende, así que se calcula con una
+consulta trivial a PostgreSQL (cacheada `ETAG_VERSION_CHECK_SECONDS`) y un
+304 se responde sin llamar a Odoo.
+
+Los ETag solo se emiten mientras el catálogo local está al día (la misma
+condición con la que GET /products se responde sin consultar a Odoo); si no,
+los cambios hechos en Odoo podrían no haber incrementado todavía la versión.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+from app.core.database import connection
+from app.services.bulk_writer import bump_version
+from app.services.catalog import catalog_is_fresh
+
+logger = logging.getLogger(__name__)
+
+# Tablas de las que dependen las respuestas de cada grupo de rutas
+PRODUCT_TABLES = ('CatalogProduct', 'Product', 'StockQuant', 'SupplierInfo', 'Category')
+CATEGORY_TABLES = ('Category',)
+SUPPLIER_TABLES = ('Supplier',)
+
+# Tras un error al leer las versiones no se reintenta durante este tiempo: las
+# peticiones fallan enseguida en lugar de esperar cada una a PostgreSQL
+VERSION_RETRY_SECONDS = 5
+
+# Versiones leídas por última vez, cuándo, el error de la última lectura y la
+# lectura en curso (compartida por las peticiones simultáneas)
+_versions: Dict[str, Any] = {'values': None, 'checked_at': None, 'error': None, 'loading': None}
+
+
+def _load_versions() -> Dict[str, int]:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT name, version FROM catalog_version")
+        return {name: int(version) for name, version in cur.fetchall()}
+
+
+def _bump(tables: Iterable[str]) -> None:
+    with connection() as conn, conn.cursor() as cur:
+        for table in tables:
+            bump_version(cur, table)
+
+
+async def _refresh_versions() -> None:
+    try:
+        _versions['values'] = await asyncio.to_thread(_load_versions)
+        _versions['error'] = None
+    except Exception as e:
+        _versions['error'] = e
+        raise
+    finally:
+        # También tras un error, para no reintentar en cada petición
+        _versions['checked_at'] = time.monotonic()
+        _versions['loading'] = None
+
+
+async def catalog_versions() -> Dict[str, int]:
+    """
+    Versión de cada tabla local (consultada como mucho cada
+    `ETAG_VERSION_CHECK_SECONDS`, o cada `VERSION_RETRY_SECONDS` si la última
+    lectura falló; mientras tanto se repite ese error sin consultar)
+    """
+    now = time.monotonic()
+    checked_at = _versions['checked_at']
+    interval = VERSION_RETRY_SECONDS if _versions['error'] is not None else settings.ETAG_VERSION_CHECK_SECONDS
+    if checked_at is None or now - checked_at >= interval:
+        if _versions['loading'] is None:
+            _versions['loading'] = asyncio.ensure_future(_refresh_versions())
+        await asyncio.shield(_versions['loading'])
+    elif _versions['error'] is not None:
+        raise _versions['error']
+    return _versions['values']
+
+
+def invalidate_versions() -> None:
+    """Volver a leer las versiones en la próxima petición (tras escribir desde la API)"""
+    _versions['checked_at'] = None
+
+
+async def bump_catalog_version(*tables: str) -> None:
+    """
+    Invalidar los ETag de unas tablas tras un cambio hecho desde la API que
+    todavía no ha llegado a la tabla local
+    """
+    try:
+        await asyncio.to_thread(_bump, tables)
+        invalidate_versions()
+    except Exception as e:
+        logger.warning(f"No se pudo incrementar la versión de {', '.join(tables)}: {str(e)}")
+
+
+async def catalog_etag(request: Request, tables: Iterable[str]) -> Optional[str]:
+    """
+    ETag débil de la respuesta a `request`, o None si las versiones locales no
+    son fiables (catálogo desactualizado o PostgreSQL no disponible)
+    """
+    if not settings.CATALOG_READ_MODEL_ENABLED:
+        return None
+    try:
+        if not await catalog_is_fresh():
+            return None
+        versions = await catalog_versions()
+    except Exception as e:
+        logger.warning(f"No se pudo calcular el ETag de {request.url.path}: {str(e)}")
+        return None
+    query = sorted(request.query_params.multi_items())
+    parts = [request.url.path, repr(query)] + [f"{t}:{versions.get(t, 0)}" for t in tables]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de `If-None-Match` (admite listas y `*`)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    tables: Iterable[str],
+    cache_control: str,
+    enabled: bool = True,
+) -> Optional[Response]:
+    """
+    Pone las cabeceras de caché de una ruta de lectura y, si el cliente ya
+    tiene la versión actual, devuelve la respuesta 304 que hay que enviar.
+
+    Args:
+        tables: Tablas locales de las que depende la respuesta
+        cache_control: Política de `Cache-Control` de la ruta
+        enabled: False para lecturas que no deben revalidarse (`consistency=strong`)
+
+    Returns:
+        Respuesta 304, o None si hay que generar la respuesta completa
+    """
+    headers = {'Cache-Control': cache_control if enabled else 'no-store', 'Vary': 'Authorization'}
+    etag = await catalog_etag(request, tables) if enabled else None
+    if etag:
+        headers['ETag'] = etag
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
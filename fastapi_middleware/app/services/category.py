@@ -1,19 +1,54 @@
 from typing import List, Optional
-from app.core.odoo_client import odoo_client
+from app.core.odoo_async_client import async_odoo_client
+from app.core.pagination import (
+    decode_cursor, next_cursor, order_terms, page_info, query_key, read_odoo_page, total_cache
+)
 from app.models.category import Category, CategoryCreate, CategoryUpdate, CategoryList
+from app.services.catalog_version import CATEGORY_TABLES, bump_catalog_version
+from app.services.category_index import category_index
+from app.services.response_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_categories(
+# Orden de los listados de categorías (con desempate por id para el cursor)
+CATEGORY_ORDER = order_terms('complete_name')
+
+async def get_categories(
     limit: int = 100,
     offset: int = 0,
     search: Optional[str] = None,
     parent_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
 ) -> CategoryList:
     """
-    Obtener lista de categorías con filtros y paginación
+    Obtener lista de categorías con filtros y paginación.
+    
+    Con `cursor` (el `next_cursor` de la página anterior) se pagina por
+    cursor; el total solo se calcula sin cursor o si se pide con `with_total`.
+    Los resultados pasan por la caché de resultados (`response_cache`).
+    
+    Raises:
+        InvalidCursor: si el cursor no corresponde a esta consulta
     """
+    key = f"categories:{query_key(search, parent_id, limit, offset, with_total)}:{cursor or ''}"
+    return await response_cache.get_or_load(
+        key, lambda: _load_categories(limit, offset, search, parent_id, cursor, with_total), CATEGORY_TABLES, CategoryList
+    )
+
+async def _load_categories(
+    limit: int = 100,
+    offset: int = 0,
+    search: Optional[str] = None,
+    parent_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
+) -> CategoryList:
+    key = query_key('product.category', search, parent_id)
+    page = decode_cursor(cursor, key, offset)
+    if with_total is None:
+        with_total = cursor is None
     try:
         # Construir dominio de búsqueda
         domain = []
@@ -26,14 +61,9 @@ def get_categories(
         # Campos a recuperar
         fields = ['name', 'parent_id', 'complete_name', 'child_id']
         
-        # Obtener total de registros
-        total = odoo_client.execute_kw(
-            'product.category', 'search_count', [domain]
-        )
-        
-        # Obtener categorías
-        categories_data = odoo_client.search_read(
-            'product.category', domain, fields, limit=limit, offset=offset, order='complete_name'
+        # Página y total (si se pide) en una sola llamada a Odoo
+        total, categories_data = await read_odoo_page(
+            'product.category', domain, fields, limit, page, CATEGORY_ORDER, key if with_total else None
         )
         
         # Procesar resultados
@@ -49,31 +79,29 @@ def get_categories(
             }
             categories.append(Category(**category))
         
-        # Calcular páginas
-        pages = (total + limit - 1) // limit if limit > 0 else 1
-        page = (offset // limit) + 1 if limit > 0 else 1
-        
-        return CategoryList(
-            data=categories,
-            total=total,
-            page=page,
-            page_size=limit,
-            pages=pages
-        )
+        last = categories_data[-1] if categories_data else None
+        last_values = [last.get('complete_name'), last['id']] if last else None
+        cursor = next_cursor(key, page, len(categories), limit, last_values)
+        return CategoryList(data=categories, **page_info(total, limit, page.offset, cursor))
     except Exception as e:
         logger.error(f"Error al obtener categorías: {str(e)}")
         raise
 
-def get_category(category_id: int) -> Category:
+async def get_category(category_id: int) -> Category:
     """
     Obtener una categoría por su ID
     """
+    return await response_cache.get_or_load(
+        f"category:{category_id}", lambda: _load_category(category_id), CATEGORY_TABLES, Category
+    )
+
+async def _load_category(category_id: int) -> Category:
     try:
         # Campos a recuperar
         fields = ['name', 'parent_id', 'complete_name', 'child_id']
         
         # Obtener categoría
-        category_data = odoo_client.read('product.category', [category_id], fields)
+        category_data = await async_odoo_client.read('product.category', [category_id], fields)
         
         if not category_data:
             return None
@@ -94,7 +122,7 @@ def get_category(category_id: int) -> Category:
         logger.error(f"Error al obtener categoría {category_id}: {str(e)}")
         raise
 
-def create_category(category: CategoryCreate) -> int:
+async def create_category(category: CategoryCreate) -> int:
     """
     Crear una nueva categoría
     """
@@ -108,13 +136,17 @@ def create_category(category: CategoryCreate) -> int:
             values['parent_id'] = category.parent_id
         
         # Crear categoría
-        category_id = odoo_client.create('product.category', values)
+        category_id = await async_odoo_client.create('product.category', values)
+        category_index.invalidate()
+        total_cache.clear()
+        response_cache.invalidate(*CATEGORY_TABLES)
+        await bump_catalog_version('Category')
         return category_id
     except Exception as e:
         logger.error(f"Error al crear categoría: {str(e)}")
         raise
 
-def update_category(category_id: int, category: CategoryUpdate) -> bool:
+async def update_category(category_id: int, category: CategoryUpdate) -> bool:
     """
     Actualizar una categoría existente
     """
@@ -129,19 +161,27 @@ def update_category(category_id: int, category: CategoryUpdate) -> bool:
         
         # Actualizar categoría
         if values:
-            odoo_client.write('product.category', [category_id], values)
+            await async_odoo_client.write('product.category', [category_id], values)
+            category_index.invalidate()
+            total_cache.clear()
+            response_cache.invalidate(*CATEGORY_TABLES)
+            await bump_catalog_version('Category')
             return True
         return False
     except Exception as e:
         logger.error(f"Error al actualizar categoría {category_id}: {str(e)}")
         raise
 
-def delete_category(category_id: int) -> bool:
+async def delete_category(category_id: int) -> bool:
     """
     Eliminar una categoría
     """
     try:
-        odoo_client.unlink('product.category', [category_id])
+        await async_odoo_client.unlink('product.category', [category_id])
+        category_index.invalidate()
+        total_cache.clear()
+        response_cache.invalidate(*CATEGORY_TABLES)
+        await bump_catalog_version('Category')
         return True
     except Exception as e:
         logger.error(f"Error al eliminar categoría {category_id}: {str(e)}")
@@ -0,0 +1,122 @@
+"""
+Índice en memoria de las categorías de producto de Odoo.
+
+Carga todas las categorías con un único `search_read` y permite resolver
+id → nombre, nombre completo, padre e hijos sin llamadas adicionales a Odoo.
+Cada cierto tiempo comprueba la firma de la tabla (último `write_date` y número
+de categorías) y solo recarga el índice cuando ha cambiado.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.odoo_async_client import async_odoo_client
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_FIELDS = ['name', 'complete_name', 'parent_id', 'child_id', 'write_date']
+
+
+class CategoryIndex:
+    """Índice id → categoría que se refresca cuando cambia `write_date`"""
+
+    def __init__(self, refresh_interval: float = settings.CATEGORY_CACHE_TTL):
+        self.refresh_interval = refresh_interval
+        self._categories: Dict[int, Dict[str, Any]] = {}
+        self._signature: Optional[Tuple[Any, int]] = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def _fetch_signature(self) -> Tuple[Any, int]:
+        """Obtener la firma actual de la tabla de categorías en Odoo"""
+        # Última modificación y número de categorías en una sola llamada
+        result = await async_odoo_client.search_read_page(
+            'product.category', [], ['write_date'], limit=1, order='write_date desc'
+        )
+        latest = result['records']
+        return (latest[0]['write_date'] if latest else None, result['length'])
+
+    async def load(self) -> None:
+        """Cargar todas las categorías en una sola llamada"""
+        records = await async_odoo_client.search_read('product.category', [], CATEGORY_FIELDS)
+        categories = {}
+        for c in records:
+            parent = c.get('parent_id')
+            categories[c['id']] = {
+                'id': c['id'],
+                'name': c['name'],
+                'complete_name': c.get('complete_name') or c['name'],
+                'parent_id': parent[0] if isinstance(parent, list) and parent else None,
+                'child_ids': c.get('child_id', []),
+            }
+        latest = max((c['write_date'] for c in records if c.get('write_date')), default=None)
+
+        self._categories = categories
+        self._signature = (latest, len(records))
+        self._checked_at = time.monotonic()
+        self._loaded = True
+        logger.debug(f"Índice de categorías cargado con {len(categories)} categorías")
+
+    async def ensure_fresh(self) -> None:
+        """Cargar el índice o recargarlo si la firma de Odoo ha cambiado"""
+        if self._loaded and time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await self.load()
+                return
+            if time.monotonic() - self._checked_at < self.refresh_interval:
+                return
+            try:
+                signature = await self._fetch_signature()
+            except Exception as e:
+                # Si Odoo no responde seguimos sirviendo el índice actual
+                logger.warning(f"No se pudo comprobar la firma de categorías: {str(e)}")
+                self._checked_at = time.monotonic()
+                return
+            if signature != self._signature:
+                await self.load()
+            else:
+                self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Forzar la comprobación de la firma en el próximo acceso"""
+        self._checked_at = 0.0
+
+    def get(self, category_id: int) -> Optional[Dict[str, Any]]:
+        """Obtener una categoría del índice"""
+        return self._categories.get(category_id)
+
+    def children(self, category_id: int) -> List[int]:
+        """IDs de las subcategorías directas"""
+        category = self._categories.get(category_id)
+        return list(category['child_ids']) if category else []
+
+    def resolve_name(self, categ_value: Any) -> Optional[str]:
+        """
+        Obtener el nombre de la categoría a partir de un valor many2one de Odoo
+        (`[id, display_name]`). Si la categoría aún no está en el índice se usa el
+        último tramo del `display_name` y se fuerza una comprobación de la firma.
+        """
+        if not categ_value:
+            return None
+        if isinstance(categ_value, (list, tuple)):
+            category_id = categ_value[0]
+            display_name = categ_value[1] if len(categ_value) > 1 else None
+        else:
+            category_id, display_name = categ_value, None
+
+        category = self._categories.get(category_id)
+        if category:
+            return category['name']
+
+        self.invalidate()
+        if display_name:
+            return display_name.split(' / ')[-1]
+        return None
+
+# Instancia global del índice de categorías
+category_index = CategoryIndex()
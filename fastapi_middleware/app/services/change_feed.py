@@ -0,0 +1,251 @@
+"""
+Lectura continua del diario de cambios de Odoo (captura de cambios).
+
+El módulo `pelotazo` de Odoo anota cada alta, modificación o baja de productos,
+categorías, contactos y stock en `pelotazo.change.journal`, con la transacción
+que lo hizo. Este módulo lee el diario cada pocos segundos con
+`fetch_changes(since_seq, limit, since_txid)` y aplica solo los registros
+afectados, de modo que un cambio de stock llega a la base de datos local en
+segundos y no en la siguiente sincronización completa.
+
+- La posición de lectura es el par (transacción, secuencia): Odoo solo
+  entrega transacciones ya terminadas y en orden, así que avanzar el punto de
+  control nunca salta un cambio que aún no se había confirmado.
+- La última posición aplicada se guarda en `sync_state` y solo avanza después
+  de aplicar los cambios, así que tras una caída se vuelven a aplicar (las
+  escrituras son idempotentes).
+- Solo un worker lee el diario a la vez: el que consigue el bloqueo consultivo
+  de PostgreSQL. Si ese worker cae, otro lo adquiere.
+- Mientras lee, el lector renueva periódicamente su punto de control aunque
+  no haya cambios: es la señal de que las tablas locales están al día.
+- Si el lector se queda por detrás de la limpieza del diario, se lanza una
+  sincronización completa.
+- Las bajas y los cambios de acceso de `res.users` vacían la caché de
+  usuarios validados de todos los workers (ver `app.services.auth`).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Set, Tuple
+
+import psycopg2
+
+from app.core.config import settings
+from app.core.database import connection
+from app.core.odoo_async_client import async_odoo_client
+from app.services import sync_jobs
+from app.services.bulk_writer import bump_version
+from app.services.odoo.sync_engine import SyncEngine
+from app.services.odoo.sync_specs import SYNC_SPECS
+
+logger = logging.getLogger(__name__)
+
+# Modelo del diario en Odoo; también es la clave del punto de control en `sync_state`
+JOURNAL_MODEL = 'pelotazo.change.journal'
+
+# Los usuarios no se sincronizan: sus cambios incrementan esta versión en
+# `catalog_version` y cada worker vacía su caché de usuarios validados
+USERS_MODEL = 'res.users'
+
+# Clave del bloqueo consultivo que elige el worker lector
+CHANGE_FEED_LOCK_KEY = 0x5065_6C6F  # "Pelo"
+
+# Aunque no haya cambios, cada cuánto se anota en `sync_state` que el lector
+# sigue al día (el catálogo local lo usa para saber si puede responder)
+CHECKPOINT_HEARTBEAT_SECONDS = 30
+
+# Espera tras un error (Odoo caído, módulo sin instalar...)
+ERROR_BACKOFF_SECONDS = 30
+
+# Estado del lector en este worker, para /health
+_state: Dict[str, Any] = {
+    'leader': False,
+    'seq': None,
+    'txid': None,
+    'applied': 0,
+    'last_poll': None,
+    'lag_seconds': None,
+    'checkpoint_at': None,
+}
+
+
+def _load_position() -> Tuple[int, int]:
+    """Punto de control del lector: (transacción, secuencia)"""
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT last_txid, last_id FROM sync_state WHERE model = %s", (JOURNAL_MODEL,))
+        row = cur.fetchone()
+        return (row[0], row[1]) if row else (0, 0)
+
+
+def _save_position(txid: int, seq: int) -> None:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO sync_state (model, last_txid, last_id, updated_at) VALUES (%s, %s, %s, now())
+            ON CONFLICT (model) DO UPDATE
+            SET last_txid = EXCLUDED.last_txid, last_id = EXCLUDED.last_id, updated_at = now()
+            """,
+            (JOURNAL_MODEL, txid, seq),
+        )
+
+
+def _bump_users_version() -> None:
+    with connection() as conn, conn.cursor() as cur:
+        bump_version(cur, USERS_MODEL)
+
+
+def _acquire_leader_lock():
+    """
+    Intenta adquirir el bloqueo de lector. Devuelve la conexión que lo mantiene
+    o None si otro worker ya es el lector.
+
+    La conexión es propia (no del pool): el lector la conserva mientras lo es y
+    no debe quitarle un hueco al resto de consultas del worker.
+    """
+    conn = psycopg2.connect(settings.DATABASE_URL)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (CHANGE_FEED_LOCK_KEY,))
+            if cur.fetchone()[0]:
+                return conn
+    except Exception:
+        conn.close()
+        raise
+    conn.close()
+    return None
+
+
+def _check_leader_lock(conn) -> None:
+    """Falla si se ha perdido la conexión que mantiene el bloqueo"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1")
+
+
+def _release_leader_lock(conn) -> None:
+    # Al cerrar la conexión PostgreSQL libera también el bloqueo
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (CHANGE_FEED_LOCK_KEY,))
+    except Exception as e:
+        logger.debug(f"No se pudo liberar el bloqueo del lector: {str(e)}")
+    finally:
+        conn.close()
+
+
+async def apply_changes(changes: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Aplica un lote de entradas del diario.
+
+    Las entradas se agrupan por modelo (un registro modificado varias veces se
+    lee una sola vez) y cada modelo sincronizado cuyo `SyncSpec` declara ese
+    modelo en `changes` vuelve a leer de Odoo el estado actual de los
+    registros afectados; las bajas se detectan porque ya no existen.
+
+    Returns:
+        Estadísticas acumuladas de todos los modelos
+    """
+    changed: Dict[str, Set[int]] = {}
+    for change in changes:
+        changed.setdefault(change['model'], set()).add(change['res_id'])
+
+    engine = SyncEngine()
+    totals: Dict[str, int] = {}
+    for spec in SYNC_SPECS.values():
+        for journal_model, odoo_field in spec.changes.items():
+            ids = changed.get(journal_model)
+            if not ids:
+                continue
+            result = await engine.apply_changes(spec, odoo_field, sorted(ids))
+            for key, value in result.items():
+                totals[key] = totals.get(key, 0) + value
+
+    users = changed.get(USERS_MODEL)
+    if users:
+        await asyncio.to_thread(_bump_users_version)
+        totals['users'] = len(users)
+    return totals
+
+
+async def _request_full_sync() -> None:
+    """Lanza una sincronización completa de cada modelo tras perder parte del diario"""
+    for kind in SYNC_SPECS:
+        job = await sync_jobs.create_job(kind, full_sync=True)
+        asyncio.ensure_future(sync_jobs.run_sync_job(job['id']))
+        logger.warning(f"Diario de cambios incompleto; lanzada la sincronización completa {job['id']} ({kind})")
+
+
+async def _tail_once(txid: int, seq: int) -> Dict[str, Any]:
+    """Lee y aplica un lote del diario a partir de la posición (`txid`, `seq`)"""
+    result = await async_odoo_client.execute_kw(
+        JOURNAL_MODEL, 'fetch_changes', [seq, settings.SYNC_CHANGE_FEED_BATCH, txid]
+    )
+    _state['last_poll'] = time.time()
+
+    if result['reset']:
+        await _request_full_sync()
+    elif result['changes']:
+        changes = result['changes']
+        started = time.monotonic()
+        totals = await apply_changes(changes)
+        _state['applied'] += len(changes)
+        changed_at = datetime.strptime(changes[-1]['changed_at'], '%Y-%m-%d %H:%M:%S')
+        _state['lag_seconds'] = round(
+            time.time() - changed_at.replace(tzinfo=timezone.utc).timestamp(), 1
+        )
+        logger.info(
+            f"Diario de cambios: {len(changes)} entradas aplicadas "
+            f"(secuencia {changes[0]['seq']}-{changes[-1]['seq']}) en "
+            f"{time.monotonic() - started:.2f} s: {totals}"
+        )
+
+    now = time.time()
+    checkpoint_at = _state['checkpoint_at']
+    moved = (result['last_txid'], result['last_seq']) != (txid, seq)
+    if moved or checkpoint_at is None or now - checkpoint_at >= CHECKPOINT_HEARTBEAT_SECONDS:
+        await asyncio.to_thread(_save_position, result['last_txid'], result['last_seq'])
+        _state['txid'], _state['seq'] = result['last_txid'], result['last_seq']
+        _state['checkpoint_at'] = now
+    return result
+
+
+async def tail_change_journal() -> None:
+    """
+    Lector continuo del diario de cambios.
+
+    Cada worker lo ejecuta, pero solo el que tiene el bloqueo consultivo lee el
+    diario; el resto reintenta periódicamente por si el lector cae.
+    """
+    while True:
+        conn = None
+        try:
+            conn = await asyncio.to_thread(_acquire_leader_lock)
+            if conn is None:
+                await asyncio.sleep(settings.SYNC_CHANGE_FEED_LEADER_RETRY_SECONDS)
+                continue
+
+            _state['leader'] = True
+            txid, seq = await asyncio.to_thread(_load_position)
+            _state['txid'], _state['seq'] = txid, seq
+            logger.info(f"Leyendo el diario de cambios de Odoo desde la transacción {txid}, secuencia {seq}")
+            while True:
+                result = await _tail_once(txid, seq)
+                txid, seq = result['last_txid'], result['last_seq']
+                if not result['has_more']:
+                    await asyncio.sleep(settings.SYNC_CHANGE_FEED_POLL_SECONDS)
+                    await asyncio.to_thread(_check_leader_lock, conn)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Error al leer el diario de cambios de Odoo: {str(e)}")
+            await asyncio.sleep(ERROR_BACKOFF_SECONDS)
+        finally:
+            _state['leader'] = False
+            if conn is not None:
+                await asyncio.to_thread(_release_leader_lock, conn)
+
+
+def change_feed_stats() -> Dict[str, Any]:
+    """Estado del lector del diario en este worker"""
+    return dict(_state)
@@ -0,0 +1,268 @@
+"""
+Índice columnar en memoria para contar facetas del catálogo.
+
+Cada plantilla del catálogo local ocupa una posición fija y cada valor de
+faceta (marca, proveedor, categoría, con stock, tramo de precio) guarda el
+conjunto de posiciones que lo tienen como un bitset (un `int` de Python). Los
+filtros de la consulta actual también se convierten en bitsets, de modo que
+contar cuántos productos hay por valor es un AND y un popcount por valor, sin
+ninguna llamada a Odoo ni a PostgreSQL.
+
+Las facetas son disyuntivas: los recuentos de una faceta aplican todos los
+filtros menos el suyo, para que al elegir una marca sigan viéndose las demás.
+
+El índice se reconstruye entero (en otro hilo) cuando el índice de búsqueda
+detecta cambios en el catálogo y, como mucho, cada `FACET_REBUILD_SECONDS`
+para recoger los cambios de stock, que no modifican las plantillas.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import connection
+from app.services.search_index import fold, product_search_index
+
+logger = logging.getLogger(__name__)
+
+# Límites de los tramos de precio; el último tramo no tiene máximo
+PRICE_BUCKETS = [0, 100, 200, 300, 500, 1000]
+
+# Valores que se devuelven como mucho por faceta (los de más productos)
+FACET_VALUES_LIMIT = 50
+
+FACETS = ('brand', 'supplier', 'category', 'in_stock', 'price')
+
+_popcount = int.bit_count if hasattr(int, 'bit_count') else (lambda mask: bin(mask).count('1'))
+
+
+def _mask(positions: Iterable[int], size: int) -> int:
+    """Bitset con las posiciones indicadas"""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _price_label(lower: float, upper: Optional[float]) -> Tuple[str, str]:
+    if upper is None:
+        return f'{lower:g}-', f'Desde {lower:g} €'
+    return f'{lower:g}-{upper:g}', f'{lower:g} - {upper:g} €'
+
+
+def _load_rows() -> List[Tuple[Any, ...]]:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT p.odoo_id, p.brand, p.supplier, p.category_odoo_id, c.name, p.price,
+                   COALESCE(s.in_stock, false)
+            FROM "CatalogProduct" p
+            LEFT JOIN "Category" c ON c.odoo_id = p.category_odoo_id
+            LEFT JOIN (
+                -- Con stock si alguna variante tiene stock, igual que el filtro del catálogo
+                SELECT template_odoo_id, bool_or(quantity > 0) AS in_stock
+                FROM (
+                    SELECT v.template_odoo_id, sum(q.quantity) AS quantity
+                    FROM "Product" v JOIN "StockQuant" q ON q.product_odoo_id = v.odoo_id
+                    GROUP BY v.template_odoo_id, v.odoo_id
+                ) variants
+                GROUP BY template_odoo_id
+            ) s ON s.template_odoo_id = p.odoo_id
+            ORDER BY p.odoo_id
+            """
+        )
+        return cur.fetchall()
+
+
+class FacetColumns:
+    """Bitsets de cada valor de faceta sobre las plantillas del catálogo"""
+
+    def __init__(self, rows: List[Tuple[Any, ...]]):
+        self.size = len(rows)
+        self.positions: Dict[int, int] = {}
+        self.all = (1 << self.size) - 1
+        # faceta → clave del valor → (valor para filtrar, etiqueta, bitset)
+        self.values: Dict[str, Dict[Any, Tuple[str, str, int]]] = {}
+
+        members: Dict[str, Dict[Any, List[int]]] = {facet: {} for facet in FACETS}
+        labels: Dict[str, Dict[Any, str]] = {facet: {} for facet in FACETS}
+        prices: List[Tuple[float, int]] = []
+        for position, (odoo_id, brand, supplier, category_id, category_name, price, in_stock) in enumerate(rows):
+            self.positions[odoo_id] = position
+            for facet, label in (('brand', brand), ('supplier', supplier)):
+                if label and label.strip():
+                    key = fold(label.strip())
+                    members[facet].setdefault(key, []).append(position)
+                    labels[facet].setdefault(key, label.strip())
+            if category_id:
+                members['category'].setdefault(category_id, []).append(position)
+                labels['category'].setdefault(category_id, category_name or str(category_id))
+            members['in_stock'].setdefault(bool(in_stock), []).append(position)
+            price = price or 0.0
+            prices.append((price, position))
+            bucket = max(bisect.bisect_right(PRICE_BUCKETS, price) - 1, 0)
+            members['price'].setdefault(bucket, []).append(position)
+
+        # El valor es lo que el cliente envía de vuelta como filtro
+        values: Dict[str, Dict[Any, str]] = {
+            'brand': labels['brand'],
+            'supplier': labels['supplier'],
+            'category': {key: str(key) for key in labels['category']},
+            'in_stock': {True: 'true', False: 'false'},
+            'price': {},
+        }
+        labels['in_stock'] = {True: 'En stock', False: 'Sin stock'}
+        for bucket in range(len(PRICE_BUCKETS)):
+            upper = PRICE_BUCKETS[bucket + 1] if bucket + 1 < len(PRICE_BUCKETS) else None
+            values['price'][bucket], labels['price'][bucket] = _price_label(PRICE_BUCKETS[bucket], upper)
+
+        for facet in FACETS:
+            self.values[facet] = {
+                key: (values[facet][key], labels[facet][key], _mask(positions, self.size))
+                for key, positions in members[facet].items()
+            }
+
+        prices.sort()
+        self._prices = [price for price, _ in prices]
+        self._price_positions = [position for _, position in prices]
+
+    def ids_mask(self, ids: Iterable[int]) -> int:
+        positions = self.positions
+        return _mask((positions[i] for i in ids if i in positions), self.size)
+
+    def price_mask(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """Plantillas con `min_price <= precio < max_price`"""
+        start = bisect.bisect_left(self._prices, min_price) if min_price is not None else 0
+        end = bisect.bisect_left(self._prices, max_price) if max_price is not None else len(self._prices)
+        return _mask(self._price_positions[start:end], self.size)
+
+    def counts(self, facet: str, base: int) -> List[Dict[str, Any]]:
+        """Recuento de cada valor de `facet` dentro de `base`"""
+        counted = []
+        for key, (value, label, mask) in self.values[facet].items():
+            count = _popcount(base & mask)
+            if count:
+                counted.append((key, value, label, count))
+        if facet == 'price':
+            # Los tramos de precio se devuelven en orden
+            counted.sort(key=lambda item: item[0])
+        else:
+            counted.sort(key=lambda item: (-item[3], item[2]))
+        return [
+            {'value': value, 'label': label, 'count': count}
+            for _, value, label, count in counted[:FACET_VALUES_LIMIT]
+        ]
+
+
+class FacetIndex:
+    """Índice de facetas que se reconstruye cuando cambia el catálogo"""
+
+    def __init__(self, rebuild_interval: float = settings.FACET_REBUILD_SECONDS):
+        self.rebuild_interval = rebuild_interval
+        self._columns: Optional[FacetColumns] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def rebuild(self) -> None:
+        async with self._lock:
+            started = time.perf_counter()
+            version = product_search_index.version
+            rows = await asyncio.to_thread(_load_rows)
+            self._columns = await asyncio.to_thread(FacetColumns, rows)
+            self._version = version
+            self._built_at = time.monotonic()
+            logger.info(
+                f"Índice de facetas reconstruido: {self._columns.size} productos "
+                f"en {time.perf_counter() - started:.2f} s"
+            )
+
+    async def _rebuild_in_background(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.warning(f"No se pudo reconstruir el índice de facetas: {str(e)}")
+
+    async def ensure_fresh(self) -> None:
+        """
+        Construye el índice la primera vez; después lo reconstruye en segundo
+        plano si el catálogo ha cambiado, y mientras tanto se usa el anterior
+        """
+        await product_search_index.ensure_fresh()
+        if self._columns is None:
+            await self.rebuild()
+            return
+        outdated = (
+            self._version != product_search_index.version
+            or time.monotonic() - self._built_at >= self.rebuild_interval
+        )
+        if outdated and (self._rebuild_task is None or self._rebuild_task.done()):
+            self._rebuild_task = asyncio.create_task(self._rebuild_in_background())
+
+    def compute(
+        self,
+        ids: Optional[List[int]] = None,
+        supplier: Optional[str] = None,
+        category_id: Optional[int] = None,
+        brand: Optional[str] = None,
+        in_stock: Optional[bool] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Recuentos de todas las facetas para la consulta indicada.
+
+        Args:
+            ids: Plantillas que coinciden con la búsqueda de texto (None: todas)
+            supplier: Filtro de proveedor (contiene, sin acentos)
+            category_id: Filtro de categoría
+            brand: Filtro de marca (igual, sin acentos)
+            in_stock: Filtro de disponibilidad
+            min_price, max_price: Filtro de precio (`min_price <= precio < max_price`)
+
+        Returns:
+            Faceta → lista de `{value, label, count}`
+        """
+        columns = self._columns
+        base = columns.all if ids is None else columns.ids_mask(ids)
+
+        filters: Dict[str, int] = {}
+        if supplier:
+            term = fold(supplier)
+            filters['supplier'] = 0
+            for key, (_, _, mask) in columns.values['supplier'].items():
+                if term in key:
+                    filters['supplier'] |= mask
+        if category_id:
+            filters['category'] = columns.values['category'].get(category_id, ('', '', 0))[2]
+        if brand:
+            filters['brand'] = columns.values['brand'].get(fold(brand.strip()), ('', '', 0))[2]
+        if in_stock is not None:
+            filters['in_stock'] = columns.values['in_stock'].get(in_stock, ('', '', 0))[2]
+        if min_price is not None or max_price is not None:
+            filters['price'] = columns.price_mask(min_price, max_price)
+
+        facets = {}
+        for facet in FACETS:
+            mask = base
+            for name, value in filters.items():
+                if name != facet:
+                    mask &= value
+            facets[facet] = columns.counts(facet, mask)
+        return facets
+
+    def stats(self) -> Dict[str, Any]:
+        if self._columns is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'documents': self._columns.size,
+            'built_seconds_ago': round(time.monotonic() - self._built_at, 1),
+        }
+
+
+# Instancia global del índice de facetas
+facet_index = FacetIndex()
@@ -0,0 +1,178 @@
+"""
+Búsqueda exacta de productos por código para el mostrador.
+
+Tablas hash en memoria código → plantillas para los códigos de barras (de la
+plantilla y de cada variante), las referencias internas (`default_code`) y los
+códigos de proveedor (`x_codigo_proveedor` y los de `product.supplierinfo`).
+Los códigos se normalizan sin separadores ni mayúsculas, de modo que
+"ab-123" encuentra "AB 123". Resolver un código es una consulta a un
+diccionario; resolver cientos, una consulta por código y una sola lectura
+del catálogo local.
+
+El índice se reconstruye (en otro hilo) cuando el índice de búsqueda detecta
+cambios en el catálogo y, como mucho, cada `LOOKUP_REBUILD_SECONDS`: los
+códigos de variantes y de proveedor se sincronizan aparte y no cambian la
+versión del índice de búsqueda. Un código que no está en memoria se busca también en
+PostgreSQL, para no perder productos recién sincronizados.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import connection
+from app.services.search_index import compact_code, product_search_index
+
+logger = logging.getLogger(__name__)
+
+# Tipos de código, por orden de preferencia cuando un código coincide con varios
+CODE_TYPES = ('barcode', 'sku', 'supplier_code')
+
+
+def _load_codes() -> List[Tuple[str, Optional[str], int]]:
+    """(tipo de código, código, plantilla) de todo el catálogo"""
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT 'barcode', barcode, odoo_id FROM "CatalogProduct" WHERE barcode IS NOT NULL
+            UNION ALL
+            SELECT 'sku', sku, odoo_id FROM "CatalogProduct" WHERE sku IS NOT NULL
+            UNION ALL
+            SELECT 'supplier_code', supplier_code, odoo_id FROM "CatalogProduct" WHERE supplier_code IS NOT NULL
+            UNION ALL
+            SELECT 'barcode', barcode, template_odoo_id FROM "Product"
+            WHERE barcode IS NOT NULL AND template_odoo_id IS NOT NULL
+            UNION ALL
+            SELECT 'sku', sku, template_odoo_id FROM "Product"
+            WHERE sku IS NOT NULL AND template_odoo_id IS NOT NULL
+            UNION ALL
+            SELECT 'supplier_code', supplier_code, template_odoo_id FROM "SupplierInfo"
+            WHERE supplier_code IS NOT NULL AND template_odoo_id IS NOT NULL
+            """
+        )
+        return cur.fetchall()
+
+
+def _find_codes(codes: List[str]) -> List[Tuple[str, Optional[str], int]]:
+    """Búsqueda exacta en PostgreSQL de códigos que no están en memoria"""
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT 'barcode', barcode, odoo_id FROM "CatalogProduct" WHERE barcode = ANY(%(codes)s)
+            UNION ALL
+            SELECT 'sku', sku, odoo_id FROM "CatalogProduct" WHERE sku = ANY(%(codes)s)
+            UNION ALL
+            SELECT 'supplier_code', supplier_code, odoo_id FROM "CatalogProduct" WHERE supplier_code = ANY(%(codes)s)
+            UNION ALL
+            SELECT 'barcode', barcode, template_odoo_id FROM "Product"
+            WHERE barcode = ANY(%(codes)s) AND template_odoo_id IS NOT NULL
+            UNION ALL
+            SELECT 'sku', sku, template_odoo_id FROM "Product"
+            WHERE sku = ANY(%(codes)s) AND template_odoo_id IS NOT NULL
+            UNION ALL
+            SELECT 'supplier_code', supplier_code, template_odoo_id FROM "SupplierInfo"
+            WHERE supplier_code = ANY(%(codes)s) AND template_odoo_id IS NOT NULL
+            """,
+            {'codes': codes},
+        )
+        return cur.fetchall()
+
+
+def _build(rows: List[Tuple[str, Optional[str], int]]) -> Dict[str, Dict[str, List[int]]]:
+    tables: Dict[str, Dict[str, List[int]]] = {code_type: {} for code_type in CODE_TYPES}
+    for code_type, code, template_id in rows:
+        key = compact_code(code)
+        if not key:
+            continue
+        templates = tables[code_type].setdefault(key, [])
+        if template_id not in templates:
+            templates.append(template_id)
+    return tables
+
+
+def _resolve(tables: Dict[str, Dict[str, List[int]]], code: str) -> Tuple[Optional[str], List[int]]:
+    key = compact_code(code)
+    for code_type in CODE_TYPES:
+        templates = tables[code_type].get(key)
+        if templates:
+            return code_type, templates
+    return None, []
+
+
+class LookupIndex:
+    """Tablas hash de códigos que se reconstruyen cuando cambia el catálogo"""
+
+    def __init__(self, rebuild_interval: float = settings.LOOKUP_REBUILD_SECONDS):
+        self.rebuild_interval = rebuild_interval
+        self._tables: Optional[Dict[str, Dict[str, List[int]]]] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def rebuild(self) -> None:
+        async with self._lock:
+            started = time.perf_counter()
+            version = product_search_index.version
+            rows = await asyncio.to_thread(_load_codes)
+            self._tables = await asyncio.to_thread(_build, rows)
+            self._version = version
+            self._built_at = time.monotonic()
+            logger.info(
+                f"Índice de códigos reconstruido: {len(rows)} códigos "
+                f"en {time.perf_counter() - started:.2f} s"
+            )
+
+    async def _rebuild_in_background(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.warning(f"No se pudo reconstruir el índice de códigos: {str(e)}")
+
+    async def ensure_fresh(self) -> None:
+        """
+        Construye el índice la primera vez; después lo reconstruye en segundo
+        plano si el catálogo ha cambiado, y mientras tanto se usa el anterior
+        """
+        await product_search_index.ensure_fresh()
+        if self._tables is None:
+            await self.rebuild()
+            return
+        outdated = (
+            self._version != product_search_index.version
+            or time.monotonic() - self._built_at >= self.rebuild_interval
+        )
+        if outdated and (self._rebuild_task is None or self._rebuild_task.done()):
+            self._rebuild_task = asyncio.create_task(self._rebuild_in_background())
+
+    async def resolve(self, codes: List[str]) -> Dict[str, Tuple[Optional[str], List[int]]]:
+        """
+        Plantillas de cada código.
+
+        Returns:
+            Código → (tipo de código que coincidió, IDs de plantilla)
+        """
+        await self.ensure_fresh()
+        results = {code: _resolve(self._tables, code) for code in codes}
+
+        missing = [code for code, (code_type, _) in results.items() if code_type is None]
+        if missing:
+            # Productos sincronizados después de la última reconstrucción
+            found = _build(await asyncio.to_thread(_find_codes, missing))
+            for code in missing:
+                results[code] = _resolve(found, code)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        if self._tables is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'codes': {code_type: len(table) for code_type, table in self._tables.items()},
+            'built_seconds_ago': round(time.monotonic() - self._built_at, 1),
+        }
+
+
+# Instancia global del índice de códigos
+lookup_index = LookupIndex()
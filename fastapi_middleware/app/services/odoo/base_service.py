@@ -4,14 +4,17 @@ Servicio base para la integración con Odoo a través de XML-RPC.
 Este módulo proporciona una clase base para interactuar con la API de Odoo
 de manera segura y eficiente, con manejo de conexiones, reintentos y errores.
 """
+import asyncio
 import xmlrpc.client
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from functools import wraps
 import time
 from pydantic import BaseModel, Field
 
 from app.core.config import settings
+from app.core.odoo_async_client import BATCH_METHOD, BATCH_MODEL, PAGE_METHOD, missing_method
+from app.core.xmlrpc_pool import server_proxy
 
 logger = logging.getLogger(__name__)
 
@@ -88,19 +91,21 @@ class OdooBaseService:
         self._common = None
         self._models = None
         self._uid = None
+        # Si Odoo tiene instalados los métodos de `odoo_api_rest` (None: sin comprobar)
+        self._api_methods: Optional[bool] = None
     
     @property
     def common(self):
         """Cliente para el endpoint common de Odoo."""
         if self._common is None:
-            self._common = xmlrpc.client.ServerProxy(f"{self.config.url}/xmlrpc/2/common")
+            self._common = server_proxy(self.config.url, "common", settings.ODOO_POOL_SIZE)
         return self._common
     
     @property
     def models(self):
         """Cliente para el endpoint object de Odoo."""
         if self._models is None:
-            self._models = xmlrpc.client.ServerProxy(f"{self.config.url}/xmlrpc/2/object")
+            self._models = server_proxy(self.config.url, "object", settings.ODOO_POOL_SIZE)
         return self._models
     
     @property
@@ -225,7 +230,176 @@ class OdooBaseService:
         if order:
             kwargs["order"] = order
             
-        return self.execute_kw(model, "search_read", domain, kwargs)
+        return self.execute_kw(model, "search_read", domain, **kwargs)
+    
+    def search_read_page(
+        self,
+        model: str,
+        domain: Optional[list] = None,
+        fields: Optional[list] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        order: Optional[str] = None,
+        count: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Busca y lee una página de registros y cuenta el total en una sola
+        llamada XML-RPC (`api_search_read_page` del módulo `odoo_api_rest`).
+        
+        Si Odoo no tiene el método, se hacen `search_read` y `search_count`.
+        
+        Args:
+            model: Nombre del modelo de Odoo
+            domain: Dominio de búsqueda (filtro)
+            fields: Lista de campos a devolver
+            offset: Número de registros a omitir
+            limit: Número máximo de registros a devolver
+            order: Campo(s) por los que ordenar
+            count: Si se debe devolver también el total
+            
+        Returns:
+            Diccionario con `records` (registros) y `length` (total o None)
+        """
+        domain = domain or []
+        fields = fields or ["id", "name"]
+        
+        if self._api_methods is not False:
+            kwargs = {"fields": fields, "offset": offset, "count": count}
+            if limit:
+                kwargs["limit"] = limit
+            if order:
+                kwargs["order"] = order
+            try:
+                result = self.execute_kw(model, PAGE_METHOD, domain, **kwargs)
+                self._api_methods = True
+                return result
+            except OdooConnectionError as e:
+                if not missing_method(e, PAGE_METHOD):
+                    raise
+                logger.warning("Odoo no tiene el módulo odoo_api_rest actualizado; se usarán llamadas separadas")
+                self._api_methods = False
+        
+        records = self.search_read(model, domain, fields, offset=offset, limit=limit, order=order)
+        return {
+            "records": records,
+            "length": self.search_count(model, domain) if count else None,
+        }
+    
+    def execute_batch(self, calls: List[Tuple[str, str, list, Optional[dict]]]) -> List[Any]:
+        """
+        Ejecuta varias operaciones en una sola llamada XML-RPC
+        (`api_execute_batch` del módulo `odoo_api_rest`).
+        
+        Si Odoo no tiene el método, las operaciones se ejecutan una a una.
+        
+        Args:
+            calls: Lista de operaciones `(modelo, método, args, kwargs)`
+            
+        Returns:
+            Resultado de cada operación, en el mismo orden
+        """
+        calls = [(model, method, list(args), kw or {}) for model, method, args, kw in calls]
+        
+        if self._api_methods is not False:
+            try:
+                results = self.execute_kw(BATCH_MODEL, BATCH_METHOD, [list(c) for c in calls])
+                self._api_methods = True
+                return results
+            except OdooConnectionError as e:
+                if not missing_method(e, BATCH_METHOD):
+                    raise
+                logger.warning("Odoo no tiene el módulo odoo_api_rest actualizado; se usarán llamadas separadas")
+                self._api_methods = False
+        
+        return [self.execute_kw(model, method, *args, **kw) for model, method, args, kw in calls]
+    
+    def search(
+        self,
+        model: str,
+        domain: Optional[list] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        order: Optional[str] = None
+    ) -> List[int]:
+        """
+        Busca registros de un modelo de Odoo y devuelve solo sus IDs.
+        
+        Args:
+            model: Nombre del modelo de Odoo
+            domain: Dominio de búsqueda (filtro)
+            offset: Número de registros a omitir
+            limit: Número máximo de registros a devolver
+            order: Campo(s) por los que ordenar
+            
+        Returns:
+            Lista de IDs de los registros encontrados
+        """
+        kwargs = {}
+        if offset:
+            kwargs["offset"] = offset
+        if limit:
+            kwargs["limit"] = limit
+        if order:
+            kwargs["order"] = order
+            
+        return self.execute_kw(model, "search", domain or [], **kwargs)
+    
+    def search_count(self, model: str, domain: Optional[list] = None) -> int:
+        """
+        Cuenta los registros de un modelo que cumplen un dominio.
+        
+        Args:
+            model: Nombre del modelo de Odoo
+            domain: Dominio de búsqueda (filtro)
+            
+        Returns:
+            Número de registros
+        """
+        return self.execute_kw(model, "search_count", domain or [])
+    
+    async def iter_batches(
+        self,
+        model: str,
+        domain: Optional[list] = None,
+        fields: Optional[list] = None,
+        batch_size: int = 500,
+        start_after: int = 0
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Recorre los registros de un modelo por lotes con paginación keyset.
+        
+        Cada página se pide con `id > último id leído` y orden por `id`, de modo
+        que el coste por página no crece con el tamaño del catálogo (a diferencia
+        de `offset`) y los registros creados durante el recorrido no desplazan
+        las páginas. Las llamadas XML-RPC se ejecutan en un hilo para no bloquear
+        el event loop.
+        
+        Args:
+            model: Nombre del modelo de Odoo
+            domain: Dominio de búsqueda (filtro)
+            fields: Lista de campos a devolver
+            batch_size: Número de registros por lote
+            start_after: ID a partir del cual empezar (para reanudar un recorrido)
+            
+        Yields:
+            Listas de registros ordenados por ID
+        """
+        last_id = start_after
+        while True:
+            batch = await asyncio.to_thread(
+                self.search_read,
+                model,
+                domain=list(domain or []) + [('id', '>', last_id)],
+                fields=fields,
+                limit=batch_size,
+                order='id asc'
+            )
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]['id']
+            if len(batch) < batch_size:
+                return
     
     def create(self, model: str, values: Dict[str, Any]) -> int:
         """
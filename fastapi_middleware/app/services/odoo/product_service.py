@@ -4,19 +4,16 @@ Servicio para la gestión de productos en Odoo.
 Este módulo proporciona funcionalidad para sincronizar productos entre Odoo
 y la base de datos local, incluyendo la gestión de categorías, atributos y variantes.
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 import logging
-from datetime import datetime
 
-from prisma import Prisma
-from prisma.models import Product as DBProduct
-
-from .base_service import OdooBaseService, OdooConfig
-from app.core.config import settings
+from .sync_engine import SyncEngine, SyncSpec, many2one_id
 
 logger = logging.getLogger(__name__)
 
-# Mapeo de campos entre Odoo y nuestro modelo local
+# Mapeo de campos entre Odoo y nuestro modelo local. El stock no se copia:
+# `qty_available` no está almacenado y los movimientos no cambian el
+# `write_date` del producto; se calcula de `StockQuant` (ver `STOCK_SPEC`)
 PRODUCT_FIELD_MAPPING = {
     'id': 'odoo_id',
     'name': 'name',
@@ -26,10 +23,10 @@ PRODUCT_FIELD_MAPPING = {
     'x_pvp_web': 'sale_price',
     'x_dto': 'discount',
     'x_marca': 'brand',
-    'qty_available': 'stock_quantity',
+    'x_nombre_proveedor': 'supplier',
     'description_sale': 'description',
-    'categ_id': 'category_id',
-    'image_1920': 'image_url',
+    'categ_id': 'category_odoo_id',
+    'product_tmpl_id': 'template_odoo_id',
     'active': 'is_active',
     'create_date': 'created_at',
     'write_date': 'updated_at'
@@ -38,8 +35,30 @@ PRODUCT_FIELD_MAPPING = {
 # Campos a solicitar a la API de Odoo
 PRODUCT_FIELDS = list(PRODUCT_FIELD_MAPPING.keys())
 
+# Modelo de Odoo sincronizado
+PRODUCT_MODEL = 'product.product'
+
+# Tabla local de productos (modelo `Product` de Prisma)
+PRODUCT_TABLE = 'Product'
+
+# Sincronización de productos: solo los que están a la venta
+PRODUCT_SPEC = SyncSpec(
+    name='products',
+    model=PRODUCT_MODEL,
+    table=PRODUCT_TABLE,
+    fields=PRODUCT_FIELD_MAPPING,
+    domain=[('sale_ok', '=', True)],
+    boolean_fields={'is_active'},
+    transforms={
+        'category_odoo_id': many2one_id,
+        'template_odoo_id': many2one_id,
+    },
+    defaults={'is_active': True, 'price': 0.0},
+    changes={'product.product': 'id', 'product.template': 'product_tmpl_id'},
+)
+
 
-class ProductService(OdooBaseService):
+class ProductService(SyncEngine):
     """
     Servicio para la gestión de productos en Odoo.
     
@@ -47,11 +66,6 @@ class ProductService(OdooBaseService):
     productos entre Odoo y la base de datos local.
     """
     
-    def __init__(self, config: Optional[OdooConfig] = None):
-        """Inicializa el servicio de productos."""
-        super().__init__(config)
-        self.prisma = Prisma()
-    
     async def _map_odoo_to_local(self, odoo_product: Dict[str, Any]) -> Dict[str, Any]:
         """
         Mapea un producto de Odoo al formato local.
@@ -62,28 +76,7 @@ class ProductService(OdooBaseService):
         Returns:
             Dict con los datos mapeados al formato local
         """
-        mapped = {}
-        
-        # Mapear campos directos
-        for odoo_field, local_field in PRODUCT_FIELD_MAPPING.items():
-            if odoo_field in odoo_product:
-                mapped[local_field] = odoo_product[odoo_field]
-        
-        # Procesar campos especiales
-        if 'categ_id' in odoo_product and isinstance(odoo_product['categ_id'], (list, tuple)):
-            mapped['category_id'] = odoo_product['categ_id'][0] if odoo_product['categ_id'] else None
-        
-        # Procesar imagen
-        if 'image_1920' in odoo_product and odoo_product['image_1920']:
-            # Aquí podrías implementar la lógica para guardar la imagen
-            # Por ahora, solo guardamos un indicador de que hay imagen
-            mapped['has_image'] = True
-        
-        # Asegurar que los campos requeridos tengan un valor por defecto
-        mapped.setdefault('is_active', True)
-        mapped.setdefault('stock_quantity', 0)
-        
-        return mapped
+        return PRODUCT_SPEC.map_record(odoo_product)
     
     async def get_products(
         self,
@@ -110,7 +103,7 @@ class ProductService(OdooBaseService):
         fields = fields or PRODUCT_FIELDS
         
         return self.search_read(
-            'product.product',
+            PRODUCT_MODEL,
             domain=domain,
             fields=fields,
             limit=limit,
@@ -122,161 +115,34 @@ class ProductService(OdooBaseService):
         self,
         domain: Optional[List[Any]] = None,
         batch_size: int = 100,
-        full_sync: bool = False
+        full_sync: bool = False,
+        start_after: int = 0,
+        progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
     ) -> Dict[str, int]:
         """
         Sincroniza productos desde Odoo a la base de datos local.
         
+        Es la sincronización genérica de `SyncEngine.sync_model` con el mapeo
+        de productos: incremental por `write_date`, reanudable desde el último
+        lote confirmado y con detección de eliminados.
+        
         Args:
-            domain: Dominio de búsqueda para filtrar productos
+            domain: Dominio de búsqueda para filtrar productos. Con un dominio
+                    personalizado no se usa ni se actualiza la marca de agua ni
+                    se eliminan productos locales
             batch_size: Tamaño del lote para procesamiento por lotes
-            full_sync: Si es True, realiza una sincronización completa (elimina registros locales que no existen en Odoo)
+            full_sync: Si es True, realiza una reconciliación completa
+            start_after: ID a partir del cual reanudar
+            progress: Callback que se llama tras cada lote con los contadores
             
         Returns:
             Diccionario con estadísticas de la sincronización
         """
-        stats = {
-            'total': 0,
-            'created': 0,
-            'updated': 0,
-            'deleted': 0,
-            'errors': 0,
-            'start_time': datetime.utcnow()
-        }
-        
-        try:
-            # Conectar a la base de datos
-            await self.prisma.connect()
-            
-            # Obtener IDs de productos existentes para seguimiento
-            existing_ids = set()
-            if full_sync:
-                existing_products = await DBProduct.prisma().find_many(select={'odoo_id': True})
-                existing_ids = {p.odoo_id for p in existing_products}
-            
-            # Obtener productos de Odoo por lotes
-            offset = 0
-            while True:
-                products = await self.get_products(
-                    domain=domain,
-                    fields=PRODUCT_FIELDS,
-                    limit=batch_size,
-                    offset=offset,
-                    order='id ASC'  # Ordenar por ID para paginación consistente
-                )
-                
-                if not products:
-                    break
-                
-                logger.info(f"Procesando lote de {len(products)} productos (offset: {offset})")
-                
-                for product_data in products:
-                    try:
-                        odoo_id = product_data['id']
-                        
-                        # Mapear datos de Odoo al formato local
-                        product_values = await self._map_odoo_to_local(product_data)
-                        
-                        # Verificar si el producto ya existe
-                        existing_product = await DBProduct.prisma().find_unique(
-                            where={'odoo_id': odoo_id}
-                        )
-                        
-                        if existing_product:
-                            # Actualizar producto existente
-                            await DBProduct.prisma().update(
-                                where={'id': existing_product.id},
-                                data=product_values
-                            )
-                            stats['updated'] += 1
-                            
-                            # Eliminar de la lista de IDs existentes (para seguimiento de eliminados)
-                            if odoo_id in existing_ids:
-                                existing_ids.remove(odoo_id)
-                        else:
-                            # Crear nuevo producto
-                            await DBProduct.prisma().create(
-                                data={
-                                    'odoo_id': odoo_id,
-                                    **product_values
-                                }
-                            )
-                            stats['created'] += 1
-                        
-                        stats['total'] += 1
-                        
-                        # Log cada 100 productos procesados
-                        if stats['total'] % 100 == 0:
-                            logger.info(f"Productos procesados: {stats['total']}")
-                            
-                    except Exception as e:
-                        logger.error(f"Error al procesar producto {product_data.get('id')}: {str(e)}", exc_info=True)
-                        stats['errors'] += 1
-                
-                # Pasar al siguiente lote
-                offset += len(products)
-                if len(products) < batch_size:
-                    break
-            
-            # Eliminar productos que ya no existen en Odoo (solo en sincronización completa)
-            if full_sync and existing_ids:
-                logger.info(f"Eliminando {len(existing_ids)} productos que ya no existen en Odoo")
-                
-                # Eliminar en lotes para evitar timeouts
-                batch = []
-                for odoo_id in existing_ids:
-                    batch.append(odoo_id)
-                    if len(batch) >= 100:
-                        await self._delete_products_batch(batch)
-                        stats['deleted'] += len(batch)
-                        batch = []
-                
-                # Eliminar cualquier lote restante
-                if batch:
-                    await self._delete_products_batch(batch)
-                    stats['deleted'] += len(batch)
-            
-            logger.info("Sincronización de productos completada")
-            
-        except Exception as e:
-            logger.error(f"Error en la sincronización de productos: {str(e)}", exc_info=True)
-            stats['error'] = str(e)
-            
-        finally:
-            # Cerrar la conexión a la base de datos
-            await self.prisma.disconnect()
-            
-            # Calcular tiempo de ejecución
-            stats['end_time'] = datetime.utcnow()
-            stats['duration_seconds'] = (stats['end_time'] - stats['start_time']).total_seconds()
-            
-            logger.info(
-                f"Resumen de sincronización: "
-                f"{stats['total']} procesados, "
-                f"{stats['created']} creados, "
-                f"{stats['updated']} actualizados, "
-                f"{stats['deleted']} eliminados, "
-                f"{stats['errors']} errores, "
-                f"duración: {stats['duration_seconds']:.2f} segundos"
-            )
-            
-        return stats
-    
-    async def _delete_products_batch(self, odoo_ids: List[int]) -> None:
-        """
-        Elimina un lote de productos por sus IDs de Odoo.
-        
-        Args:
-            odoo_ids: Lista de IDs de Odoo a eliminar
-        """
-        try:
-            await DBProduct.prisma().delete_many(
-                where={
-                    'odoo_id': {
-                        'in': odoo_ids
-                    }
-                }
-            )
-        except Exception as e:
-            logger.error(f"Error al eliminar lote de productos: {str(e)}", exc_info=True)
-            raise
+        return await self.sync_model(
+            PRODUCT_SPEC,
+            domain=domain,
+            batch_size=batch_size,
+            full_sync=full_sync,
+            start_after=start_after,
+            progress=progress
+        )
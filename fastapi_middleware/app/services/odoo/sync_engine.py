@@ -0,0 +1,430 @@
+"""
+Motor de sincronización genérico entre modelos de Odoo y tablas locales.
+
+Cada modelo sincronizado se describe con un `SyncSpec` declarativo: modelo de
+Odoo, dominio, mapeo de campos, transformaciones y clave. El motor aplica a
+todos la misma maquinaria:
+
+- lectura por lotes con paginación keyset (`iter_batches`)
+- pipeline lectura → mapeo → escritura (`BatchPipeline`)
+- escritura masiva con `COPY` + `INSERT ... ON CONFLICT` (`BulkUpsertWriter`),
+  que no reescribe las filas cuya huella de contenido no ha cambiado
+- marca de agua por `write_date` y punto de control por id en `sync_state`
+- detección de eliminados comparando conjuntos de IDs
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .base_service import OdooBaseService
+from app.core.config import settings
+from app.core.database import connection
+from app.core.fingerprint import fingerprint
+from app.services.bulk_writer import BulkUpsertWriter
+from app.services.sync_pipeline import BatchPipeline, PipelineBatch, SyncCancelled
+
+logger = logging.getLogger(__name__)
+
+ProgressFn = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Columna local con la huella del contenido de cada fila
+FINGERPRINT_COLUMN = 'fingerprint'
+
+
+def many2one_id(value: Any) -> Optional[int]:
+    """ID de un valor many2one de Odoo (`[id, nombre]`)"""
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value or None
+
+
+def many2one_name(value: Any) -> Optional[str]:
+    """Nombre de un valor many2one de Odoo (`[id, nombre]`)"""
+    if isinstance(value, (list, tuple)) and len(value) > 1:
+        return value[1]
+    return None
+
+
+def to_int(value: Any) -> int:
+    return int(value or 0)
+
+
+@dataclass
+class SyncSpec:
+    """
+    Descripción declarativa de un modelo sincronizado.
+
+    Args:
+        name: Nombre del tipo de sincronización (se usa como tipo de trabajo)
+        model: Modelo de Odoo
+        table: Tabla local
+        fields: Mapeo campo de Odoo → columna local; debe incluir la clave
+        domain: Dominio que delimita los registros sincronizados
+        key: Columna local con restricción única
+        boolean_fields: Columnas booleanas (en el resto, el False de Odoo es NULL)
+        transforms: Transformación por columna aplicada al valor de Odoo
+        computed: Columnas calculadas a partir del registro completo de Odoo
+        defaults: Valor por columna cuando el de Odoo está vacío
+        changes: Modelo del diario de cambios → campo de este modelo que
+                 identifica los registros afectados (`id` si es el mismo modelo)
+        volatile: Columnas que no cuentan para la huella de contenido
+    """
+    name: str
+    model: str
+    table: str
+    fields: Dict[str, str]
+    domain: List[Any] = field(default_factory=list)
+    key: str = 'odoo_id'
+    boolean_fields: Set[str] = field(default_factory=set)
+    transforms: Dict[str, Callable[[Any], Any]] = field(default_factory=dict)
+    computed: Dict[str, Callable[[Dict[str, Any]], Any]] = field(default_factory=dict)
+    defaults: Dict[str, Any] = field(default_factory=dict)
+    changes: Dict[str, str] = field(default_factory=dict)
+    volatile: Set[str] = field(default_factory=lambda: {'created_at', 'updated_at'})
+
+    def __post_init__(self):
+        columns = list(dict.fromkeys([*self.fields.values(), *self.computed, FINGERPRINT_COLUMN]))
+        self.odoo_fields = list(self.fields)
+        self.writer = BulkUpsertWriter(self.table, columns, key=self.key, fingerprint=FINGERPRINT_COLUMN)
+
+    def map_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Mapea un registro de Odoo al formato local"""
+        row = {}
+        for odoo_field, column in self.fields.items():
+            value = record.get(odoo_field)
+            if value is False and column not in self.boolean_fields:
+                value = None
+            transform = self.transforms.get(column)
+            if transform:
+                value = transform(value)
+            row[column] = value
+        for column, compute in self.computed.items():
+            row[column] = compute(record)
+        for column, default in self.defaults.items():
+            if row.get(column) is None:
+                row[column] = default
+        row[FINGERPRINT_COLUMN] = fingerprint(row, exclude=self.volatile)
+        return row
+
+
+def _load_watermark(model: str) -> Optional[Dict[str, Any]]:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT last_write_date, last_id, target_write_date FROM sync_state WHERE model = %s",
+            (model,),
+        )
+        row = cur.fetchone()
+    if not row or not row[0]:
+        return None
+    return {'write_date': row[0], 'id': row[1], 'target': row[2]}
+
+
+def _save_watermark(
+    model: str,
+    write_date: str,
+    record_id: int = 0,
+    target: Optional[str] = None,
+    full_sync: bool = False
+) -> None:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO sync_state (model, last_write_date, last_id, target_write_date, last_full_sync, updated_at)
+            VALUES (%s, %s, %s, %s, CASE WHEN %s THEN now() END, now())
+            ON CONFLICT (model) DO UPDATE SET
+                last_write_date = EXCLUDED.last_write_date,
+                last_id = EXCLUDED.last_id,
+                target_write_date = EXCLUDED.target_write_date,
+                last_full_sync = COALESCE(EXCLUDED.last_full_sync, sync_state.last_full_sync),
+                updated_at = now()
+            """,
+            (model, write_date, record_id, target, full_sync),
+        )
+
+
+class SyncEngine(OdooBaseService):
+    """
+    Sincroniza cualquier modelo descrito por un `SyncSpec` desde Odoo a la base
+    de datos local.
+    """
+
+    async def _map_batch(self, spec: SyncSpec, records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Mapea un lote de registros de Odoo al formato local.
+
+        Returns:
+            Tupla (filas mapeadas, número de registros que no se pudieron mapear)
+        """
+        rows = []
+        errors = 0
+        for record in records:
+            try:
+                rows.append(spec.map_record(record))
+            except Exception as e:
+                logger.error(f"Error al procesar {spec.model} {record.get('id')}: {str(e)}", exc_info=True)
+                errors += 1
+        return rows, errors
+
+    async def _latest_write_date(self, model: str) -> Optional[str]:
+        """`write_date` más reciente del modelo en Odoo"""
+        latest = await asyncio.to_thread(
+            self.search_read, model, [], ['write_date'], limit=1, order='write_date desc'
+        )
+        return latest[0]['write_date'] if latest else None
+
+    async def sync_model(
+        self,
+        spec: SyncSpec,
+        domain: Optional[List[Any]] = None,
+        batch_size: int = 100,
+        full_sync: bool = False,
+        start_after: int = 0,
+        progress: Optional[ProgressFn] = None
+    ) -> Dict[str, Any]:
+        """
+        Sincroniza un modelo desde Odoo a su tabla local.
+
+        Por defecto la sincronización es incremental: solo se leen los registros
+        con `write_date` posterior a la marca de agua guardada en `sync_state`.
+        Los registros se recorren por lotes con paginación keyset por `id` y,
+        tras cada lote aplicado sin errores, se guarda el último `id` para que
+        una ejecución interrumpida se reanude desde ahí. Al terminar, la marca
+        avanza hasta el `write_date` más reciente que había en Odoo al empezar,
+        de modo que los cambios hechos durante la ejecución se leen en la
+        siguiente. Las eliminaciones se detectan comparando únicamente los
+        conjuntos de IDs de Odoo y locales.
+
+        Args:
+            spec: Modelo a sincronizar
+            domain: Dominio de búsqueda. Con un dominio personalizado no se usa
+                    ni se actualiza la marca de agua ni se eliminan registros
+            batch_size: Tamaño del lote para procesamiento por lotes
+            full_sync: Si es True, realiza una reconciliación completa: ignora la
+                       marca de agua y vuelve a leer todos los registros
+            start_after: ID a partir del cual reanudar (punto de control de un
+                         trabajo interrumpido)
+            progress: Callback que se llama tras cada lote con los contadores y
+                      el último id confirmado (`checkpoint_id`). Puede lanzar
+                      `SyncCancelled` para detener la sincronización
+
+        Returns:
+            Diccionario con estadísticas de la sincronización
+        """
+        stats = {
+            'mode': 'full' if full_sync else 'incremental',
+            'total': 0,
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'deleted': 0,
+            'errors': 0,
+            'write_seconds': 0.0,
+            'batches': [],
+            'start_time': datetime.utcnow()
+        }
+
+        # Solo el modelo completo tiene marca de agua y detección de eliminados
+        scoped = domain is None
+        base_domain = list(spec.domain) if scoped else list(domain)
+
+        try:
+            fetch_domain = list(base_domain)
+            lower_bound = None
+            resume_after = 0
+            target = None
+            if scoped:
+                watermark = None if full_sync else await asyncio.to_thread(_load_watermark, spec.model)
+                if watermark:
+                    lower_bound = watermark['write_date']
+                    # Odoo devuelve write_date con precisión de segundos, así que se
+                    # vuelve a leer el segundo frontera en lugar de arriesgarse a
+                    # perder cambios hechos en ese mismo segundo
+                    fetch_domain.append(('write_date', '>=', lower_bound))
+                    if watermark['id'] and watermark['target']:
+                        resume_after = watermark['id']
+                        target = watermark['target']
+                        logger.info(f"Reanudando sincronización incremental de {spec.model} tras el id {resume_after}")
+                else:
+                    stats['mode'] = 'full'
+                if target is None:
+                    target = await self._latest_write_date(spec.model)
+                if lower_bound:
+                    logger.info(f"Sincronización incremental de {spec.model} desde {lower_bound}")
+            resume_after = max(resume_after, start_after)
+            stats['resumed_after'] = resume_after
+            checkpoint_id = resume_after
+
+            # Registros pendientes, para estimar el tiempo restante
+            expected = await asyncio.to_thread(
+                self.search_count, spec.model, fetch_domain + [('id', '>', resume_after)]
+            )
+            stats['expected'] = expected
+            started = time.monotonic()
+
+            # Una vez que falla un lote ni el punto de control ni la marca de agua
+            # avanzan, para que la siguiente ejecución vuelva a intentar desde el
+            # último lote correcto
+            checkpoint_ok = True
+
+            async def map_rows(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+                return await self._map_batch(spec, records)
+
+            async def write_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+                return await asyncio.to_thread(spec.writer.upsert, rows)
+
+            async def on_batch(batch: PipelineBatch) -> None:
+                nonlocal checkpoint_ok, checkpoint_id
+                records = batch.records
+                stats['errors'] += batch.map_errors
+                if batch.result is not None:
+                    written = batch.result
+                    stats['total'] += written['rows']
+                    stats['created'] += written['created']
+                    stats['updated'] += written['updated']
+                    stats['unchanged'] += written['unchanged']
+                    stats['write_seconds'] += written['seconds']
+                    stats['batches'].append({'rows': written['rows'], 'seconds': written['seconds']})
+                    logger.info(
+                        f"Lote de {len(records)} registros de {spec.model} escrito "
+                        f"(ids {records[0]['id']}-{records[-1]['id']}, "
+                        f"{written['rows']} filas, {written['unchanged']} sin cambios, "
+                        f"en {written['seconds']:.3f} s)"
+                    )
+                elif batch.error is not None:
+                    # Ninguna fila del lote llegó a escribirse
+                    stats['errors'] += len(batch.rows)
+
+                if batch.error is not None or batch.map_errors:
+                    checkpoint_ok = False
+                elif checkpoint_ok:
+                    # Punto de control para reanudar una ejecución interrumpida.
+                    # Los lotes llegan en orden de lectura, así que todos los
+                    # anteriores ya están escritos
+                    checkpoint_id = records[-1]['id']
+                    if scoped and lower_bound:
+                        await asyncio.to_thread(
+                            _save_watermark, spec.model, lower_bound, checkpoint_id, target
+                        )
+
+                if progress:
+                    elapsed = time.monotonic() - started
+                    done = stats['total'] + stats['errors']
+                    rate = done / elapsed if elapsed > 0 else 0.0
+                    remaining = max(expected - done, 0)
+                    await progress({
+                        'checkpoint_id': checkpoint_id,
+                        'processed': stats['total'],
+                        'created': stats['created'],
+                        'updated': stats['updated'],
+                        'unchanged': stats['unchanged'],
+                        'deleted': stats['deleted'],
+                        'errors': stats['errors'],
+                        'expected': expected,
+                        'elapsed_seconds': round(elapsed, 2),
+                        'rate_per_second': round(rate, 1),
+                        'eta_seconds': round(remaining / rate, 1) if rate else None
+                    })
+
+            # Lectura, mapeo y escritura en paralelo con colas acotadas
+            pipeline = BatchPipeline(
+                transform=map_rows,
+                write=write_rows,
+                on_batch=on_batch,
+                prefetch=settings.SYNC_PREFETCH_PAGES,
+                map_concurrency=settings.SYNC_MAP_CONCURRENCY,
+                write_concurrency=settings.SYNC_WRITE_CONCURRENCY
+            )
+            await pipeline.run(self.iter_batches(
+                spec.model,
+                domain=fetch_domain,
+                fields=spec.odoo_fields,
+                batch_size=batch_size,
+                start_after=resume_after
+            ))
+
+            if scoped and checkpoint_ok and target:
+                await asyncio.to_thread(_save_watermark, spec.model, target, 0, None, full_sync)
+
+            # Detectar eliminados comparando solo IDs
+            if scoped:
+                odoo_ids = set(await asyncio.to_thread(self.search, spec.model, base_domain))
+                local_ids = await asyncio.to_thread(spec.writer.existing_keys)
+                removed_ids = sorted(local_ids - odoo_ids)
+
+                if removed_ids:
+                    logger.info(f"Eliminando {len(removed_ids)} registros de {spec.table} que ya no existen en Odoo")
+
+                    # Eliminar en lotes para evitar timeouts
+                    for start in range(0, len(removed_ids), batch_size):
+                        chunk = removed_ids[start:start + batch_size]
+                        await asyncio.to_thread(spec.writer.delete, chunk)
+                        stats['deleted'] += len(chunk)
+
+            logger.info(f"Sincronización de {spec.model} completada")
+
+        except SyncCancelled:
+            logger.info(f"Sincronización de {spec.model} cancelada")
+            stats['cancelled'] = True
+
+        except Exception as e:
+            logger.error(f"Error en la sincronización de {spec.model}: {str(e)}", exc_info=True)
+            stats['error'] = str(e)
+
+        finally:
+            # Calcular tiempo de ejecución
+            stats['end_time'] = datetime.utcnow()
+            stats['duration_seconds'] = (stats['end_time'] - stats['start_time']).total_seconds()
+
+            logger.info(
+                f"Resumen de sincronización de {spec.model} ({stats['mode']}): "
+                f"{stats['total']} procesados, "
+                f"{stats['created']} creados, "
+                f"{stats['updated']} actualizados, "
+                f"{stats['unchanged']} sin cambios, "
+                f"{stats['deleted']} eliminados, "
+                f"{stats['errors']} errores, "
+                f"escritura: {stats['write_seconds']:.2f} s en {len(stats['batches'])} lotes, "
+                f"duración: {stats['duration_seconds']:.2f} segundos"
+            )
+
+        return stats
+
+    async def apply_changes(self, spec: SyncSpec, odoo_field: str, ids: List[int]) -> Dict[str, int]:
+        """
+        Aplica a la tabla local los cambios de unos registros concretos.
+
+        Se vuelven a leer de Odoo los registros cuyo `odoo_field` está en `ids`
+        y se escriben; los locales afectados que Odoo ya no devuelve (borrados,
+        archivados o fuera del dominio) se eliminan, igual que en una
+        reconciliación completa. Aplicar dos veces el mismo cambio es inocuo.
+
+        Args:
+            spec: Modelo afectado
+            odoo_field: Campo de `spec.model` que contiene los IDs (`id` o un many2one)
+            ids: IDs modificados
+
+        Returns:
+            Diccionario con las filas procesadas, creadas, actualizadas, sin
+            cambios y eliminadas
+        """
+        result = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'errors': 0}
+        if not ids:
+            return result
+
+        records = await asyncio.to_thread(
+            self.search_read, spec.model,
+            list(spec.domain) + [(odoo_field, 'in', list(ids))], spec.odoo_fields
+        )
+        rows, result['errors'] = await self._map_batch(spec, records)
+        if rows:
+            written = await asyncio.to_thread(spec.writer.upsert, rows)
+            for key in ('rows', 'created', 'updated', 'unchanged'):
+                result[key] = written[key]
+
+        result['deleted'] = await asyncio.to_thread(
+            spec.writer.delete_stale, spec.fields[odoo_field], list(ids), [r['id'] for r in records]
+        )
+        return result
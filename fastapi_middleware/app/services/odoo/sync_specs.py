@@ -0,0 +1,147 @@
+"""
+Modelos de Odoo que se sincronizan con la base de datos local.
+
+Cada entrada es un `SyncSpec` que el motor de sincronización (`SyncEngine`)
+sabe leer, mapear, escribir y mantener al día. Para sincronizar un modelo
+nuevo basta con declarar aquí su mapeo y crear su tabla.
+"""
+from typing import Dict
+
+from .product_service import PRODUCT_SPEC
+from .sync_engine import SyncSpec, many2one_id, many2one_name
+
+CATEGORY_SPEC = SyncSpec(
+    name='categories',
+    model='product.category',
+    table='Category',
+    fields={
+        'id': 'odoo_id',
+        'name': 'name',
+        'complete_name': 'complete_name',
+        'parent_id': 'parent_odoo_id',
+        'create_date': 'created_at',
+        'write_date': 'updated_at',
+    },
+    transforms={'parent_odoo_id': many2one_id},
+    changes={'product.category': 'id'},
+)
+
+SUPPLIER_SPEC = SyncSpec(
+    name='suppliers',
+    model='res.partner',
+    table='Supplier',
+    fields={
+        'id': 'odoo_id',
+        'name': 'name',
+        'vat': 'vat',
+        'email': 'email',
+        'phone': 'phone',
+        'mobile': 'mobile',
+        'street': 'street',
+        'city': 'city',
+        'zip': 'zip',
+        'country_id': 'country_odoo_id',
+        'supplier_rank': 'supplier_rank',
+        'active': 'is_active',
+        'write_date': 'updated_at',
+    },
+    domain=[('supplier_rank', '>', 0)],
+    boolean_fields={'is_active'},
+    transforms={'country_odoo_id': many2one_id},
+    # El nombre del país viene en el propio many2one: no hace falta leer res.country
+    computed={'country_name': lambda r: many2one_name(r.get('country_id'))},
+    defaults={'is_active': True, 'supplier_rank': 1},
+    changes={'res.partner': 'id'},
+)
+
+SUPPLIER_INFO_SPEC = SyncSpec(
+    name='supplier_info',
+    model='product.supplierinfo',
+    table='SupplierInfo',
+    fields={
+        'id': 'odoo_id',
+        'partner_id': 'partner_odoo_id',
+        'product_tmpl_id': 'template_odoo_id',
+        'product_id': 'product_odoo_id',
+        'product_code': 'supplier_code',
+        'product_name': 'supplier_product_name',
+        'price': 'price',
+        'min_qty': 'min_qty',
+        'delay': 'delay',
+        'write_date': 'updated_at',
+    },
+    transforms={
+        'partner_odoo_id': many2one_id,
+        'template_odoo_id': many2one_id,
+        'product_odoo_id': many2one_id,
+    },
+    defaults={'price': 0.0, 'min_qty': 0.0, 'delay': 0},
+    changes={'product.supplierinfo': 'id'},
+)
+
+# Disponibilidad por ubicación interna. El diario de cambios anota los cambios
+# de stock como modificaciones del producto, así que se releen sus quants
+STOCK_SPEC = SyncSpec(
+    name='stock',
+    model='stock.quant',
+    table='StockQuant',
+    fields={
+        'id': 'odoo_id',
+        'product_id': 'product_odoo_id',
+        'location_id': 'location_odoo_id',
+        'quantity': 'quantity',
+        'reserved_quantity': 'reserved_quantity',
+        'available_quantity': 'available_quantity',
+        'write_date': 'updated_at',
+    },
+    domain=[('location_id.usage', '=', 'internal')],
+    transforms={'product_odoo_id': many2one_id, 'location_odoo_id': many2one_id},
+    computed={'location_name': lambda r: many2one_name(r.get('location_id'))},
+    defaults={'quantity': 0.0, 'reserved_quantity': 0.0, 'available_quantity': 0.0},
+    changes={'product.product': 'product_id'},
+)
+
+# Catálogo que sirve GET /products (plantillas de producto). Aquí `write_date`
+# sí cuenta para la huella: versiona la URL de la imagen, que no se sincroniza
+CATALOG_SPEC = SyncSpec(
+    name='catalog',
+    model='product.template',
+    table='CatalogProduct',
+    fields={
+        'id': 'odoo_id',
+        'name': 'name',
+        'description_sale': 'description',
+        'list_price': 'price',
+        'standard_price': 'standard_price',
+        'default_code': 'sku',
+        'barcode': 'barcode',
+        'active': 'is_active',
+        'sale_ok': 'sale_ok',
+        'purchase_ok': 'purchase_ok',
+        'categ_id': 'category_odoo_id',
+        'x_marca': 'brand',
+        'x_nombre_proveedor': 'supplier',
+        'x_codigo_proveedor': 'supplier_code',
+        'x_pvp_web': 'sale_price',
+        'x_precio_venta_web': 'web_price',
+        'x_dto': 'discount',
+        'x_precio_margen': 'margin_price',
+        'x_beneficio': 'profit',
+        'x_beneficio_unitario': 'profit_unit',
+        'x_beneficio_total': 'profit_total',
+        'x_vendidas': 'units_sold',
+        'x_tiene_imagen': 'has_image',
+        'write_date': 'updated_at',
+    },
+    boolean_fields={'is_active', 'sale_ok', 'purchase_ok', 'has_image'},
+    transforms={'category_odoo_id': many2one_id},
+    defaults={'price': 0.0},
+    changes={'product.template': 'id'},
+    volatile=set(),
+)
+
+# Modelos sincronizados por nombre (tipo de trabajo de sincronización)
+SYNC_SPECS: Dict[str, SyncSpec] = {
+    spec.name: spec
+    for spec in (PRODUCT_SPEC, CATALOG_SPEC, CATEGORY_SPEC, SUPPLIER_SPEC, SUPPLIER_INFO_SPEC, STOCK_SPEC)
+}
@@ -1,185 +1,482 @@
+import asyncio
+from decimal import Decimal
 from typing import List, Optional, Dict, Any
-from app.core.odoo_client import odoo_client
-from app.models.product import Product, ProductCreate, ProductUpdate, ProductList
+from app.core.config import settings
+from app.core.odoo_async_client import async_odoo_client
+from app.core.pagination import (
+    Page, decode_cursor, next_cursor, order_terms, page_info, query_key, read_odoo_page, total_cache
+)
+from app.core.serialization import compile_mapper
+from app.models.product import Product, ProductCreate, ProductUpdate
+from app.services.catalog import (
+    catalog_age, catalog_is_fresh, read_catalog_product, read_catalog_products,
+    refresh_catalog, search_catalog
+)
+from app.services.catalog_version import PRODUCT_TABLES, invalidate_versions
+from app.services.category_index import category_index
+from app.services.facet_index import facet_index
+from app.services.lookup_index import lookup_index
+from app.services.product_image import product_image_url
+from app.services.response_cache import response_cache
+from app.services.search_index import compact_code, product_search_index
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_products(
+# Campos de product.template que devuelve la API
+PRODUCT_FIELDS = [
+    'name', 'description_sale', 'list_price', 'standard_price',
+    'default_code', 'barcode', 'active', 'sale_ok', 'purchase_ok',
+    'categ_id', 'write_date', 'x_nombre_proveedor', 'x_marca',
+    'x_pvp_web', 'x_precio_venta_web', 'x_dto', 'x_precio_margen',
+    'x_beneficio', 'x_beneficio_unitario', 'x_beneficio_total', 'x_vendidas',
+    'x_tiene_imagen'
+]
+
+# Campos de orden que nunca están vacíos y admiten paginación por cursor
+# (campo del orden → campo del producto); con otros se pagina por offset
+KEYSET_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'list_price': 'list_price',
+    'price': 'list_price',
+}
+
+
+def _catalog_image_url(product_id: int, updated_at: Any, has_image: bool) -> Optional[str]:
+    write_date = updated_at.strftime('%Y-%m-%d %H:%M:%S') if updated_at else None
+    return product_image_url(product_id, write_date, has_image)
+
+
+# Mapeadores precompilados fila → producto de la API (forma de `Product`,
+# lista para serializar): una expresión por campo sobre la fila `r`
+_odoo_to_product = compile_mapper(Product, {
+    'id': "r['id']",
+    'name': "r['name']",
+    'description': "r.get('description_sale', '')",
+    'list_price': "r['list_price']",
+    'standard_price': "r.get('standard_price', 0)",
+    'default_code': "r.get('default_code', '')",
+    'barcode': "r.get('barcode', '')",
+    'active': "r.get('active', True)",
+    'sale_ok': "r.get('sale_ok', True)",
+    'purchase_ok': "r.get('purchase_ok', True)",
+    'categ_id': "r['categ_id'][0] if isinstance(r['categ_id'], list) else r['categ_id']",
+    'categ_name': "category_name(r.get('categ_id'))",
+    'image_url': "image_url(r['id'], r.get('write_date'), r.get('x_tiene_imagen', True))",
+    
+    # Campos personalizados
+    'x_nombre_proveedor': "r.get('x_nombre_proveedor', '')",
+    'x_marca': "r.get('x_marca', '')",
+    'x_pvp_web': "r.get('x_pvp_web', 0)",
+    'x_precio_venta_web': "r.get('x_precio_venta_web', 0)",
+    'x_dto': "r.get('x_dto', 0)",
+    'x_precio_margen': "r.get('x_precio_margen', 0)",
+    'x_beneficio': "r.get('x_beneficio', 0)",
+    'x_beneficio_unitario': "r.get('x_beneficio_unitario', 0)",
+    'x_beneficio_total': "r.get('x_beneficio_total', 0)",
+    'x_vendidas': "r.get('x_vendidas', 0)",
+    
+    # Alias para compatibilidad con el frontend
+    'supplier': "r.get('x_nombre_proveedor', '')",
+    'brand': "r.get('x_marca', '')",
+    'price': "r['list_price']",
+}, {'category_name': category_index.resolve_name, 'image_url': product_image_url}, name='odoo_to_product')
+
+_catalog_to_product = compile_mapper(Product, {
+    'id': "r['odoo_id']",
+    'name': "r['name']",
+    'description': "r.get('description')",
+    'list_price': "r['price']",
+    'standard_price': "r.get('standard_price') or 0",
+    'default_code': "r.get('sku')",
+    'barcode': "r.get('barcode')",
+    'active': "r['is_active']",
+    'sale_ok': "r['sale_ok']",
+    'purchase_ok': "r['purchase_ok']",
+    'categ_id': "r.get('category_odoo_id')",
+    'categ_name': "r.get('category_name') or category_name(r.get('category_odoo_id'))",
+    'image_url': "image_url(r['odoo_id'], r.get('updated_at'), r.get('has_image', True))",
+    
+    # Campos personalizados
+    'x_nombre_proveedor': "r.get('supplier')",
+    'x_marca': "r.get('brand')",
+    'x_pvp_web': "r.get('sale_price') or 0",
+    'x_precio_venta_web': "r.get('web_price') or 0",
+    'x_dto': "r.get('discount') or 0",
+    'x_precio_margen': "r.get('margin_price') or 0",
+    'x_beneficio': "r.get('profit') or 0",
+    'x_beneficio_unitario': "r.get('profit_unit') or 0",
+    'x_beneficio_total': "r.get('profit_total') or 0",
+    'x_vendidas': "r.get('units_sold') or 0",
+    
+    # Alias para compatibilidad con el frontend
+    'supplier': "r.get('supplier')",
+    'brand': "r.get('brand')",
+    'price': "r['price']",
+}, {'category_name': category_index.resolve_name, 'image_url': _catalog_image_url}, name='catalog_to_product')
+
+
+def _keyset_values(product: Dict[str, Any], order: Optional[str]) -> Optional[List[Any]]:
+    """Valores del orden de un producto para el cursor (None: paginar por offset)"""
+    if order is None:
+        return None
+    terms = order_terms(order)
+    if any(field not in KEYSET_FIELDS for field, _ in terms):
+        return None
+    values = [product[KEYSET_FIELDS[field]] for field, _ in terms]
+    # Los precios ya vienen como texto, listos para el JSON
+    return [Decimal(v) if KEYSET_FIELDS[field] == 'list_price' else v for (field, _), v in zip(terms, values)]
+
+
+def _product_list(
+    products: List[Dict[str, Any]],
+    total: Optional[int],
+    limit: int,
+    page: Page,
+    cursor_key: str,
+    keyset_order: Optional[str],
+    facets: Optional[Dict[str, List[Dict[str, Any]]]] = None
+) -> Dict[str, Any]:
+    last_values = _keyset_values(products[-1], keyset_order) if products else None
+    cursor = next_cursor(cursor_key, page, len(products), limit, last_values)
+    # Mismos campos y orden que `ProductList`
+    return {'data': products, **page_info(total, limit, page.offset, cursor), 'facets': facets}
+
+
+async def _use_catalog(consistency: str) -> bool:
+    """Si la lectura puede responderse desde el catálogo local"""
+    if consistency == 'strong' or not settings.CATALOG_READ_MODEL_ENABLED:
+        return False
+    try:
+        return await catalog_is_fresh()
+    except Exception as e:
+        logger.warning(f"No se pudo comprobar el estado del catálogo local: {str(e)}")
+        return False
+
+
+async def _catalog_available(consistency: str) -> bool:
+    """Si el catálogo local, aunque esté desactualizado, puede sustituir a Odoo"""
+    if consistency == 'strong' or not settings.CATALOG_READ_MODEL_ENABLED:
+        return False
+    try:
+        return await catalog_age() is not None
+    except Exception:
+        return False
+
+
+async def _refresh_catalog(product_ids: List[int]) -> None:
+    """Reflejar en el catálogo local un cambio hecho desde la API"""
+    total_cache.clear()
+    response_cache.invalidate(*PRODUCT_TABLES)
+    if not settings.CATALOG_READ_MODEL_ENABLED:
+        return
+    try:
+        await refresh_catalog(product_ids)
+        product_search_index.invalidate()
+        invalidate_versions()
+    except Exception as e:
+        # El diario de cambios lo aplicará igualmente en unos segundos
+        logger.warning(f"No se pudo actualizar el catálogo local para {product_ids}: {str(e)}")
+
+
+async def _get_products_from_catalog(
+    limit: int,
+    page: Page,
+    order: Optional[str],
+    facets: bool,
+    with_total: bool,
+    cursor_key: str,
+    total_key: str,
+    search: Optional[str] = None,
+    **filters: Any,
+) -> Dict[str, Any]:
+    ids = None
+    if search:
+        # Búsqueda de texto completo en memoria: sin acentos, tolerante a
+        # erratas y ordenada por relevancia
+        ids = await product_search_index.search(search)
+    # Sin orden explícito, una búsqueda se ordena por relevancia y se pagina por offset
+    keyset_order = order or ('name' if ids is None else None)
+    after = page.after if keyset_order else None
+    
+    total = total_cache.get(total_key) if with_total else None
+    counted, rows = await search_catalog(
+        limit=limit, offset=page.offset, order=order, ids=ids, after=after,
+        with_total=with_total and total is None, **filters
+    )
+    if counted is not None:
+        total = counted
+        total_cache.set(total_key, total)
+    
+    facet_counts = None
+    if facets:
+        # Recuentos por faceta sobre la misma consulta, en memoria
+        await facet_index.ensure_fresh()
+        facet_counts = facet_index.compute(ids=ids, **filters)
+    
+    products = [_catalog_to_product(row) for row in rows]
+    return _product_list(products, total, limit, page, cursor_key, keyset_order, facet_counts)
+
+
+async def _get_products_from_odoo(
+    limit: int,
+    page: Page,
+    order: Optional[str],
+    facets: bool,
+    with_total: bool,
+    cursor_key: str,
+    total_key: str,
+    search: Optional[str] = None,
+    supplier: Optional[str] = None,
+    category_id: Optional[int] = None,
+    brand: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+) -> Dict[str, Any]:
+    # Construir dominio de búsqueda
+    domain = []
+    if search:
+        domain.append('|')
+        domain.append(('name', 'ilike', search))
+        domain.append(('default_code', 'ilike', search))
+    
+    if supplier:
+        domain.append(('x_nombre_proveedor', 'ilike', supplier))
+        
+    if category_id:
+        domain.append(('categ_id', '=', category_id))
+    
+    if brand:
+        domain.append(('x_marca', '=ilike', brand.strip()))
+    
+    if in_stock is not None:
+        domain.append(('qty_available', '>' if in_stock else '<=', 0))
+    
+    if min_price is not None:
+        domain.append(('list_price', '>=', min_price))
+    
+    if max_price is not None:
+        domain.append(('list_price', '<', max_price))
+    
+    order = order or 'name'
+    terms = order_terms(order)
+    if page.after is not None and any(field not in KEYSET_FIELDS for field, _ in terms):
+        page = Page(offset=page.offset)
+    
+    # Página y total (si se pide) en una sola llamada a Odoo; el índice de
+    # categorías resuelve los nombres sin una llamada por producto
+    (total, products_data), _ = await asyncio.gather(
+        read_odoo_page(
+            'product.template', domain, ['id'] + PRODUCT_FIELDS, limit, page, terms,
+            total_key if with_total else None
+        ),
+        category_index.ensure_fresh(),
+    )
+    
+    # Las facetas solo se calculan sobre el catálogo local
+    products = [_odoo_to_product(p) for p in products_data]
+    return _product_list(products, total, limit, page, cursor_key, order)
+
+
+async def get_products(
     limit: int = 10,
     offset: int = 0,
     search: Optional[str] = None,
     order: Optional[str] = None,
     supplier: Optional[str] = None,
     category_id: Optional[int] = None,
-) -> ProductList:
+    consistency: str = 'eventual',
+    brand: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    facets: bool = False,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
+) -> Dict[str, Any]:
     """
-    Obtener lista de productos con filtros y paginación
+    Obtener lista de productos con filtros y paginación.
+    
+    Con `consistency='eventual'` se responde desde el catálogo local mientras
+    esté al día; si no lo está, o el orden pedido no existe localmente, se
+    consulta a Odoo. Si Odoo falla, se sirve el catálogo local aunque esté
+    desactualizado. Con `consistency='strong'` se consulta siempre a Odoo.
+    
+    Las lecturas `eventual` pasan por la caché de resultados
+    (`response_cache`), que se invalida con cada escritura.
+    
+    Con `facets=True` se devuelven también los recuentos por marca,
+    proveedor, categoría, stock y tramo de precio (solo desde el catálogo local).
+    
+    Con `cursor` (el `next_cursor` de la página anterior) se pagina por
+    cursor en lugar de por `offset`. El total solo se calcula si se pide con
+    `with_total`; por compatibilidad, sin cursor se calcula salvo que se
+    desactive. Los totales se reutilizan unos segundos por consulta.
+    
+    Returns:
+        Diccionario con la forma de `ProductList`, listo para serializar
+    
+    Raises:
+        InvalidCursor: si el cursor no corresponde a esta consulta
     """
+    filters = {
+        'search': search,
+        'supplier': supplier,
+        'category_id': category_id,
+        'brand': brand,
+        'in_stock': in_stock,
+        'min_price': min_price,
+        'max_price': max_price,
+    }
+    total_key = query_key('product.template', filters)
+    cursor_key = query_key('product.template', filters, order)
+    page = decode_cursor(cursor, cursor_key, offset)
+    if with_total is None:
+        with_total = cursor is None
+    paging = (limit, page, order, facets, with_total, cursor_key, total_key)
+    if consistency == 'strong':
+        return await _load_products(consistency, paging, filters)
+    key = f"products:{query_key(filters, order, limit, offset, facets, with_total)}:{cursor or ''}"
+    return await response_cache.get_or_load(
+        key, lambda: _load_products(consistency, paging, filters), PRODUCT_TABLES
+    )
+
+async def _load_products(consistency: str, paging: tuple, filters: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        # Construir dominio de búsqueda
-        domain = []
-        if search:
-            domain.append('|')
-            domain.append(('name', 'ilike', search))
-            domain.append(('default_code', 'ilike', search))
-        
-        if supplier:
-            domain.append(('x_nombre_proveedor', 'ilike', supplier))
-            
-        if category_id:
-            domain.append(('categ_id', '=', category_id))
-            
-        # Campos a recuperar
-        fields = [
-            'id', 'name', 'description_sale', 'list_price', 'standard_price',
-            'default_code', 'barcode', 'active', 'sale_ok', 'purchase_ok',
-            'categ_id', 'image_1920', 'x_nombre_proveedor', 'x_marca',
-            'x_pvp_web', 'x_precio_venta_web', 'x_dto', 'x_precio_margen',
-            'x_beneficio', 'x_beneficio_unitario', 'x_beneficio_total', 'x_vendidas'
-        ]
-        
-        # Obtener total de registros
-        total = odoo_client.execute_kw(
-            'product.template', 'search_count', [domain]
-        )
-        
-        # Obtener productos
-        products_data = odoo_client.search_read(
-            'product.template', domain, fields, limit=limit, offset=offset, order=order or 'name'
-        )
-        
-        # Procesar resultados
-        products = []
-        for p in products_data:
-            # Obtener nombre de categoría
-            categ_name = None
-            if p.get('categ_id'):
-                categ_id = p['categ_id'][0] if isinstance(p['categ_id'], list) else p['categ_id']
-                categ_data = odoo_client.read('product.category', [categ_id], ['name'])
-                if categ_data:
-                    categ_name = categ_data[0]['name']
-            
-            # Crear objeto de producto
-            product = {
-                'id': p['id'],
-                'name': p['name'],
-                'description': p.get('description_sale', ''),
-                'list_price': p['list_price'],
-                'standard_price': p.get('standard_price', 0),
-                'default_code': p.get('default_code', ''),
-                'barcode': p.get('barcode', ''),
-                'active': p.get('active', True),
-                'sale_ok': p.get('sale_ok', True),
-                'purchase_ok': p.get('purchase_ok', True),
-                'categ_id': p['categ_id'][0] if isinstance(p['categ_id'], list) else p['categ_id'],
-                'categ_name': categ_name,
-                'image_url': f"/api/v1/products/{p['id']}/image" if p.get('image_1920') else None,
-                
-                # Campos personalizados
-                'x_nombre_proveedor': p.get('x_nombre_proveedor', ''),
-                'x_marca': p.get('x_marca', ''),
-                'x_pvp_web': p.get('x_pvp_web', 0),
-                'x_precio_venta_web': p.get('x_precio_venta_web', 0),
-                'x_dto': p.get('x_dto', 0),
-                'x_precio_margen': p.get('x_precio_margen', 0),
-                'x_beneficio': p.get('x_beneficio', 0),
-                'x_beneficio_unitario': p.get('x_beneficio_unitario', 0),
-                'x_beneficio_total': p.get('x_beneficio_total', 0),
-                'x_vendidas': p.get('x_vendidas', 0),
-                
-                # Alias para compatibilidad con el frontend
-                'supplier': p.get('x_nombre_proveedor', ''),
-                'brand': p.get('x_marca', ''),
-                'price': p['list_price'],
-            }
-            products.append(Product(**product))
-        
-        # Calcular páginas
-        pages = (total + limit - 1) // limit if limit > 0 else 1
-        page = (offset // limit) + 1 if limit > 0 else 1
+        if await _use_catalog(consistency):
+            try:
+                return await _get_products_from_catalog(*paging, **filters)
+            except ValueError as e:
+                logger.info(f"{str(e)}; consultando a Odoo")
         
-        return ProductList(
-            data=products,
-            total=total,
-            page=page,
-            page_size=limit,
-            pages=pages
-        )
+        try:
+            return await _get_products_from_odoo(*paging, **filters)
+        except Exception as e:
+            if not await _catalog_available(consistency):
+                raise
+            logger.warning(f"Odoo no responde ({str(e)}); sirviendo el catálogo local desactualizado")
+            return await _get_products_from_catalog(*paging, **filters)
     except Exception as e:
         logger.error(f"Error al obtener productos: {str(e)}")
         raise
 
-def get_product(product_id: int) -> Product:
+async def get_product(product_id: int, consistency: str = 'eventual') -> Optional[Dict[str, Any]]:
     """
-    Obtener un producto por su ID
+    Obtener un producto por su ID, con la misma política de consistencia que
+    `get_products`
     """
+    if consistency == 'strong':
+        return await _load_product(product_id, consistency)
+    return await response_cache.get_or_load(
+        f"product:{product_id}", lambda: _load_product(product_id, consistency), PRODUCT_TABLES
+    )
+
+async def _load_product(product_id: int, consistency: str) -> Optional[Dict[str, Any]]:
     try:
-        # Campos a recuperar
-        fields = [
-            'name', 'description_sale', 'list_price', 'standard_price',
-            'default_code', 'barcode', 'active', 'sale_ok', 'purchase_ok',
-            'categ_id', 'image_1920', 'x_nombre_proveedor', 'x_marca',
-            'x_pvp_web', 'x_precio_venta_web', 'x_dto', 'x_precio_margen',
-            'x_beneficio', 'x_beneficio_unitario', 'x_beneficio_total', 'x_vendidas'
-        ]
+        if await _use_catalog(consistency):
+            row = await read_catalog_product(product_id)
+            return _catalog_to_product(row) if row else None
         
-        # Obtener producto
-        product_data = odoo_client.read('product.template', [product_id], fields)
+        try:
+            # Obtener producto
+            product_data, _ = await asyncio.gather(
+                async_odoo_client.read('product.template', [product_id], PRODUCT_FIELDS),
+                category_index.ensure_fresh(),
+            )
+        except Exception as e:
+            if not await _catalog_available(consistency):
+                raise
+            logger.warning(f"Odoo no responde ({str(e)}); sirviendo el catálogo local desactualizado")
+            row = await read_catalog_product(product_id)
+            return _catalog_to_product(row) if row else None
         
         if not product_data:
             return None
-            
-        p = product_data[0]
-        
-        # Obtener nombre de categoría
-        categ_name = None
-        if p.get('categ_id'):
-            categ_id = p['categ_id'][0] if isinstance(p['categ_id'], list) else p['categ_id']
-            categ_data = odoo_client.read('product.category', [categ_id], ['name'])
-            if categ_data:
-                categ_name = categ_data[0]['name']
         
-        # Crear objeto de producto
-        product = {
-            'id': product_id,
-            'name': p['name'],
-            'description': p.get('description_sale', ''),
-            'list_price': p['list_price'],
-            'standard_price': p.get('standard_price', 0),
-            'default_code': p.get('default_code', ''),
-            'barcode': p.get('barcode', ''),
-            'active': p.get('active', True),
-            'sale_ok': p.get('sale_ok', True),
-            'purchase_ok': p.get('purchase_ok', True),
-            'categ_id': p['categ_id'][0] if isinstance(p['categ_id'], list) else p['categ_id'],
-            'categ_name': categ_name,
-            'image_url': f"/api/v1/products/{product_id}/image" if p.get('image_1920') else None,
-            
-            # Campos personalizados
-            'x_nombre_proveedor': p.get('x_nombre_proveedor', ''),
-            'x_marca': p.get('x_marca', ''),
-            'x_pvp_web': p.get('x_pvp_web', 0),
-            'x_precio_venta_web': p.get('x_precio_venta_web', 0),
-            'x_dto': p.get('x_dto', 0),
-            'x_precio_margen': p.get('x_precio_margen', 0),
-            'x_beneficio': p.get('x_beneficio', 0),
-            'x_beneficio_unitario': p.get('x_beneficio_unitario', 0),
-            'x_beneficio_total': p.get('x_beneficio_total', 0),
-            'x_vendidas': p.get('x_vendidas', 0),
-            
-            # Alias para compatibilidad con el frontend
-            'supplier': p.get('x_nombre_proveedor', ''),
-            'brand': p.get('x_marca', ''),
-            'price': p['list_price'],
+        return _odoo_to_product(product_data[0])
+    except Exception as e:
+        logger.error(f"Error al obtener producto {product_id}: {str(e)}")
+        raise
+
+async def _lookup_in_catalog(codes: List[str]) -> List[Dict[str, Any]]:
+    resolved = await lookup_index.resolve(codes)
+    product_ids = sorted({i for _, ids in resolved.values() for i in ids})
+    rows = await read_catalog_products(product_ids)
+    return [
+        {
+            'code': code,
+            'matched_by': matched_by,
+            'data': [_catalog_to_product(rows[i]) for i in ids if i in rows],
         }
+        for code, (matched_by, ids) in resolved.items()
+    ]
+
+
+async def _lookup_in_odoo(codes: List[str]) -> List[Dict[str, Any]]:
+    # Una sola consulta para todos los códigos; la coincidencia de cada uno
+    # se resuelve aquí con la misma normalización que el índice local
+    domain = [
+        '|', '|',
+        ('barcode', 'in', codes),
+        ('default_code', 'in', codes),
+        ('x_codigo_proveedor', 'in', codes),
+    ]
+    products_data, _ = await asyncio.gather(
+        async_odoo_client.search_read(
+            'product.template', domain, ['id', 'x_codigo_proveedor'] + PRODUCT_FIELDS,
+            order='id'
+        ),
+        category_index.ensure_fresh(),
+    )
+    
+    results = []
+    for code in codes:
+        key = compact_code(code)
+        matched_by, data = None, []
+        for matched_by, field in (('barcode', 'barcode'), ('sku', 'default_code'), ('supplier_code', 'x_codigo_proveedor')):
+            data = [
+                _odoo_to_product(p) for p in products_data
+                if p.get(field) and compact_code(p[field]) == key
+            ]
+            if data:
+                break
+        results.append({'code': code, 'matched_by': matched_by if data else None, 'data': data})
+    return results
+
+
+async def lookup_products(codes: List[str], consistency: str = 'eventual') -> List[Dict[str, Any]]:
+    """
+    Buscar productos por código de barras, referencia interna o código de
+    proveedor, con la misma política de consistencia que `get_products`.
+    
+    Desde el catálogo local cada código se resuelve en memoria sin
+    distinguir mayúsculas ni separadores. Desde Odoo la coincidencia es
+    exacta (dominio `in`), ya que normalizar allí obligaría a recorrer la tabla.
+    
+    Returns:
+        Un resultado por código, en el mismo orden; si un código coincide con
+        varios tipos, prevalece el código de barras, luego la referencia y
+        por último el código de proveedor
+    """
+    codes = list(dict.fromkeys(code.strip() for code in codes if code.strip()))
+    try:
+        if await _use_catalog(consistency):
+            return await _lookup_in_catalog(codes)
         
-        return Product(**product)
+        try:
+            return await _lookup_in_odoo(codes)
+        except Exception as e:
+            if not await _catalog_available(consistency):
+                raise
+            logger.warning(f"Odoo no responde ({str(e)}); sirviendo el catálogo local desactualizado")
+            return await _lookup_in_catalog(codes)
     except Exception as e:
-        logger.error(f"Error al obtener producto {product_id}: {str(e)}")
+        logger.error(f"Error al buscar productos por código: {str(e)}")
         raise
 
-def create_product(product: ProductCreate) -> int:
+async def create_product(product: ProductCreate) -> int:
     """
     Crear un nuevo producto
     """
@@ -213,13 +510,14 @@ def create_product(product: ProductCreate) -> int:
             values['x_vendidas'] = product.x_vendidas
         
         # Crear producto
-        product_id = odoo_client.create('product.template', values)
+        product_id = await async_odoo_client.create('product.template', values)
+        await _refresh_catalog([product_id])
         return product_id
     except Exception as e:
         logger.error(f"Error al crear producto: {str(e)}")
         raise
 
-def update_product(product_id: int, product: ProductUpdate) -> bool:
+async def update_product(product_id: int, product: ProductUpdate) -> bool:
     """
     Actualizar un producto existente
     """
@@ -266,19 +564,21 @@ def update_product(product_id: int, product: ProductUpdate) -> bool:
         
         # Actualizar producto
         if values:
-            odoo_client.write('product.template', [product_id], values)
+            await async_odoo_client.write('product.template', [product_id], values)
+            await _refresh_catalog([product_id])
             return True
         return False
     except Exception as e:
         logger.error(f"Error al actualizar producto {product_id}: {str(e)}")
         raise
 
-def delete_product(product_id: int) -> bool:
+async def delete_product(product_id: int) -> bool:
     """
     Eliminar un producto
     """
     try:
-        odoo_client.unlink('product.template', [product_id])
+        await async_odoo_client.unlink('product.template', [product_id])
+        await _refresh_catalog([product_id])
         return True
     except Exception as e:
         logger.error(f"Error al eliminar producto {product_id}: {str(e)}")
@@ -0,0 +1,206 @@
+"""
+Servicio de imágenes de producto con caché en disco direccionada por contenido.
+
+Las imágenes se piden a Odoo solo cuando hacen falta (`image_128`, `image_512`
+o `image_1920`, según el tamaño solicitado), se redimensionan y codifican en
+WebP o JPEG con Pillow en un pool de hilos y se guardan en disco con el hash de
+su contenido como nombre. Ese mismo hash se usa como ETag fuerte.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from app.core.config import settings
+from app.core.odoo_async_client import async_odoo_client
+
+logger = logging.getLogger(__name__)
+
+# Campos de imagen que Odoo mantiene, de menor a mayor tamaño
+IMAGE_FIELDS = [(128, 'image_128'), (512, 'image_512'), (1920, 'image_1920')]
+
+# Formatos de salida: formato de Pillow, tipo MIME, extensión y opciones de guardado
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'image/webp', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# Anchos que se sirven: cualquier tamaño pedido se ajusta al siguiente, para
+# que la combinación de parámetros no multiplique las variantes en disco
+IMAGE_SIZES = (64, 128, 256, 512, 1024, 1920)
+
+# Máximo de variantes recordadas en memoria (la caché en disco no tiene límite)
+MAX_VARIANT_ENTRIES = 10000
+
+
+def image_version(write_date: Optional[str]) -> Optional[str]:
+    """Convierte el `write_date` de Odoo en un token de versión para la URL"""
+    if not write_date:
+        return None
+    return ''.join(ch for ch in str(write_date) if ch.isdigit())
+
+
+def product_image_url(
+    product_id: int, write_date: Optional[str] = None, has_image: bool = True
+) -> Optional[str]:
+    """
+    URL de la imagen de un producto, versionada con su `write_date`, o None si
+    el producto no tiene imagen (`x_tiene_imagen` en Odoo)
+    """
+    if not has_image:
+        return None
+    version = image_version(write_date)
+    url = f"{settings.API_V1_STR}/products/{product_id}/image"
+    return f"{url}?v={version}" if version else url
+
+
+def snap_size(size: int) -> int:
+    """Ancho servido más pequeño que cubre el tamaño solicitado"""
+    for width in IMAGE_SIZES:
+        if size <= width:
+            return width
+    return IMAGE_SIZES[-1]
+
+
+def _source_field(size: int) -> str:
+    """Campo de Odoo más pequeño que cubre el tamaño solicitado"""
+    for field_size, field in IMAGE_FIELDS:
+        if size <= field_size:
+            return field
+    return IMAGE_FIELDS[-1][1]
+
+
+def _render(raw: bytes, size: int, fmt: str) -> bytes:
+    """Redimensiona y codifica una imagen (se ejecuta en el pool de hilos)"""
+    pil_format, _, _, options = IMAGE_FORMATS[fmt]
+    with Image.open(io.BytesIO(raw)) as img:
+        img.load()
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        if fmt == 'jpeg' and has_alpha:
+            # JPEG no admite transparencia: componer sobre fondo blanco
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        img.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        img.save(output, pil_format, **options)
+        return output.getvalue()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Escribe un fichero de forma atómica para que nunca se lea a medias"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nombre temporal único: varios hilos o workers pueden escribir la misma variante
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+class ProductImageCache:
+    """Caché de variantes de imagen de producto en disco"""
+
+    def __init__(self, cache_dir: str = settings.IMAGE_CACHE_DIR, workers: int = settings.IMAGE_WORKERS):
+        self.cache_dir = Path(cache_dir)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="product-image")
+        # (product_id, versión, tamaño, formato) -> hash de la variante
+        self._variants: "OrderedDict[Tuple[int, str, int, str], str]" = OrderedDict()
+        self._inflight: Dict[Tuple[int, str, int, str], asyncio.Future] = {}
+
+    def _path(self, digest: str, fmt: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}.{IMAGE_FORMATS[fmt][2]}"
+
+    def known_etag(self, product_id: int, version: Optional[str], size: int, fmt: str) -> Optional[str]:
+        """ETag de una variante ya generada, sin llamar a Odoo"""
+        if not version:
+            return None
+        digest = self._variants.get((product_id, version, size, fmt))
+        return f'"{digest}"' if digest else None
+
+    async def current_version(self, product_id: int) -> Optional[str]:
+        """Versión actual de la imagen (según `write_date`) o None si el producto no existe"""
+        data = await async_odoo_client.read('product.template', [product_id], ['write_date'])
+        if not data:
+            return None
+        return image_version(data[0].get('write_date')) or '0'
+
+    async def get(
+        self, product_id: int, size: int, fmt: str, version: Optional[str] = None
+    ) -> Optional[Tuple[str, Path]]:
+        """
+        Obtener una variante de la imagen de un producto.
+
+        `version` debe ser la versión actual (`current_version`): la variante
+        se genera con la imagen que tenga el producto ahora.
+
+        Returns:
+            Tupla (hash de la variante, ruta en disco) o None si el producto no
+            existe o no tiene imagen
+        """
+        version = version or await self.current_version(product_id)
+        if version is None:
+            return None
+
+        key = (product_id, version, size, fmt)
+        digest = self._variants.get(key)
+        if digest:
+            path = self._path(digest, fmt)
+            if path.exists():
+                self._variants.move_to_end(key)
+                return digest, path
+
+        # Evitar que peticiones simultáneas de la misma variante la generen varias veces
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._build(key))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _build(self, key: Tuple[int, str, int, str]) -> Optional[Tuple[str, Path]]:
+        product_id, _, size, fmt = key
+        field = _source_field(size)
+        data = await async_odoo_client.read('product.template', [product_id], [field])
+        if not data or not data[0].get(field):
+            return None
+
+        raw = base64.b64decode(data[0][field])
+        source_digest = hashlib.sha256(raw).hexdigest()
+        digest = hashlib.sha256(f"{source_digest}:{size}:{fmt}".encode()).hexdigest()
+        path = self._path(digest, fmt)
+
+        if not path.exists():
+            loop = asyncio.get_running_loop()
+            try:
+                encoded = await loop.run_in_executor(self._executor, _render, raw, size, fmt)
+            except Exception as e:
+                logger.error(f"No se pudo procesar la imagen del producto {product_id}: {str(e)}")
+                return None
+            await loop.run_in_executor(self._executor, _write_atomic, path, encoded)
+
+        self._variants[key] = digest
+        if len(self._variants) > MAX_VARIANT_ENTRIES:
+            self._variants.popitem(last=False)
+        return digest, path
+
+    async def read_bytes(self, path: Path) -> bytes:
+        """Leer una variante de disco sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, path.read_bytes)
+
+# Instancia global de la caché de imágenes
+product_image_cache = ProductImageCache()
@@ -0,0 +1,361 @@
+"""
+Caché de resultados de las lecturas de la API (listados y fichas).
+
+Cada resultado se guarda con la clave de su consulta normalizada, las tablas
+de las que depende (etiquetas) y la versión que tenían esas tablas en
+`catalog_version` al calcularlo:
+
+- Vigente (menos de `RESPONSE_CACHE_TTL` y mismas versiones): se devuelve.
+- Caducado por tiempo, dentro de `RESPONSE_CACHE_STALE_SECONDS`: se devuelve
+  enseguida y se recalcula en segundo plano (stale-while-revalidate).
+- Invalidado (una escritura de la API o de la sincronización ha cambiado
+  alguna de sus tablas): se recalcula antes de responder.
+- Si al recalcular Odoo no responde, se sirve el último resultado conocido
+  durante `RESPONSE_CACHE_STALE_IF_ERROR_SECONDS` en lugar de un 500.
+- Si no se pueden leer las versiones, el resultado se guarda igualmente y
+  solo caduca por tiempo.
+
+Un cálculo que empezó antes de una escritura de este worker no se guarda (la
+escritura incrementa la generación local de sus tablas), así que tampoco
+puede volver a dejar en caché datos anteriores a ella.
+
+Las peticiones simultáneas de la misma clave comparten un único cálculo. La
+caché en memoria es LRU con un presupuesto en bytes; opcionalmente se comparte
+entre workers a través de PostgreSQL (`RESPONSE_CACHE_SHARED`), serializada
+como JSON: lo que se lee de la tabla nunca se ejecuta, solo se valida.
+"""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Type
+
+import orjson
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.database import connection
+from app.core.serialization import dumps
+from app.services.catalog_version import catalog_versions
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float  # time.time(), comparable entre workers
+    tags: Tuple[str, ...]
+    versions: Optional[Tuple[Tuple[str, int], ...]]  # versión de cada etiqueta al calcularlo (None: solo TTL)
+    size: int
+
+
+class CacheBackend(ABC):
+    """Almacén compartido entre workers para las entradas de la caché"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Entrada serializada de `key`, o None si no existe o ha caducado"""
+
+    @abstractmethod
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        """Guardar una entrada serializada durante `ttl` segundos"""
+
+
+class PostgresCacheBackend(CacheBackend):
+    """Entradas serializadas en la tabla `response_cache`"""
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT value FROM response_cache WHERE key = %s AND expires_at > now()", (key,)
+            )
+            row = cur.fetchone()
+            return bytes(row[0]) if row else None
+
+    def _set(self, key: str, data: bytes, ttl: float) -> None:
+        with connection() as conn, conn.cursor() as cur:
+            # Las entradas caducadas se purgan al escribir
+            cur.execute("DELETE FROM response_cache WHERE expires_at <= now() - interval '1 minute'")
+            cur.execute(
+                """
+                INSERT INTO response_cache (key, value, expires_at)
+                VALUES (%s, %s, now() + %s * interval '1 second')
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                """,
+                (key, data, ttl),
+            )
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, data: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, data, ttl)
+
+
+class ResponseCache:
+    """
+    Caché LRU acotada en bytes con stale-while-revalidate, invalidación por
+    etiquetas y respaldo ante errores del origen.
+
+    Args:
+        max_bytes: Presupuesto de memoria (tamaño serializado de los resultados)
+        ttl: Segundos que un resultado se considera vigente
+        stale_seconds: Segundos más en los que se sirve mientras se recalcula
+        stale_if_error_seconds: Segundos en los que se sirve si el origen falla
+        versions: Función que devuelve la versión actual de cada tabla
+        backend: Almacén compartido opcional
+        enabled: False para calcular siempre (sin caché)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        stale_seconds: float,
+        stale_if_error_seconds: float,
+        versions: Optional[Callable[[], Awaitable[Dict[str, int]]]] = None,
+        backend: Optional[CacheBackend] = None,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self.stale_if_error_seconds = max(stale_if_error_seconds, stale_seconds)
+        self.versions = versions
+        self.backend = backend
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._bytes = 0
+        self._inflight: Dict[str, Tuple[asyncio.Future, Tuple[int, ...]]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Generación local de cada etiqueta; `invalidate` la incrementa
+        self._generations: Dict[str, int] = {}
+        self.counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'stale_on_error': 0, 'evictions': 0}
+
+    # Memoria
+
+    def _store(self, key: str, entry: CacheEntry) -> None:
+        self._drop(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.counters['evictions'] += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys:
+                keys.discard(key)
+
+    async def _lookup(self, key: str, model: Optional[Type[BaseModel]] = None) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self.backend is None:
+            return None
+        try:
+            data = await self.backend.get(key)
+            if data is None:
+                return None
+            stored = orjson.loads(data)
+            value = stored['value']
+            if model is not None and value is not None:
+                value = model.model_validate(value)
+            versions = stored['versions']
+            entry = CacheEntry(
+                value,
+                float(stored['stored_at']),
+                tuple(stored['tags']),
+                tuple((tag, int(version)) for tag, version in versions) if versions is not None else None,
+                len(data),
+            )
+            self._store(key, entry)
+            return entry
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché compartida ({key}): {str(e)}")
+            return None
+
+    async def _current_versions(self, tags: Iterable[str]) -> Optional[Tuple[Tuple[str, int], ...]]:
+        if self.versions is None:
+            return tuple((tag, 0) for tag in tags)
+        try:
+            versions = await self.versions()
+        except Exception as e:
+            logger.warning(f"No se pudieron leer las versiones del catálogo: {str(e)}")
+            return None
+        return tuple((tag, versions.get(tag, 0)) for tag in tags)
+
+    # Cálculo
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Tuple[str, ...],
+    ) -> Any:
+        """
+        Calcula y guarda un resultado; las llamadas simultáneas comparten el cálculo.
+
+        El cálculo corre en una tarea propia: si se cancela la petición que lo
+        inició (el cliente se desconecta), las demás siguen esperándolo.
+        """
+        generations = self._tag_generations(tags)
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[1] == generations:
+            task = inflight[0]
+        else:
+            # Sin cálculo en curso, o empezado antes de una invalidación
+            task = asyncio.ensure_future(self._compute(key, loader, tags, generations))
+            self._inflight[key] = (task, generations)
+            task.add_done_callback(self._load_done(key))
+        return await asyncio.shield(task)
+
+    def _load_done(self, key: str) -> Callable[[asyncio.Future], None]:
+        def done(task: asyncio.Future) -> None:
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight[0] is task:
+                del self._inflight[key]
+            # Marcar la excepción como recuperada aunque nadie más la espere
+            if not task.cancelled():
+                task.exception()
+        return done
+
+    async def _compute(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Tuple[str, ...],
+        generations: Tuple[int, ...],
+    ) -> Any:
+        # Versiones anteriores al cálculo: si cambian mientras tanto, la
+        # siguiente lectura lo recalcula
+        versions = await self._current_versions(tags)
+        value = await loader()
+        if self._tag_generations(tags) != generations:
+            # Una escritura de este worker invalidó las tablas durante el cálculo
+            return value
+        stored_at = time.time()
+        data = dumps({'value': value, 'stored_at': stored_at, 'tags': tags, 'versions': versions})
+        self._store(key, CacheEntry(value, stored_at, tags, versions, len(data)))
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, data, self.ttl + self.stale_if_error_seconds)
+            except Exception as e:
+                logger.warning(f"No se pudo escribir la caché compartida ({key}): {str(e)}")
+        return value
+
+    def _tag_generations(self, tags: Tuple[str, ...]) -> Tuple[int, ...]:
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    async def _revalidate(self, key: str, loader: Callable[[], Awaitable[Any]], tags: Tuple[str, ...]) -> None:
+        try:
+            await self._load(key, loader, tags)
+        except Exception as e:
+            logger.warning(f"No se pudo recalcular en segundo plano {key}: {str(e)}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        tags: Iterable[str],
+        model: Optional[Type[BaseModel]] = None,
+    ) -> Any:
+        """
+        Resultado de `key`, calculado con `loader` si hace falta.
+
+        Args:
+            key: Clave de la consulta normalizada (`pagination.query_key`)
+            loader: Función que calcula el resultado (consulta a Odoo o al catálogo)
+            tags: Tablas de las que depende el resultado
+            model: Modelo pydantic del resultado, para reconstruirlo desde la
+                caché compartida (sin él se devuelve el JSON decodificado)
+
+        Raises:
+            La excepción de `loader` si falla y no hay ningún resultado anterior utilizable
+        """
+        if not self.enabled:
+            return await loader()
+        tags = tuple(tags)
+        entry = await self._lookup(key, model)
+        if entry is not None:
+            age = time.time() - entry.stored_at
+            versions = await self._current_versions(tags)
+            # Sin versiones fiables (ahora o al guardarlo) solo cuenta la antigüedad
+            invalidated = versions is not None and entry.versions is not None and versions != entry.versions
+            if not invalidated:
+                if age < self.ttl:
+                    self.counters['hits'] += 1
+                    return entry.value
+                if age < self.ttl + self.stale_seconds:
+                    self.counters['stale_hits'] += 1
+                    if key not in self._refreshing and key not in self._inflight:
+                        self._refreshing[key] = asyncio.create_task(self._revalidate(key, loader, tags))
+                    return entry.value
+
+        self.counters['misses'] += 1
+        try:
+            return await self._load(key, loader, tags)
+        except Exception as e:
+            if entry is None or time.time() - entry.stored_at >= self.ttl + self.stale_if_error_seconds:
+                raise
+            self.counters['stale_on_error'] += 1
+            logger.warning(f"Sirviendo {key} desde la caché (origen no disponible: {str(e)})")
+            return entry.value
+
+    def invalidate(self, *tags: str) -> None:
+        """
+        Descartar en este worker los resultados que dependen de unas tablas.
+
+        Los demás workers y la caché compartida lo detectan por la versión de
+        la tabla, que la escritura correspondiente incrementa.
+        """
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in list(self._tags.pop(tag, ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters['hits'] + self.counters['stale_hits'] + self.counters['misses']
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'shared': self.backend is not None,
+            **self.counters,
+            'hit_ratio': round(
+                (self.counters['hits'] + self.counters['stale_hits']) / lookups, 4
+            ) if lookups else None,
+        }
+
+
+# Instancia global de la caché de resultados
+response_cache = ResponseCache(
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    stale_seconds=settings.RESPONSE_CACHE_STALE_SECONDS,
+    stale_if_error_seconds=settings.RESPONSE_CACHE_STALE_IF_ERROR_SECONDS,
+    versions=catalog_versions,
+    backend=PostgresCacheBackend() if settings.RESPONSE_CACHE_SHARED else None,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+)
@@ -0,0 +1,428 @@
+"""
+Índice de búsqueda de texto completo del catálogo, en memoria.
+
+Índice invertido sobre nombre, referencia, código de barras, marca, proveedor
+y descripción de las plantillas del catálogo local (`CatalogProduct`):
+
+- normalización para español: minúsculas, sin acentos ("FRIGORÍFICO" y
+  "frigorifico" son el mismo término), sin palabras vacías y con un plural
+  simplificado ("lavadoras" → "lavadora")
+- ranking BM25 con pesos por campo (el nombre y los códigos pesan más que la
+  descripción)
+- tolerancia a erratas por trigramas: un término que no existe se sustituye
+  por los más parecidos del vocabulario ("lavadra" → "lavadora")
+- búsqueda por prefijo en referencias y códigos de barras
+
+El índice se mantiene al día comparando cada pocos segundos las huellas de
+contenido que escribe la sincronización (`fingerprint`) con las indexadas, y
+solo se vuelven a leer las filas que han cambiado. La comprobación se hace en
+segundo plano: las búsquedas nunca esperan a la base de datos salvo en la
+primera carga.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.database import connection
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada columna del catálogo en el ranking
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'sku': 3.0,
+    'barcode': 3.0,
+    'brand': 2.0,
+    'supplier': 1.0,
+    'description': 0.5,
+}
+
+# Columnas con códigos: no se les quita el plural y se indexan también compactadas
+CODE_FIELDS = {'sku', 'barcode'}
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Similitud mínima (Jaccard de trigramas) para aceptar un término parecido
+FUZZY_THRESHOLD = 0.4
+FUZZY_CANDIDATES = 3
+
+# Peso de un código que solo coincide por prefijo
+PREFIX_WEIGHT = 0.9
+PREFIX_CANDIDATES = 20
+
+STOPWORDS = frozenset({
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'sin', 'su', 'un', 'una', 'y',
+})
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin acentos ni diacríticos ("Ñandú" → "nandu")"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(token: str) -> str:
+    """Plural español simplificado: "televisores" → "televisor", "hornos" → "horno" """
+    if len(token) > 4 and token.endswith('es') and token[-3] in 'rlndj':
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token[-2].isdigit():
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str], stemmed: bool = True) -> List[str]:
+    """Términos de un texto normalizados para el índice"""
+    if not text:
+        return []
+    tokens = [t for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+    if stemmed:
+        tokens = [t if t.isdigit() else stem(t) for t in tokens]
+    return tokens
+
+
+def compact_code(text: Optional[str]) -> str:
+    """Código sin separadores ("AB-12 3" → "ab123")"""
+    return _NON_ALNUM_RE.sub('', fold(text)) if text else ''
+
+
+def _is_code(term: str) -> bool:
+    """Los términos con dígitos son referencias, códigos de barras o modelos"""
+    return any(c.isdigit() for c in term)
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _document_terms(row: Dict[str, Any]) -> Counter:
+    """Frecuencia ponderada de cada término en una fila del catálogo"""
+    terms: Counter = Counter()
+    for column, weight in FIELD_WEIGHTS.items():
+        value = row.get(column)
+        if not value:
+            continue
+        if column in CODE_FIELDS:
+            tokens = tokenize(value, stemmed=False)
+            code = compact_code(value)
+            if code and code not in tokens:
+                tokens.append(code)
+        else:
+            tokens = tokenize(value)
+        for token in tokens:
+            terms[token] += weight
+    return terms
+
+
+class InvertedIndex:
+    """
+    Índice invertido con ranking BM25. No es seguro entre hilos: se modifica y
+    consulta desde el bucle de eventos (o se construye entero en otro hilo).
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self.doc_lengths: Dict[int, float] = {}
+        self.fingerprints: Dict[int, Optional[str]] = {}
+        self.total_length = 0.0
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._codes: List[str] = []
+        self._norms: Optional[Dict[int, float]] = None
+
+    @classmethod
+    def build(cls, rows: Iterable[Dict[str, Any]]) -> 'InvertedIndex':
+        index = cls()
+        for row in rows:
+            index.add(row)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def _length_norms(self) -> Dict[int, float]:
+        """Factor de longitud de BM25 de cada plantilla (se recalcula tras cambios)"""
+        if self._norms is None:
+            n_docs = len(self.doc_terms)
+            avg_length = self.total_length / n_docs if n_docs and self.total_length else 1.0
+            self._norms = {
+                doc_id: BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                for doc_id, length in self.doc_lengths.items()
+            }
+        return self._norms
+
+    def _add_term(self, term: str) -> None:
+        # Los códigos se buscan por prefijo; las palabras, por trigramas
+        if _is_code(term):
+            bisect.insort(self._codes, term)
+            return
+        for gram in trigrams(term):
+            self._trigrams.setdefault(gram, set()).add(term)
+
+    def _remove_term(self, term: str) -> None:
+        if _is_code(term):
+            i = bisect.bisect_left(self._codes, term)
+            if i < len(self._codes) and self._codes[i] == term:
+                del self._codes[i]
+            return
+        for gram in trigrams(term):
+            terms = self._trigrams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._trigrams[gram]
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Indexa (o reindexa) una fila del catálogo"""
+        doc_id = row['odoo_id']
+        self.remove(doc_id)
+        terms = _document_terms(row)
+        for term, frequency in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                self._add_term(term)
+            posting[doc_id] = frequency
+        length = sum(terms.values())
+        self.doc_terms[doc_id] = tuple(terms)
+        self.doc_lengths[doc_id] = length
+        self.fingerprints[doc_id] = row.get('fingerprint')
+        self.total_length += length
+        self._norms = None
+
+    def remove(self, doc_id: int) -> None:
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+                self._remove_term(term)
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.fingerprints.pop(doc_id, None)
+        self._norms = None
+
+    def _similar_terms(self, token: str) -> List[Tuple[str, float]]:
+        """Términos del vocabulario parecidos a `token` por trigramas"""
+        grams = trigrams(token)
+        shared: Counter = Counter()
+        for gram in grams:
+            for term in self._trigrams.get(gram, ()):
+                shared[term] += 1
+        similar = []
+        for term, count in shared.items():
+            similarity = count / (len(grams) + len(trigrams(term)) - count)
+            if similarity >= FUZZY_THRESHOLD:
+                similar.append((term, similarity))
+        similar.sort(key=lambda item: -item[1])
+        return similar[:FUZZY_CANDIDATES]
+
+    def _prefixed_codes(self, token: str) -> List[Tuple[str, float]]:
+        start = bisect.bisect_left(self._codes, token)
+        matches = []
+        for term in self._codes[start:start + PREFIX_CANDIDATES]:
+            if not term.startswith(token):
+                break
+            matches.append((term, PREFIX_WEIGHT))
+        return matches
+
+    def expand(self, token: str) -> List[Tuple[str, float]]:
+        """Términos del índice que cuentan como coincidencia de `token` y su peso"""
+        if token in self.postings:
+            return [(token, 1.0)]
+        if _is_code(token):
+            prefixed = self._prefixed_codes(token)
+            if prefixed:
+                return prefixed
+        return self._similar_terms(token)
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """
+        IDs de las plantillas que coinciden con `query`, de más a menos relevante.
+
+        Todos los términos de la consulta deben coincidir (exactos, por prefijo
+        o por parecido); si ninguna plantilla los tiene todos, se devuelven las
+        que tienen alguno.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        code = compact_code(query)
+        if code and _is_code(code) and code not in tokens:
+            # "AB-123" también se busca como el código completo "ab123"
+            tokens.append(code)
+        if not tokens or not self.doc_terms:
+            return []
+
+        n_docs = len(self.doc_terms)
+        length_norms = self._length_norms()
+        required: List[Dict[int, float]] = []
+        optional: List[Dict[int, float]] = []
+        for token in tokens:
+            expansions = self.expand(token)
+            if not expansions:
+                continue
+            # Puntuación del término en cada plantilla (la mejor de sus expansiones)
+            hits: Dict[int, float] = {}
+            for term, weight in expansions:
+                posting = self.postings[term]
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                factor = weight * idf * (BM25_K1 + 1)
+                for doc_id, frequency in posting.items():
+                    score = factor * frequency / (frequency + length_norms[doc_id])
+                    if score > hits.get(doc_id, 0.0):
+                        hits[doc_id] = score
+            # El código compactado es una alternativa, no un término obligatorio
+            if token == code and len(tokens) > 1:
+                optional.append(hits)
+            else:
+                required.append(hits)
+
+        if not required:
+            return []
+        # Primero las plantillas con todos los términos, empezando por el más raro
+        required.sort(key=len)
+        candidates = set(required[0]).intersection(*required[1:])
+        if not candidates:
+            candidates = set().union(*required)
+        scores = {
+            d: sum(h.get(d, 0.0) for h in required) + sum(h.get(d, 0.0) for h in optional)
+            for d in candidates
+        }
+        key = lambda d: (-scores[d], d)
+        if limit and limit < len(scores):
+            return heapq.nsmallest(limit, scores, key=key)
+        return sorted(scores, key=key)
+
+
+def _load_fingerprints() -> Dict[int, Optional[str]]:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute('SELECT odoo_id, fingerprint FROM "CatalogProduct"')
+        return dict(cur.fetchall())
+
+
+def _load_rows(ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    columns = ['odoo_id', 'fingerprint', *FIELD_WEIGHTS]
+    sql = f'SELECT {", ".join(columns)} FROM "CatalogProduct"'
+    params: Tuple[Any, ...] = ()
+    if ids is not None:
+        sql += ' WHERE odoo_id = ANY(%s)'
+        params = (ids,)
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        return [dict(zip(columns, r)) for r in cur.fetchall()]
+
+
+def _build_index() -> InvertedIndex:
+    return InvertedIndex.build(_load_rows())
+
+
+class ProductSearchIndex:
+    """Índice de búsqueda del catálogo que se mantiene al día en segundo plano"""
+
+    def __init__(self, refresh_interval: float = settings.SEARCH_INDEX_REFRESH_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._index: Optional[InvertedIndex] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Aumenta cada vez que cambia el contenido indexado
+        self.version = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    def invalidate(self) -> None:
+        """Forzar la comprobación de cambios en la siguiente búsqueda"""
+        self._checked_at = 0.0
+
+    async def refresh(self) -> None:
+        """Cargar el índice o aplicar las filas que han cambiado desde la última vez"""
+        async with self._lock:
+            started = time.perf_counter()
+            if self._index is None:
+                self._index = await asyncio.to_thread(_build_index)
+                self._checked_at = time.monotonic()
+                self.version += 1
+                logger.info(
+                    f"Índice de búsqueda cargado: {len(self._index)} productos, "
+                    f"{len(self._index.postings)} términos en {time.perf_counter() - started:.2f} s"
+                )
+                return
+
+            current = await asyncio.to_thread(_load_fingerprints)
+            self._checked_at = time.monotonic()
+            indexed = self._index.fingerprints
+            changed = [i for i, fp in current.items() if i not in indexed or indexed[i] != fp]
+            removed = [i for i in indexed if i not in current]
+            if not changed and not removed:
+                return
+
+            if len(changed) > len(current) // 5:
+                # Muchos cambios (sincronización completa): reconstruir aparte
+                self._index = await asyncio.to_thread(_build_index)
+            else:
+                rows = await asyncio.to_thread(_load_rows, changed) if changed else []
+                for doc_id in removed:
+                    self._index.remove(doc_id)
+                for row in rows:
+                    self._index.add(row)
+            self.version += 1
+            logger.info(
+                f"Índice de búsqueda actualizado: {len(changed)} productos modificados, "
+                f"{len(removed)} eliminados en {time.perf_counter() - started:.3f} s"
+            )
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar el índice de búsqueda: {str(e)}")
+
+    async def ensure_fresh(self) -> None:
+        """
+        Garantiza que el índice está cargado. Si la última comprobación es
+        antigua, lanza otra en segundo plano sin hacer esperar a la búsqueda.
+        """
+        if self._index is None:
+            await self.refresh()
+            return
+        if time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+
+    async def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """IDs de plantilla que coinciden con `query`, ordenados por relevancia"""
+        await self.ensure_fresh()
+        return self._index.search(query, limit or settings.SEARCH_MAX_RESULTS)
+
+    def stats(self) -> Dict[str, Any]:
+        if self._index is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'documents': len(self._index),
+            'terms': len(self._index.postings),
+            'version': self.version,
+            'checked_seconds_ago': round(time.monotonic() - self._checked_at, 1),
+        }
+
+
+# Instancia global del índice de búsqueda
+product_search_index = ProductSearchIndex()
@@ -0,0 +1,247 @@
+"""
+Índice de prefijos para el autocompletado de los buscadores.
+
+Un array ordenado de claves normalizadas (sin acentos, en minúsculas) sobre
+nombres de producto, referencias, marcas y categorías del catálogo local, en
+el que cada prefijo se localiza con búsqueda binaria. Cada palabra del nombre
+genera una clave, de modo que "combi" encuentra "FRIGORÍFICO COMBI NO FROST".
+Las sugerencias se ordenan por popularidad (unidades vendidas, `x_vendidas`;
+en marcas y categorías, la suma de sus productos).
+
+El índice se reconstruye entero (en otro hilo) cuando cambia el índice de
+búsqueda del catálogo, que es quien detecta los cambios de la sincronización,
+y como mucho cada `SUGGEST_REBUILD_SECONDS` para recoger cambios de nombre de
+las categorías. Una pulsación de tecla nunca consulta a Odoo ni a PostgreSQL.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import connection
+from app.services.product_image import product_image_url
+from app.services.search_index import compact_code, fold, product_search_index
+
+logger = logging.getLogger(__name__)
+
+# Claves examinadas como máximo por consulta
+SCAN_LIMIT = 2000
+
+# Los prefijos que abarcan más claves que esto ("p", "fri"...) tienen sus
+# mejores sugerencias precalculadas, para no recorrer todo el rango
+TOP_THRESHOLD = 256
+TOP_SIZE = 20
+
+
+class Suggestion(NamedTuple):
+    type: str  # product, brand o category
+    id: Optional[int]
+    text: str
+    sku: Optional[str]
+    popularity: int
+    words: Tuple[str, ...]
+    write_date: Optional[str] = None
+    has_image: bool = False
+
+
+def _words(text: str) -> List[str]:
+    return fold(text).split()
+
+
+def _identity(suggestion: Suggestion) -> Tuple[str, Any]:
+    return suggestion.type, suggestion.id if suggestion.id is not None else suggestion.text
+
+
+def _rank_key(suggestion: Suggestion) -> Tuple[int, int, str]:
+    return -suggestion.popularity, len(suggestion.text), suggestion.text
+
+
+def _ranked(suggestions: Iterable[Suggestion], limit: int) -> List[Suggestion]:
+    """Las `limit` sugerencias distintas más populares"""
+    unique: Dict[Tuple[str, Any], Suggestion] = {}
+    for suggestion in suggestions:
+        unique.setdefault(_identity(suggestion), suggestion)
+    return heapq.nsmallest(limit, unique.values(), key=_rank_key)
+
+
+def _top_by_prefix(keys: List[str], suggestions: List[Suggestion]) -> Dict[str, List[Suggestion]]:
+    """Mejores sugerencias de cada prefijo que abarca más de `TOP_THRESHOLD` claves"""
+    top: Dict[str, List[Suggestion]] = {}
+    # Rangos de claves que aún superan el umbral; cada nivel alarga el prefijo
+    ranges = [(0, len(keys))]
+    length = 1
+    while ranges:
+        next_ranges = []
+        for lo, hi in ranges:
+            start = lo
+            while start < hi:
+                if len(keys[start]) < length:
+                    start += 1
+                    continue
+                prefix = keys[start][:length]
+                end = bisect.bisect_left(keys, prefix + '\uffff', start, hi)
+                if end - start > TOP_THRESHOLD:
+                    top[prefix] = _ranked(suggestions[start:end], TOP_SIZE)
+                    next_ranges.append((start, end))
+                start = end
+        ranges = next_ranges
+        length += 1
+    return top
+
+
+def _load_rows() -> List[Tuple[Any, ...]]:
+    with connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            'SELECT p.odoo_id, p.name, p.sku, p.brand, p.units_sold, p.updated_at, p.has_image, '
+            'p.category_odoo_id, c.name FROM "CatalogProduct" p '
+            'LEFT JOIN "Category" c ON c.odoo_id = p.category_odoo_id '
+            'WHERE p.sale_ok AND p.is_active'
+        )
+        return cur.fetchall()
+
+
+def _build(rows: List[Tuple[Any, ...]]) -> Tuple[List[str], List[Suggestion], Dict[str, List[Suggestion]]]:
+    """Claves ordenadas, la sugerencia de cada una y los prefijos precalculados"""
+    entries: List[Tuple[str, Suggestion]] = []
+    brands: Dict[str, List[Any]] = {}
+    categories: Dict[int, List[Any]] = {}
+
+    for odoo_id, name, sku, brand, units_sold, updated_at, has_image, category_id, category_name in rows:
+        popularity = units_sold or 0
+        words = _words(name or '')
+        write_date = updated_at.strftime('%Y-%m-%d %H:%M:%S') if updated_at else None
+        product = Suggestion('product', odoo_id, name, sku, popularity, tuple(words), write_date, has_image)
+        # Una clave por cada palabra del nombre, desde esa palabra hasta el final
+        for i in range(len(words)):
+            entries.append((' '.join(words[i:]), product))
+        if sku:
+            entries.append((compact_code(sku), product))
+        if brand and brand.strip():
+            brands.setdefault(fold(brand.strip()), [brand.strip(), 0])[1] += popularity
+        if category_id and category_name:
+            categories.setdefault(category_id, [category_name, 0])[1] += popularity
+
+    for key, (brand, popularity) in brands.items():
+        entries.append((key, Suggestion('brand', None, brand, None, popularity, tuple(key.split()))))
+    for category_id, (name, popularity) in categories.items():
+        words = _words(name)
+        category = Suggestion('category', category_id, name, None, popularity, tuple(words))
+        for i in range(len(words)):
+            entries.append((' '.join(words[i:]), category))
+
+    entries.sort(key=lambda entry: entry[0])
+    keys = [key for key, _ in entries]
+    suggestions = [suggestion for _, suggestion in entries]
+    return keys, suggestions, _top_by_prefix(keys, suggestions)
+
+
+class SuggestIndex:
+    """Índice de prefijos que se reconstruye cuando cambia el catálogo"""
+
+    def __init__(self, rebuild_interval: float = settings.SUGGEST_REBUILD_SECONDS):
+        self.rebuild_interval = rebuild_interval
+        self._keys: List[str] = []
+        self._suggestions: List[Suggestion] = []
+        self._top: Dict[str, List[Suggestion]] = {}
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    async def rebuild(self) -> None:
+        async with self._lock:
+            started = time.perf_counter()
+            version = product_search_index.version
+            rows = await asyncio.to_thread(_load_rows)
+            self._keys, self._suggestions, self._top = await asyncio.to_thread(_build, rows)
+            self._version = version
+            self._built_at = time.monotonic()
+            logger.info(
+                f"Índice de autocompletado reconstruido: {len(self._keys)} claves "
+                f"en {time.perf_counter() - started:.2f} s"
+            )
+
+    async def _rebuild_in_background(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.warning(f"No se pudo reconstruir el índice de autocompletado: {str(e)}")
+
+    async def ensure_fresh(self) -> None:
+        """
+        Construye el índice la primera vez; después, si el catálogo ha cambiado,
+        lo reconstruye en segundo plano y mientras tanto se sigue usando el anterior
+        """
+        await product_search_index.ensure_fresh()
+        if self._version is None:
+            await self.rebuild()
+            return
+        outdated = (
+            self._version != product_search_index.version
+            or time.monotonic() - self._built_at >= self.rebuild_interval
+        )
+        if outdated and (self._rebuild_task is None or self._rebuild_task.done()):
+            self._rebuild_task = asyncio.create_task(self._rebuild_in_background())
+
+    def lookup(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Sugerencias para lo escrito hasta ahora, las más populares primero.
+
+        Cada palabra escrita debe ser prefijo de alguna palabra de la
+        sugerencia ("frig comb" encuentra "Frigorífico combi").
+        """
+        words = _words(query)
+        if not words:
+            return []
+        keys, suggestions, top = self._keys, self._suggestions, self._top
+
+        # Con varias palabras se recorre el rango de la más selectiva y el
+        # resto se comprueban en cada sugerencia
+        ranges = {}
+        for word in words:
+            start = bisect.bisect_left(keys, word)
+            ranges[word] = (start, bisect.bisect_left(keys, word + '\uffff', start))
+        lead = min(words, key=lambda w: ranges[w][1] - ranges[w][0])
+        others = [w for w in words if w != lead]
+        scans = [(lead, ranges[lead], others)]
+        # Las referencias se indexan compactadas ("AB-12" → "ab12")
+        code = compact_code(query)
+        if code and code not in ranges:
+            start = bisect.bisect_left(keys, code)
+            scans.append((code, (start, bisect.bisect_left(keys, code + '\uffff', start)), []))
+
+        found: List[Suggestion] = []
+        for prefix, (start, end), required in scans:
+            if prefix in top and not required:
+                found.extend(top[prefix])
+                continue
+            for i in range(start, min(end, start + SCAN_LIMIT)):
+                suggestion = suggestions[i]
+                if required and not all(
+                    any(w.startswith(r) for w in suggestion.words) for r in required
+                ):
+                    continue
+                found.append(suggestion)
+
+        ranked = _ranked(found, limit)
+        return [
+            {
+                'type': s.type,
+                'id': s.id,
+                'text': s.text,
+                'sku': s.sku,
+                'image_url': product_image_url(s.id, s.write_date, s.has_image) if s.type == 'product' else None,
+            }
+            for s in ranked
+        ]
+
+    async def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        await self.ensure_fresh()
+        return self.lookup(query, limit)
+
+
+# Instancia global del índice de autocompletado
+suggest_index = SuggestIndex()
@@ -1,6 +1,11 @@
 from typing import List, Optional
-from app.core.odoo_client import odoo_client
+from app.core.odoo_async_client import async_odoo_client
+from app.core.pagination import (
+    decode_cursor, next_cursor, order_terms, page_info, query_key, read_odoo_page, total_cache
+)
 from app.models.supplier import Supplier, SupplierCreate, SupplierUpdate, SupplierList
+from app.services.catalog_version import SUPPLIER_TABLES, bump_catalog_version
+from app.services.response_cache import response_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,14 +16,42 @@ REQUIRED_SUPPLIERS = [
     "Ufesa", "Vitrokitchen", "Nevir", "Mielectro", "Electrodirecto"
 ]
 
-def get_suppliers(
+# Orden de los listados de proveedores (con desempate por id para el cursor)
+SUPPLIER_ORDER = order_terms('name')
+
+async def get_suppliers(
     limit: int = 100,
     offset: int = 0,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
 ) -> SupplierList:
     """
-    Obtener lista de proveedores con filtros y paginación
+    Obtener lista de proveedores con filtros y paginación.
+    
+    Con `cursor` (el `next_cursor` de la página anterior) se pagina por
+    cursor; el total solo se calcula sin cursor o si se pide con `with_total`.
+    Los resultados pasan por la caché de resultados (`response_cache`).
+    
+    Raises:
+        InvalidCursor: si el cursor no corresponde a esta consulta
     """
+    key = f"suppliers:{query_key(search, limit, offset, with_total)}:{cursor or ''}"
+    return await response_cache.get_or_load(
+        key, lambda: _load_suppliers(limit, offset, search, cursor, with_total), SUPPLIER_TABLES, SupplierList
+    )
+
+async def _load_suppliers(
+    limit: int = 100,
+    offset: int = 0,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
+) -> SupplierList:
+    key = query_key('res.partner', search)
+    page = decode_cursor(cursor, key, offset)
+    if with_total is None:
+        with_total = cursor is None
     try:
         # Construir dominio de búsqueda
         domain = [('supplier_rank', '>', 0)]  # Solo proveedores
@@ -31,26 +64,16 @@ def get_suppliers(
             'street', 'city', 'zip', 'country_id', 'supplier_rank', 'active'
         ]
         
-        # Obtener total de registros
-        total = odoo_client.execute_kw(
-            'res.partner', 'search_count', [domain]
-        )
-        
-        # Obtener proveedores
-        suppliers_data = odoo_client.search_read(
-            'res.partner', domain, fields, limit=limit, offset=offset, order='name'
+        # Página y total (si se pide) en una sola llamada a Odoo
+        total, suppliers_data = await read_odoo_page(
+            'res.partner', domain, fields, limit, page, SUPPLIER_ORDER, key if with_total else None
         )
         
         # Procesar resultados
         suppliers = []
         for s in suppliers_data:
-            # Obtener nombre del país
-            country_name = None
-            if s.get('country_id'):
-                country_id = s['country_id'][0] if isinstance(s['country_id'], list) else s['country_id']
-                country_data = odoo_client.read('res.country', [country_id], ['name'])
-                if country_data:
-                    country_name = country_data[0]['name']
+            # El nombre del país viene con el many2one, sin otra llamada
+            country_name = s['country_id'][1] if isinstance(s.get('country_id'), list) else None
             
             # Crear objeto de proveedor
             supplier = {
@@ -70,25 +93,22 @@ def get_suppliers(
             }
             suppliers.append(Supplier(**supplier))
         
-        # Calcular páginas
-        pages = (total + limit - 1) // limit if limit > 0 else 1
-        page = (offset // limit) + 1 if limit > 0 else 1
-        
-        return SupplierList(
-            data=suppliers,
-            total=total,
-            page=page,
-            page_size=limit,
-            pages=pages
-        )
+        last_values = [suppliers_data[-1]['name'], suppliers_data[-1]['id']] if suppliers_data else None
+        cursor = next_cursor(key, page, len(suppliers), limit, last_values)
+        return SupplierList(data=suppliers, **page_info(total, limit, page.offset, cursor))
     except Exception as e:
         logger.error(f"Error al obtener proveedores: {str(e)}")
         raise
 
-def get_supplier(supplier_id: int) -> Supplier:
+async def get_supplier(supplier_id: int) -> Supplier:
     """
     Obtener un proveedor por su ID
     """
+    return await response_cache.get_or_load(
+        f"supplier:{supplier_id}", lambda: _load_supplier(supplier_id), SUPPLIER_TABLES, Supplier
+    )
+
+async def _load_supplier(supplier_id: int) -> Supplier:
     try:
         # Campos a recuperar
         fields = [
@@ -97,20 +117,15 @@ def get_supplier(supplier_id: int) -> Supplier:
         ]
         
         # Obtener proveedor
-        supplier_data = odoo_client.read('res.partner', [supplier_id], fields)
+        supplier_data = await async_odoo_client.read('res.partner', [supplier_id], fields)
         
         if not supplier_data:
             return None
             
         s = supplier_data[0]
         
-        # Obtener nombre del país
-        country_name = None
-        if s.get('country_id'):
-            country_id = s['country_id'][0] if isinstance(s['country_id'], list) else s['country_id']
-            country_data = odoo_client.read('res.country', [country_id], ['name'])
-            if country_data:
-                country_name = country_data[0]['name']
+        # El nombre del país viene con el many2one, sin otra llamada
+        country_name = s['country_id'][1] if isinstance(s.get('country_id'), list) else None
         
         # Crear objeto de proveedor
         supplier = {
@@ -134,7 +149,7 @@ def get_supplier(supplier_id: int) -> Supplier:
         logger.error(f"Error al obtener proveedor {supplier_id}: {str(e)}")
         raise
 
-def create_supplier(supplier: SupplierCreate) -> int:
+async def create_supplier(supplier: SupplierCreate) -> int:
     """
     Crear un nuevo proveedor
     """
@@ -156,13 +171,16 @@ def create_supplier(supplier: SupplierCreate) -> int:
         }
         
         # Crear proveedor
-        supplier_id = odoo_client.create('res.partner', values)
+        supplier_id = await async_odoo_client.create('res.partner', values)
+        total_cache.clear()
+        response_cache.invalidate(*SUPPLIER_TABLES)
+        await bump_catalog_version('Supplier')
         return supplier_id
     except Exception as e:
         logger.error(f"Error al crear proveedor: {str(e)}")
         raise
 
-def update_supplier(supplier_id: int, supplier: SupplierUpdate) -> bool:
+async def update_supplier(supplier_id: int, supplier: SupplierUpdate) -> bool:
     """
     Actualizar un proveedor existente
     """
@@ -195,25 +213,31 @@ def update_supplier(supplier_id: int, supplier: SupplierUpdate) -> bool:
         
         # Actualizar proveedor
         if values:
-            odoo_client.write('res.partner', [supplier_id], values)
+            await async_odoo_client.write('res.partner', [supplier_id], values)
+            total_cache.clear()
+            response_cache.invalidate(*SUPPLIER_TABLES)
+            await bump_catalog_version('Supplier')
             return True
         return False
     except Exception as e:
         logger.error(f"Error al actualizar proveedor {supplier_id}: {str(e)}")
         raise
 
-def delete_supplier(supplier_id: int) -> bool:
+async def delete_supplier(supplier_id: int) -> bool:
     """
     Eliminar un proveedor
     """
     try:
-        odoo_client.unlink('res.partner', [supplier_id])
+        await async_odoo_client.unlink('res.partner', [supplier_id])
+        total_cache.clear()
+        response_cache.invalidate(*SUPPLIER_TABLES)
+        await bump_catalog_version('Supplier')
         return True
     except Exception as e:
         logger.error(f"Error al eliminar proveedor {supplier_id}: {str(e)}")
         raise
 
-def ensure_required_suppliers_exist():
+async def ensure_required_suppliers_exist():
     """
     Asegurar que los proveedores requeridos existan en el sistema
     """
@@ -221,7 +245,7 @@ def ensure_required_suppliers_exist():
         for supplier_name in REQUIRED_SUPPLIERS:
             # Verificar si el proveedor ya existe
             domain = [('name', '=', supplier_name), ('supplier_rank', '>', 0)]
-            supplier_ids = odoo_client.execute_kw(
+            supplier_ids = await async_odoo_client.execute_kw(
                 'res.partner', 'search', [domain]
             )
             
@@ -233,7 +257,7 @@ def ensure_required_suppliers_exist():
                     'is_company': True,
                     'active': True,
                 }
-                odoo_client.create('res.partner', values)
+                await async_odoo_client.create('res.partner', values)
                 logger.info(f"Proveedor {supplier_name} creado correctamente")
         
         return True
@@ -0,0 +1,157 @@
+"""
+Difusión del progreso de los trabajos de sincronización (Server-Sent Events).
+
+Cada worker mantiene un broker en memoria con una cola acotada por oyente:
+
+- Si el trabajo se ejecuta en este worker, el propio trabajo publica un evento
+  por lote y el broker lo reparte a todos los oyentes.
+- Si se ejecuta en otro worker, un único sondeo por trabajo (no uno por oyente)
+  lee el almacén de trabajos y publica los cambios en el broker local.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.core.config import settings
+from app.services import sync_jobs
+
+logger = logging.getLogger(__name__)
+
+# Eventos en cola por oyente; si un cliente lento se queda atrás se descartan
+# los más antiguos (el siguiente evento de progreso ya incluye los totales)
+LISTENER_QUEUE_SIZE = 32
+
+
+def job_event(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Evento de estado a partir de un trabajo del almacén"""
+    return {
+        'sync_id': job['id'],
+        'status': job['status'],
+        'message': job.get('message'),
+        'checkpoint_id': job['checkpoint_id'],
+        'processed': job['processed'],
+        'created': job['created'],
+        'updated': job['updated'],
+        'unchanged': job['unchanged'],
+        'deleted': job['deleted'],
+        'errors': job['errors'],
+        'final': job['status'] in sync_jobs.FINAL_STATUSES,
+    }
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Serializar un evento en el formato de Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class SyncEventBroker:
+    """Reparte los eventos de progreso de cada trabajo entre sus oyentes"""
+
+    def __init__(self):
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._pollers: Dict[str, asyncio.Task] = {}
+        self._local_jobs: Set[str] = set()
+
+    def publish(self, sync_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Enviar un evento a todos los oyentes de un trabajo"""
+        for queue in self._listeners.get(sync_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def mark_local(self, sync_id: str) -> None:
+        """Indicar que el trabajo se ejecuta en este worker (publica él mismo)"""
+        self._local_jobs.add(sync_id)
+        poller = self._pollers.pop(sync_id, None)
+        if poller:
+            poller.cancel()
+
+    def unmark_local(self, sync_id: str) -> None:
+        self._local_jobs.discard(sync_id)
+
+    def subscribe(self, sync_id: str) -> asyncio.Queue:
+        """Registrar un oyente y, si hace falta, el sondeo del trabajo"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        self._listeners.setdefault(sync_id, set()).add(queue)
+        if sync_id not in self._local_jobs and sync_id not in self._pollers:
+            self._pollers[sync_id] = asyncio.ensure_future(self._poll(sync_id))
+        return queue
+
+    def unsubscribe(self, sync_id: str, queue: asyncio.Queue) -> None:
+        listeners = self._listeners.get(sync_id)
+        if listeners is None:
+            return
+        listeners.discard(queue)
+        if not listeners:
+            del self._listeners[sync_id]
+            poller = self._pollers.pop(sync_id, None)
+            if poller:
+                poller.cancel()
+
+    async def _poll(self, sync_id: str) -> None:
+        """Sondear el almacén para un trabajo que corre en otro worker"""
+        last_update: Optional[float] = None
+        try:
+            while sync_id in self._listeners and sync_id not in self._local_jobs:
+                try:
+                    job = await sync_jobs.get_job(sync_id)
+                except Exception as e:
+                    logger.warning(f"No se pudo consultar el trabajo {sync_id}: {str(e)}")
+                    job = None
+                if job and job['updated_at'] != last_update:
+                    last_update = job['updated_at']
+                    data = job_event(job)
+                    self.publish(sync_id, 'status' if data['final'] else 'progress', data)
+                    if data['final']:
+                        return
+                await asyncio.sleep(settings.SYNC_EVENTS_POLL_SECONDS)
+        finally:
+            if self._pollers.get(sync_id) is asyncio.current_task():
+                del self._pollers[sync_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Oyentes y sondeos activos en este worker"""
+        return {
+            'jobs': len(self._listeners),
+            'listeners': sum(len(l) for l in self._listeners.values()),
+            'pollers': len(self._pollers),
+            'local_jobs': len(self._local_jobs),
+        }
+
+
+async def stream_job_events(sync_id: str, job: Dict[str, Any], is_disconnected) -> AsyncIterator[str]:
+    """
+    Generar el flujo SSE de un trabajo: primero su estado actual, después un
+    evento por lote y, por último, el estado final. Mientras no hay eventos se
+    envía un comentario periódico para mantener viva la conexión.
+
+    Args:
+        sync_id: ID del trabajo
+        job: Estado actual del trabajo
+        is_disconnected: Corutina que indica si el cliente se ha desconectado
+    """
+    queue = broker.subscribe(sync_id)
+    try:
+        snapshot = job_event(job)
+        yield format_sse('status', snapshot)
+        if snapshot['final']:
+            return
+        while True:
+            try:
+                event, data = await asyncio.wait_for(
+                    queue.get(), timeout=settings.SYNC_EVENTS_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event, data)
+            if data.get('final'):
+                return
+    finally:
+        broker.unsubscribe(sync_id, queue)
+
+# Broker de eventos de sincronización de este worker
+broker = SyncEventBroker()
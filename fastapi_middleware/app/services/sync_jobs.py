@@ -0,0 +1,335 @@
+"""
+Registro persistente de trabajos de sincronización.
+
+Los trabajos se guardan en la tabla `sync_job` de PostgreSQL, de modo que
+cualquier worker de uvicorn puede consultar su estado y un trabajo interrumpido
+(por una caída o un reinicio) se reanuda desde el último lote confirmado. Cada
+trabajo lleva:
+
+- estado (`pending`, `running`, `completed`, `error`, `cancelled`)
+- punto de control: último id aplicado y contadores acumulados
+- latido del worker que lo ejecuta; si deja de latir, otro worker lo reclama
+- marca de cancelación, que el worker comprueba tras cada lote
+
+De cada tipo hay como mucho un trabajo en ejecución y otro pendiente: pedir
+otro mientras hay uno pendiente devuelve ese mismo, y un trabajo pendiente no
+se reclama mientras otro del mismo tipo está en ejecución (se reanuda cuando
+el supervisor lo encuentra después). Así dos sincronizaciones del mismo
+modelo nunca escriben a la vez su punto de control en `sync_state`.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from psycopg2.extras import Json, RealDictCursor
+
+from app.core.config import settings
+from app.core.database import connection
+from app.services.sync_events import broker, job_event
+from app.services.sync_pipeline import SyncCancelled
+
+logger = logging.getLogger(__name__)
+
+# Identificador de este worker en los trabajos que ejecuta
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+FINAL_STATUSES = ('completed', 'error', 'cancelled')
+COUNTERS = ('processed', 'created', 'updated', 'unchanged', 'deleted', 'errors')
+
+
+def _query(sql: str, params: tuple = (), fetch: str = 'none') -> Any:
+    """Ejecuta una sentencia en su propia transacción (bloqueante)"""
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        if fetch == 'one':
+            return cur.fetchone()
+        if fetch == 'all':
+            return cur.fetchall()
+        return cur.rowcount
+
+
+def _lock_kind(cur, kind: str) -> None:
+    """Serializa, hasta el final de la transacción, la creación y reclamación de trabajos de un tipo"""
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"sync_job:{kind}",))
+
+
+def _create(sync_id: str, kind: str, full_sync: bool, requested_by: Optional[int]) -> Dict[str, Any]:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        _lock_kind(cur, kind)
+        # Un trabajo pendiente del mismo tipo atiende también esta petición
+        cur.execute(
+            """
+            UPDATE sync_job SET full_sync = full_sync OR %s, updated_at = now()
+            WHERE id = (SELECT id FROM sync_job
+                        WHERE kind = %s AND status = 'pending' AND NOT cancel_requested
+                        ORDER BY created_at LIMIT 1)
+            RETURNING *
+            """,
+            (full_sync, kind),
+        )
+        job = cur.fetchone()
+        if job is not None:
+            return job
+        cur.execute(
+            """
+            INSERT INTO sync_job (id, kind, status, message, full_sync, requested_by, created_at, updated_at)
+            VALUES (%s, %s, 'pending', 'Sincronización en cola', %s, %s, now(), now())
+            RETURNING *
+            """,
+            (sync_id, kind, full_sync, requested_by),
+        )
+        return cur.fetchone()
+
+
+def _claim(sync_id: str) -> Optional[Dict[str, Any]]:
+    with connection() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT kind FROM sync_job WHERE id = %s", (sync_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        _lock_kind(cur, row['kind'])
+        cur.execute(
+            """
+            UPDATE sync_job
+            SET status = 'running', worker = %(worker)s, heartbeat_at = now(),
+                started_at = COALESCE(started_at, now()), attempts = attempts + 1,
+                message = 'Sincronización en progreso', updated_at = now()
+            WHERE id = %(id)s
+              AND NOT cancel_requested
+              AND (status = 'pending'
+                   OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => %(stale)s)))
+              AND NOT EXISTS (
+                  SELECT 1 FROM sync_job other
+                  WHERE other.kind = sync_job.kind AND other.id <> sync_job.id
+                    AND other.status = 'running'
+                    AND other.heartbeat_at >= now() - make_interval(secs => %(stale)s))
+            RETURNING *
+            """,
+            {'worker': WORKER_ID, 'id': sync_id, 'stale': settings.SYNC_JOB_STALE_SECONDS},
+        )
+        return cur.fetchone()
+
+
+async def _run(sql: str, params: tuple = (), fetch: str = 'none') -> Any:
+    return await asyncio.to_thread(_query, sql, params, fetch)
+
+
+def _serialize(job: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Convierte las fechas de un trabajo en marcas de tiempo UNIX"""
+    if job is None:
+        return None
+    job = dict(job)
+    for key in ('heartbeat_at', 'started_at', 'finished_at', 'created_at', 'updated_at'):
+        if job.get(key) is not None:
+            job[key] = job[key].timestamp()
+    return job
+
+
+async def create_job(kind: str, full_sync: bool = False, requested_by: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Registrar un trabajo de sincronización pendiente.
+
+    Si ya hay uno pendiente del mismo tipo no se crea otro: se devuelve ese
+    (convertido en completo si se pide `full_sync`).
+
+    Returns:
+        El trabajo creado o el pendiente que ya existía
+    """
+    sync_id = f"sync_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    job = await asyncio.to_thread(_create, sync_id, kind, full_sync, requested_by)
+    return _serialize(job)
+
+
+async def get_job(sync_id: str) -> Optional[Dict[str, Any]]:
+    """Obtener un trabajo por su ID"""
+    return _serialize(await _run("SELECT * FROM sync_job WHERE id = %s", (sync_id,), fetch='one'))
+
+
+async def claim_job(sync_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Reclamar un trabajo para este worker.
+
+    Solo se puede reclamar un trabajo pendiente o uno en ejecución cuyo worker
+    lleva más de `SYNC_JOB_STALE_SECONDS` sin latir, y solo si no hay otro del
+    mismo tipo en ejecución. La comprobación y la reclamación se hacen en la
+    misma transacción, con el bloqueo del tipo, así que dos workers nunca
+    ejecutan a la vez el mismo trabajo ni dos del mismo tipo.
+
+    Returns:
+        El trabajo reclamado o None si no estaba disponible
+    """
+    job = await asyncio.to_thread(_claim, sync_id)
+    return _serialize(job)
+
+
+async def stale_job_ids() -> List[str]:
+    """
+    IDs de trabajos cuyo worker ha dejado de latir, o pendientes desde hace
+    más de `SYNC_JOB_STALE_SECONDS` (el worker que los creó cayó antes de
+    reclamarlos)
+    """
+    rows = await _run(
+        """
+        SELECT id FROM sync_job
+        WHERE NOT cancel_requested
+          AND ((status = 'running' AND heartbeat_at < now() - make_interval(secs => %s))
+               OR (status = 'pending' AND created_at < now() - make_interval(secs => %s)))
+        ORDER BY created_at
+        """,
+        (settings.SYNC_JOB_STALE_SECONDS, settings.SYNC_JOB_STALE_SECONDS),
+        fetch='all',
+    )
+    return [r['id'] for r in rows]
+
+
+async def heartbeat(sync_id: str, checkpoint_id: Optional[int] = None, counters: Optional[Dict[str, int]] = None) -> bool:
+    """
+    Registrar el latido del worker y, opcionalmente, un punto de control.
+
+    Returns:
+        True si se ha pedido cancelar el trabajo
+    """
+    assignments = ["heartbeat_at = now()", "updated_at = now()"]
+    params: List[Any] = []
+    if checkpoint_id is not None:
+        assignments.append("checkpoint_id = %s")
+        params.append(checkpoint_id)
+    for key in COUNTERS:
+        if counters and key in counters:
+            assignments.append(f"{key} = %s")
+            params.append(counters[key])
+    row = await _run(
+        f"UPDATE sync_job SET {', '.join(assignments)} WHERE id = %s AND worker = %s RETURNING cancel_requested",
+        (*params, sync_id, WORKER_ID),
+        fetch='one',
+    )
+    # Si otro worker ha reclamado el trabajo, este debe detenerse
+    return True if row is None else bool(row['cancel_requested'])
+
+
+async def finish_job(sync_id: str, status: str, message: str, details: Optional[Dict[str, Any]] = None) -> None:
+    """Marcar un trabajo como terminado"""
+    await _run(
+        """
+        UPDATE sync_job
+        SET status = %s, message = %s, details = %s, finished_at = now(), updated_at = now()
+        WHERE id = %s AND worker = %s
+        """,
+        (status, message, Json(details or {}), sync_id, WORKER_ID),
+    )
+
+
+async def request_cancel(sync_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Pedir la cancelación de un trabajo. Un trabajo pendiente se cancela en el
+    acto; uno en ejecución se detiene tras el lote en curso.
+    """
+    job = await _run(
+        """
+        UPDATE sync_job
+        SET cancel_requested = true,
+            status = CASE WHEN status = 'pending' THEN 'cancelled' ELSE status END,
+            updated_at = now()
+        WHERE id = %s
+        RETURNING *
+        """,
+        (sync_id,),
+        fetch='one',
+    )
+    return _serialize(job)
+
+
+async def _heartbeat_loop(sync_id: str, cancel_event: asyncio.Event) -> None:
+    """Mantener vivo el trabajo aunque un lote tarde más que el intervalo de latido"""
+    while True:
+        await asyncio.sleep(settings.SYNC_JOB_HEARTBEAT_SECONDS)
+        try:
+            if await heartbeat(sync_id):
+                cancel_event.set()
+        except Exception as e:
+            logger.warning(f"No se pudo registrar el latido de {sync_id}: {str(e)}")
+
+
+async def run_sync_job(sync_id: str) -> None:
+    """
+    Ejecutar (o reanudar) un trabajo de sincronización. El tipo del trabajo
+    indica el modelo que se sincroniza (clave de `SYNC_SPECS`).
+
+    Si el trabajo ya tenía un punto de control, la sincronización continúa a
+    partir del último id confirmado y los contadores se acumulan.
+    """
+    from app.services.sync_service import SyncService
+
+    job = await claim_job(sync_id)
+    if job is None:
+        logger.info(f"Trabajo {sync_id} no disponible para {WORKER_ID}")
+        return
+
+    broker.mark_local(sync_id)
+    base = {key: job[key] for key in COUNTERS}
+    start_after = job['checkpoint_id']
+    if start_after:
+        logger.info(f"Reanudando {sync_id} tras el id {start_after} (intento {job['attempts']})")
+
+    cancel_event = asyncio.Event()
+    heartbeat_task = asyncio.ensure_future(_heartbeat_loop(sync_id, cancel_event))
+
+    async def on_progress(progress: Dict[str, Any]) -> None:
+        counters = {key: base[key] + progress.get(key, 0) for key in COUNTERS}
+        broker.publish(sync_id, 'progress', {
+            **progress, **counters, 'sync_id': sync_id, 'status': 'running', 'final': False
+        })
+        cancelled = await heartbeat(sync_id, progress.get('checkpoint_id'), counters)
+        if cancelled or cancel_event.is_set():
+            raise SyncCancelled(sync_id)
+
+    try:
+        result = await SyncService().sync(
+            job['kind'],
+            full_sync=job['full_sync'],
+            start_after=start_after,
+            progress=on_progress,
+        )
+        if result['status'] == 'cancelled':
+            status, message = 'cancelled', 'Sincronización cancelada'
+        elif result['status'] == 'error':
+            status, message = 'error', result.get('error') or result['message']
+        else:
+            status, message = 'completed', result['message']
+        await finish_job(sync_id, status, message, result.get('stats'))
+        logger.info(f"Sincronización {sync_id} terminada con estado {status}")
+    except Exception as e:
+        logger.error(f"Error en sincronización {sync_id}: {str(e)}", exc_info=True)
+        await finish_job(sync_id, 'error', 'Error durante la sincronización', {'error': str(e)})
+    finally:
+        heartbeat_task.cancel()
+        broker.unmark_local(sync_id)
+        try:
+            final = await get_job(sync_id)
+        except Exception:
+            final = None
+        if final:
+            broker.publish(sync_id, 'status', job_event(final))
+
+
+async def resume_stale_jobs() -> None:
+    """
+    Supervisor que reanuda los trabajos abandonados por un worker caído.
+
+    Cada worker lo ejecuta; la reclamación atómica garantiza que solo uno de
+    ellos se queda con cada trabajo.
+    """
+    while True:
+        try:
+            for sync_id in await stale_job_ids():
+                logger.warning(f"Trabajo {sync_id} abandonado; intentando reanudarlo")
+                asyncio.ensure_future(run_sync_job(sync_id))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"No se pudieron revisar los trabajos de sincronización: {str(e)}")
+        await asyncio.sleep(settings.SYNC_JOB_STALE_SECONDS)
@@ -0,0 +1,155 @@
+"""
+Pipeline asíncrono por etapas para la sincronización con Odoo.
+
+Separa la sincronización en tres etapas que trabajan a la vez, unidas por colas
+acotadas que aplican contrapresión:
+
+    lectura de Odoo  ->  mapeo al formato local  ->  escritura en la base de datos
+
+Mientras se escribe un lote ya se está leyendo y mapeando el siguiente, de modo
+que ni Odoo ni la base de datos local quedan ociosos. Los lotes pueden terminar
+de escribirse en cualquier orden, pero `on_batch` se llama siempre en el orden
+de lectura, lo que permite guardar puntos de control seguros.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Transforma un lote leído en (filas mapeadas, número de errores de mapeo)
+TransformFn = Callable[[List[Dict[str, Any]]], Awaitable[Tuple[List[Dict[str, Any]], int]]]
+# Escribe las filas mapeadas y devuelve su resultado (estadísticas del escritor)
+WriteFn = Callable[[List[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+
+
+class SyncCancelled(Exception):
+    """Se lanza desde un callback para detener el pipeline de forma ordenada"""
+
+
+@dataclass
+class PipelineBatch:
+    """Lote que atraviesa el pipeline"""
+    seq: int
+    records: List[Dict[str, Any]]
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    map_errors: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[BaseException] = None
+
+
+# Callback por lote, llamado en orden de lectura cuando el lote termina
+BatchCallback = Callable[[PipelineBatch], Awaitable[None]]
+
+_DONE = object()
+
+
+class BatchPipeline:
+    """
+    Pipeline lectura → mapeo → escritura con colas acotadas.
+
+    Args:
+        transform: Etapa de mapeo de un lote
+        write: Etapa de escritura de un lote
+        on_batch: Callback por lote terminado, en orden de lectura
+        prefetch: Lotes que se pueden leer por delante de los que se escriben
+        map_concurrency: Tareas de mapeo simultáneas
+        write_concurrency: Tareas de escritura simultáneas
+    """
+
+    def __init__(
+        self,
+        transform: TransformFn,
+        write: WriteFn,
+        on_batch: BatchCallback,
+        prefetch: int = 2,
+        map_concurrency: int = 1,
+        write_concurrency: int = 1,
+    ):
+        self.transform = transform
+        self.write = write
+        self.on_batch = on_batch
+        self.prefetch = max(1, prefetch)
+        self.map_concurrency = max(1, map_concurrency)
+        self.write_concurrency = max(1, write_concurrency)
+
+    async def run(self, source: AsyncIterator[List[Dict[str, Any]]]) -> int:
+        """
+        Ejecutar el pipeline hasta agotar `source`.
+
+        Returns:
+            Número de lotes procesados
+
+        Raises:
+            La primera excepción de lectura o de un callback; los errores de
+            mapeo y escritura se registran en el lote y no detienen el pipeline
+        """
+        fetched: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+        mapped: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+        finished: Dict[int, PipelineBatch] = {}
+        next_seq = 0
+        total = 0
+        completion_lock = asyncio.Lock()
+
+        async def fetcher():
+            nonlocal total
+            async for records in source:
+                await fetched.put(PipelineBatch(seq=total, records=records))
+                total += 1
+            for _ in range(self.map_concurrency):
+                await fetched.put(_DONE)
+
+        async def mapper():
+            while True:
+                batch = await fetched.get()
+                if batch is _DONE:
+                    return
+                try:
+                    batch.rows, batch.map_errors = await self.transform(batch.records)
+                except Exception as e:
+                    logger.error(f"Error al mapear el lote {batch.seq}: {str(e)}", exc_info=True)
+                    batch.error = e
+                    batch.map_errors = len(batch.records)
+                await mapped.put(batch)
+
+        async def writer():
+            while True:
+                batch = await mapped.get()
+                if batch is _DONE:
+                    return
+                if batch.error is None:
+                    try:
+                        batch.result = await self.write(batch.rows)
+                    except Exception as e:
+                        logger.error(f"Error al escribir el lote {batch.seq}: {str(e)}", exc_info=True)
+                        batch.error = e
+                await complete(batch)
+
+        async def complete(batch: PipelineBatch):
+            # Entregar los lotes terminados en orden de lectura
+            nonlocal next_seq
+            async with completion_lock:
+                finished[batch.seq] = batch
+                while next_seq in finished:
+                    await self.on_batch(finished.pop(next_seq))
+                    next_seq += 1
+
+        async def mappers():
+            await asyncio.gather(*(mapper() for _ in range(self.map_concurrency)))
+            for _ in range(self.write_concurrency):
+                await mapped.put(_DONE)
+
+        tasks = [
+            asyncio.ensure_future(fetcher()),
+            asyncio.ensure_future(mappers()),
+            *(asyncio.ensure_future(writer()) for _ in range(self.write_concurrency)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return total
@@ -5,6 +5,7 @@ Este módulo proporciona la capa de servicio principal para sincronizar datos
 entre Odoo y la base de datos local, coordinando las operaciones de los
 servicios específicos de cada modelo.
 """
+import asyncio
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -14,6 +15,7 @@ from prisma import Prisma
 from app.core.config import settings
 from app.services.odoo.product_service import ProductService
 from app.services.odoo.base_service import OdooConfig
+from app.services.odoo.sync_specs import SYNC_SPECS
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -161,36 +163,18 @@ class SyncService:
             if in_stock:
                 domain.append(('qty_available', '>', 0))
             
-            # Realizar búsqueda en Odoo
-            product_ids = await self.product_service.search(
+            # Página y total en una sola llamada XML-RPC (en otro hilo)
+            fields = ['id', 'name', 'default_code', 'list_price', 'x_pvp_web', 'qty_available']
+            result = await asyncio.to_thread(
+                self.product_service.search_read_page,
                 'product.template',
                 domain=domain,
-                limit=limit,
+                fields=fields,
                 offset=offset,
-                order='write_date desc'
-            )
-            
-            if not product_ids:
-                return {
-                    "items": [],
-                    "total": 0,
-                    "limit": limit,
-                    "offset": offset
-                }
-            
-            # Obtener detalles de los productos
-            fields = ['id', 'name', 'default_code', 'list_price', 'x_pvp_web', 'qty_available']
-            products = await self.product_service.read(
-                'product.template',
-                product_ids,
-                fields=fields
-            )
-            
-            # Obtener el total de resultados (sin límite)
-            total = await self.product_service.search_count(
-                'product.template',
-                domain=domain
+                limit=limit,
+                order='write_date desc, id desc'
             )
+            products, total = result['records'], result['length']
             
             # Formatear resultados
             formatted_products = []
@@ -222,18 +206,21 @@ class SyncService:
                 "offset": offset
             }
     
-    async def sync_products(
+    async def sync(
         self,
+        kind: str,
         domain: Optional[List[Any]] = None,
         batch_size: int = 100,
         full_sync: bool = False,
         **kwargs
     ) -> Dict[str, Any]:
         """
-        Sincroniza productos desde Odoo a la base de datos local.
+        Sincroniza un modelo de Odoo con la base de datos local.
         
         Args:
-            domain: Dominio de búsqueda para filtrar productos en Odoo
+            kind: Tipo de sincronización (clave de `SYNC_SPECS`: products,
+                  categories, suppliers, supplier_info, stock)
+            domain: Dominio de búsqueda para filtrar registros en Odoo
             batch_size: Tamaño del lote para procesamiento por lotes
             full_sync: Si es True, realiza una sincronización completa
             **kwargs: Argumentos adicionales para la sincronización
@@ -241,11 +228,13 @@ class SyncService:
         Returns:
             Dict con estadísticas de la sincronización
         """
-        logger.info("Iniciando sincronización de productos")
+        spec = SYNC_SPECS[kind]
+        logger.info(f"Iniciando sincronización de {spec.model}")
         
         try:
-            # Ejecutar la sincronización a través del servicio de productos
-            stats = await self.product_service.sync_products(
+            # Ejecutar la sincronización a través del motor genérico
+            stats = await self.product_service.sync_model(
+                spec,
                 domain=domain,
                 batch_size=batch_size,
                 full_sync=full_sync,
@@ -253,15 +242,28 @@ class SyncService:
             )
             
             # Formatear resultado
+            if stats.get('cancelled'):
+                status, message = "cancelled", f"Sincronización de {spec.model} cancelada"
+            elif 'error' in stats:
+                status, message = "error", f"Error en la sincronización de {spec.model}"
+            else:
+                status, message = "completed", f"Sincronización de {spec.model} completada"
+            
             result = {
-                "status": "completed" if stats.get('status') != 'error' else 'error',
-                "message": "Sincronización de productos completada",
+                "status": status,
+                "message": message,
                 "stats": {
+                    "kind": kind,
+                    "mode": stats.get('mode'),
+                    "resumed_after": stats.get('resumed_after', 0),
                     "total": stats.get('total', 0),
                     "created": stats.get('created', 0),
                     "updated": stats.get('updated', 0),
+                    "unchanged": stats.get('unchanged', 0),
                     "deleted": stats.get('deleted', 0),
                     "errors": stats.get('errors', 0),
+                    "write_seconds": round(stats.get('write_seconds', 0), 4),
+                    "batches": stats.get('batches', []),
                     "duration_seconds": stats.get('duration_seconds', 0)
                 },
                 "timestamp": datetime.utcnow().isoformat()
@@ -271,15 +273,16 @@ class SyncService:
                 result["error"] = stats['error']
             
             logger.info(
-                f"Sincronización completada: {result['stats']['total']} productos procesados, "
+                f"Sincronización completada: {result['stats']['total']} registros de {spec.model} procesados, "
                 f"{result['stats']['created']} creados, {result['stats']['updated']} actualizados, "
+                f"{result['stats']['unchanged']} sin cambios, "
                 f"{result['stats']['deleted']} eliminados, {result['stats']['errors']} errores"
             )
             
             return result
             
         except Exception as e:
-            error_msg = f"Error en la sincronización de productos: {str(e)}"
+            error_msg = f"Error en la sincronización de {spec.model}: {str(e)}"
             logger.error(error_msg, exc_info=True)
             
             return {
@@ -288,6 +291,27 @@ class SyncService:
                 "error": str(e),
                 "timestamp": datetime.utcnow().isoformat()
             }
+    
+    async def sync_products(
+        self,
+        domain: Optional[List[Any]] = None,
+        batch_size: int = 100,
+        full_sync: bool = False,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Sincroniza productos desde Odoo a la base de datos local.
+        
+        Args:
+            domain: Dominio de búsqueda para filtrar productos en Odoo
+            batch_size: Tamaño del lote para procesamiento por lotes
+            full_sync: Si es True, realiza una sincronización completa
+            **kwargs: Argumentos adicionales para la sincronización
+            
+        Returns:
+            Dict con estadísticas de la sincronización
+        """
+        return await self.sync('products', domain=domain, batch_size=batch_size, full_sync=full_sync, **kwargs)
 
 # Ejemplo de uso:
 # sync_service = SyncService()
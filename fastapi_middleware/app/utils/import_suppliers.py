@@ -1,19 +1,25 @@
 import os
 import json
+import asyncio
 import logging
-from app.core.odoo_client import odoo_client
+from app.core.config import settings
+from app.core.fingerprint import FingerprintStore, fingerprint_file
+from app.core.odoo_async_client import async_odoo_client
 from app.services.supplier import REQUIRED_SUPPLIERS, ensure_required_suppliers_exist
 
 logger = logging.getLogger(__name__)
 
-def import_suppliers_from_json():
+async def import_suppliers_from_json():
     """
     Importar proveedores desde los archivos JSON que empiezan por PVP
-    en la carpeta jsons y asegurar que los proveedores requeridos existen
+    en la carpeta jsons y asegurar que los proveedores requeridos existen.
+    
+    Los ficheros cuya huella coincide con la de la última importación
+    correcta se omiten sin leerlos ni consultar Odoo.
     """
     try:
         # Primero asegurar que los proveedores requeridos existen
-        ensure_required_suppliers_exist()
+        await ensure_required_suppliers_exist()
         
         # Buscar archivos JSON en la carpeta jsons
         json_dir = "/home/espasiko/odoo/custom_addons/pelotazo/jsons"
@@ -27,10 +33,26 @@ def import_suppliers_from_json():
         if not json_files:
             logger.warning("No se encontraron archivos JSON que empiecen por PVP")
             return False
+        
+        # Omitir los ficheros que no han cambiado desde la última importación
+        store = FingerprintStore(os.path.join(settings.IMPORT_STATE_DIR, "import_suppliers.json"))
+        digests = {f: fingerprint_file(os.path.join(json_dir, f)) for f in json_files}
+        pending_files = [f for f in json_files if not store.unchanged(f, digests[f])]
+        if not pending_files:
+            logger.info(f"Los {len(json_files)} archivos PVP no han cambiado desde la última importación")
+            return True
+            
+        # Precargar los proveedores existentes con un recorrido por lotes en
+        # lugar de una búsqueda en Odoo por cada proveedor del fichero
+        existing_suppliers = set()
+        async for batch in async_odoo_client.iter_batches(
+            'res.partner', [('supplier_rank', '>', 0)], ['name']
+        ):
+            existing_suppliers.update(p['name'] for p in batch)
             
         # Procesar cada archivo
         suppliers_found = set()
-        for json_file in json_files:
+        for json_file in pending_files:
             file_path = os.path.join(json_dir, json_file)
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
@@ -42,27 +64,27 @@ def import_suppliers_from_json():
                     if supplier_name and supplier_name.lower() != 'genérico' and supplier_name not in suppliers_found:
                         suppliers_found.add(supplier_name)
                         
-                        # Verificar si el proveedor ya existe
-                        domain = [('name', '=', supplier_name), ('supplier_rank', '>', 0)]
-                        supplier_ids = odoo_client.execute_kw(
-                            'res.partner', 'search', [domain]
-                        )
-                        
                         # Si no existe, crearlo
-                        if not supplier_ids:
+                        if supplier_name not in existing_suppliers:
                             values = {
                                 'name': supplier_name,
                                 'supplier_rank': 1,
                                 'is_company': True,
                                 'active': True,
                             }
-                            odoo_client.create('res.partner', values)
+                            await async_odoo_client.create('res.partner', values)
+                            existing_suppliers.add(supplier_name)
                             logger.info(f"Proveedor {supplier_name} creado correctamente")
+                store.update(json_file, digests[json_file])
             except Exception as e:
                 logger.error(f"Error al procesar archivo {json_file}: {str(e)}")
                 continue
-                
-        logger.info(f"Se encontraron {len(suppliers_found)} proveedores en los archivos JSON")
+        
+        store.save()
+        logger.info(
+            f"Se encontraron {len(suppliers_found)} proveedores en {len(pending_files)} archivos JSON "
+            f"({len(json_files) - len(pending_files)} sin cambios)"
+        )
         return True
     except Exception as e:
         logger.error(f"Error al importar proveedores desde JSON: {str(e)}")
@@ -73,4 +95,4 @@ if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     
     # Importar proveedores
-    import_suppliers_from_json()
+    asyncio.run(import_suppliers_from_json())
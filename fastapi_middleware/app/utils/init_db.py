@@ -4,7 +4,7 @@ from app.utils.import_suppliers import import_suppliers_from_json
 
 logger = logging.getLogger(__name__)
 
-def initialize_database():
+async def initialize_database():
     """
     Inicializar la base de datos con los datos necesarios
     """
@@ -12,14 +12,14 @@ def initialize_database():
         # Asegurar que los proveedores requeridos existen
         logger.info("Asegurando que los proveedores requeridos existen...")
         try:
-            ensure_required_suppliers_exist()
+            await ensure_required_suppliers_exist()
         except Exception as e:
             logger.warning(f"No se pudieron asegurar los proveedores requeridos: {str(e)}")
         
         # Importar proveedores desde archivos JSON
         logger.info("Importando proveedores desde archivos JSON...")
         try:
-            import_suppliers_from_json()
+            await import_suppliers_from_json()
         except Exception as e:
             logger.warning(f"No se pudieron importar los proveedores desde JSON: {str(e)}")
         
@@ -0,0 +1,131 @@
+"""
+Microbenchmark del coste por fila de los listados de productos.
+
+Compara la ruta anterior (diccionario por fila, `Product(**producto)`,
+validación y serialización de FastAPI con `response_model=ProductList`) con
+el mapeador precompilado y la serialización con orjson.
+
+Uso (desde fastapi_middleware):
+
+    python -m benchmarks.product_rows [filas por página] [repeticiones]
+"""
+import json
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.serialization import dumps
+from app.models.product import Product, ProductList
+from app.services.category_index import category_index
+from app.services.product import _odoo_to_product
+from app.services.product_image import product_image_url
+
+
+def _odoo_rows(count: int) -> List[Dict[str, Any]]:
+    """Filas como las devuelve `search_read` de product.template"""
+    rng = random.Random(42)
+    rows = []
+    for i in range(1, count + 1):
+        price = round(rng.uniform(5, 2000), 2)
+        rows.append({
+            'id': i,
+            'name': f"Producto {i}",
+            'description_sale': False if i % 3 else f"Descripción del producto {i}",
+            'list_price': price,
+            'standard_price': round(price * 0.7, 2),
+            'default_code': f"REF{i:05d}",
+            'barcode': f"84{i:011d}" if i % 4 else False,
+            'active': True,
+            'sale_ok': True,
+            'purchase_ok': True,
+            'categ_id': [i % 20 + 1, f"All / Categoría {i % 20 + 1}"],
+            'write_date': '2024-05-01 10:00:00',
+            'x_nombre_proveedor': 'Becken',
+            'x_marca': 'Becken',
+            'x_pvp_web': round(price * 1.05, 2),
+            'x_precio_venta_web': round(price * 1.1, 2),
+            'x_dto': 0.0,
+            'x_precio_margen': round(price * 1.2, 2),
+            'x_beneficio': 20.0,
+            'x_beneficio_unitario': round(price * 0.3, 2),
+            'x_beneficio_total': round(price * 3, 2),
+            'x_vendidas': i % 50,
+        })
+    return rows
+
+
+def _legacy_to_product(p: Dict[str, Any]) -> Product:
+    """Conversión anterior: diccionario por fila y validación con pydantic"""
+    product = {
+        'id': p['id'],
+        'name': p['name'],
+        'description': p.get('description_sale') or None,
+        'list_price': p['list_price'],
+        'standard_price': p.get('standard_price', 0),
+        'default_code': p.get('default_code') or None,
+        'barcode': p.get('barcode') or None,
+        'active': p.get('active', True),
+        'sale_ok': p.get('sale_ok', True),
+        'purchase_ok': p.get('purchase_ok', True),
+        'categ_id': p['categ_id'][0] if isinstance(p['categ_id'], list) else p['categ_id'],
+        'categ_name': category_index.resolve_name(p.get('categ_id')),
+        'image_url': product_image_url(p['id'], p.get('write_date')),
+        'x_nombre_proveedor': p.get('x_nombre_proveedor', ''),
+        'x_marca': p.get('x_marca', ''),
+        'x_pvp_web': p.get('x_pvp_web', 0),
+        'x_precio_venta_web': p.get('x_precio_venta_web', 0),
+        'x_dto': p.get('x_dto', 0),
+        'x_precio_margen': p.get('x_precio_margen', 0),
+        'x_beneficio': p.get('x_beneficio', 0),
+        'x_beneficio_unitario': p.get('x_beneficio_unitario', 0),
+        'x_beneficio_total': p.get('x_beneficio_total', 0),
+        'x_vendidas': p.get('x_vendidas', 0),
+        'supplier': p.get('x_nombre_proveedor', ''),
+        'brand': p.get('x_marca', ''),
+        'price': p['list_price'],
+    }
+    return Product(**product)
+
+
+def before(rows: List[Dict[str, Any]]) -> bytes:
+    page = ProductList(data=[_legacy_to_product(p) for p in rows], total=len(rows), page=1, page_size=len(rows), pages=1)
+    # Lo que hace FastAPI con `response_model`: volcar, validar, serializar
+    content = ProductList.model_validate(page.model_dump())
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False).encode()
+
+
+def after(rows: List[Dict[str, Any]]) -> bytes:
+    page = {'data': [_odoo_to_product(p) for p in rows], 'total': len(rows), 'page': 1,
+            'page_size': len(rows), 'pages': 1, 'next_cursor': None, 'facets': None}
+    return dumps(page)
+
+
+def _per_row(fn: Callable[[List[Dict[str, Any]]], bytes], rows: List[Dict[str, Any]], repeat: int) -> float:
+    fn(rows)  # calentamiento
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - started)
+    return best / len(rows) * 1e6
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rows = _odoo_rows(count)
+
+    assert json.loads(before(rows)) == json.loads(after(rows)), "Las dos rutas no devuelven lo mismo"
+
+    old = _per_row(before, rows, repeat)
+    new = _per_row(after, rows, repeat)
+    print(f"{count} filas por página, mejor de {repeat} repeticiones")
+    print(f"  antes:   {old:8.2f} µs/fila")
+    print(f"  después: {new:8.2f} µs/fila  (x{old / new:.1f})")
+
+
+if __name__ == "__main__":
+    main()
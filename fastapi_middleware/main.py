@@ -26,6 +26,17 @@ from app.routes import (
 from app.utils.init_db import initialize_database
 from app.core.logging_config import setup_logging
 from app.core.middleware import LoggingMiddleware
+from app.core.odoo_async_client import async_odoo_client
+from app.core.xmlrpc_pool import pool_stats
+from app.core.database import close_pool
+from app.services.sync_jobs import resume_stale_jobs
+from app.services.sync_events import broker as sync_event_broker
+from app.services.change_feed import tail_change_journal, change_feed_stats
+from app.services.auth import auth_cache_stats
+from app.services.search_index import product_search_index
+from app.services.facet_index import facet_index
+from app.services.lookup_index import lookup_index
+from app.services.response_cache import response_cache
 
 # Configurar logging
 setup_logging()
@@ -51,6 +62,20 @@ async def lifespan(app: FastAPI):
         # No hacemos raise aquí para permitir que la aplicación se inicie
         # incluso si hay problemas con la base de datos
     
+    # Reanudar los trabajos de sincronización que un worker caído dejó a medias
+    sync_supervisor = asyncio.create_task(resume_stale_jobs())
+    
+    # Aplicar en segundos los cambios anotados en el diario de Odoo
+    change_feed = None
+    if settings.SYNC_CHANGE_FEED_ENABLED:
+        change_feed = asyncio.create_task(tail_change_journal())
+    
+    # Cargar el índice de códigos antes de la primera petición (los errores se
+    # registran y el índice se construye en la primera búsqueda)
+    lookup_warmup = None
+    if settings.CATALOG_READ_MODEL_ENABLED:
+        lookup_warmup = asyncio.create_task(lookup_index._rebuild_in_background())
+    
     # Tiempo de inicio
     app.state.startup_time = startup_time
     logger.info(f"Aplicación lista en {time.time() - startup_time:.2f} segundos")
@@ -59,7 +84,13 @@ async def lifespan(app: FastAPI):
     
     # Cierre de la aplicación
     logger.info("Cerrando aplicación El Pelotazo API...")
-    # Aquí podrías agregar lógica de limpieza si es necesario
+    sync_supervisor.cancel()
+    if change_feed:
+        change_feed.cancel()
+    if lookup_warmup:
+        lookup_warmup.cancel()
+    await async_odoo_client.aclose()
+    close_pool()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -209,13 +240,12 @@ async def global_exception_handler(request: Request, exc: Exception):
     """
     Manejador global para cualquier excepción no manejada.
     """
+    # Sin cabeceras ni parámetros: pueden llevar tokens y datos personales, y
+    # la línea de la petición ya se registra en LoggingMiddleware
     logger.error(
-        f"Error no manejado: {str(exc)}\n"
-        f"URL: {request.method} {request.url}\n"
-        f"Headers: {dict(request.headers)}\n"
-        f"Query params: {dict(request.query_params)}\n"
-        f"Path params: {request.path_params}",
-        exc_info=True
+        f"Error no manejado en {request.method} {request.url.path}: {type(exc).__name__}: {str(exc)}",
+        exc_info=True,
+        extra={"request_id": getattr(request.state, "request_id", None)},
     )
     
     # No exponer detalles del error en producción
@@ -259,6 +289,14 @@ async def health_check():
         "version": settings.API_VERSION,
         "dependencies": {
             "database": db_status,
+            "odoo_xmlrpc_pools": pool_stats(),
+            "auth_cache": auth_cache_stats(),
+            "sync_events": sync_event_broker.stats(),
+            "change_feed": change_feed_stats(),
+            "search_index": product_search_index.stats(),
+            "facet_index": facet_index.stats(),
+            "lookup_index": lookup_index.stats(),
+            "response_cache": response_cache.stats(),
             # Agrega más dependencias aquí según sea necesario
         }
     }
@@ -278,7 +316,7 @@ async def startup_event():
     
     # Inicializar base de datos
     try:
-        initialize_database()
+        await initialize_database()
         
         # Sincronizar productos al iniciar (opcional, se puede comentar si no se desea)
         # sync_service = SyncService()
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
+import os
+import sys
 import xmlrpc.client
 import time
 
+# Reutilizar el pool de conexiones keep-alive del middleware si está disponible
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fastapi_middleware'))
+try:
+    from app.core.xmlrpc_pool import server_proxy
+except ImportError:
+    server_proxy = None
+
 def import_products():
     # Configuración de la conexión
     url = "http://localhost:8069"
@@ -10,9 +19,13 @@ def import_products():
     password = "admin"
 
     print("Conectando a Odoo...")
-    common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(url))
+    if server_proxy:
+        common = server_proxy(url, 'common')
+        models = server_proxy(url, 'object')
+    else:
+        common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(url))
+        models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(url))
     uid = common.authenticate(db, username, password, {})
-    models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(url))
 
     if not uid:
         print("Error: No se pudo autenticar con Odoo")